@@ -0,0 +1,20 @@
+# _sqlite.py
+# Connections to the small SQLite files shared by the workers on a host
+# (admission, response cache, single-flight). WAL lets readers run alongside
+# the one writer; each worker keeps one connection, used from any thread under
+# the caller's own lock, in autocommit mode (explicit BEGIN where needed).
+import sqlite3
+
+def connect(path: str, timeout: float = 5.0) -> sqlite3.Connection:
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+def set_busy_timeout(db: sqlite3.Connection, seconds: float):
+    # after the schema is in place: setup may wait longer than requests should
+    db.execute(f"PRAGMA busy_timeout = {int(seconds * 1000)}")
+
+def is_busy(e: sqlite3.OperationalError) -> bool:
+    """True when another connection held the lock past the busy timeout."""
+    return "locked" in str(e) or "busy" in str(e)
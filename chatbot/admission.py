@@ -0,0 +1,280 @@
+# admission.py
+import asyncio, itertools, math, os, sqlite3, threading, time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+import _sqlite
+
+class Rejected(Exception):
+    """Request shed by admission control; send 429 with `retry_after` (whole seconds)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason  # "rate_limited" | "queue_full" | "queue_timeout"
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class MemoryAdmission:
+    """Per-client token buckets plus a cap on requests in flight, in one worker.
+
+    Each client key gets `burst` tokens refilled at `rate` per second; a
+    request without a token is rejected. Admitted requests then take one of
+    `max_inflight` slots, waiting in a FIFO of at most `max_queue` for up to
+    `queue_timeout` seconds when none is free. A slot is a lease that lapses
+    after `lease_ttl` seconds if it is never released.
+    """
+    backend = "memory"
+
+    def __init__(self, rate: float = 1.0, burst: float = 10.0, max_inflight: int = 64, max_queue: int = 128,
+                 queue_timeout: float = 10.0, lease_ttl: float = 300.0, max_clients: int = 100_000):
+        self.rate, self.burst = rate, burst
+        self.max_inflight, self.max_queue = max_inflight, max_queue
+        self.queue_timeout, self.lease_ttl = queue_timeout, lease_ttl
+        self.max_clients = max_clients
+        self.counts = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+        self._leases: Dict[int, float] = {}  # lease id -> expiry
+        self._ids = itertools.count(1)
+        self._waiters: deque = deque()
+
+    # -- token buckets --
+    async def _take(self, key: str) -> float:
+        # 0 if a token was taken, else seconds until one is available
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)  # least recently seen; refilled by now
+        return wait
+
+    async def check_rate(self, key: str):
+        wait = await self._take(key)
+        if wait:
+            self.counts["rate_limited"] += 1
+            raise Rejected("rate_limited", wait)
+
+    # -- in-flight slots --
+    def _grant(self) -> int:
+        lease = next(self._ids)
+        self._leases[lease] = time.monotonic() + self.lease_ttl
+        self.counts["admitted"] += 1
+        return lease
+
+    def _hand_off(self):
+        # free slots go to queued requests first, oldest first
+        while self._waiters and len(self._leases) < self.max_inflight:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(self._grant())
+
+    async def acquire(self) -> int:
+        """Returns a lease id for release(); raises Rejected when the queue is full or the wait times out."""
+        if len(self._leases) >= self.max_inflight:
+            now = time.monotonic()
+            for lease in [k for k, exp in self._leases.items() if exp < now]:
+                del self._leases[lease]
+            self._hand_off()
+        if len(self._leases) < self.max_inflight and not self._waiters:
+            return self._grant()
+        if len(self._waiters) >= self.max_queue:
+            self.counts["queue_full"] += 1
+            raise Rejected("queue_full", 1)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            return await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.counts["queue_timeout"] += 1
+            raise Rejected("queue_timeout", 1)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release(fut.result())  # granted just as the client went away
+            raise
+        finally:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+
+    def release(self, lease: Optional[int]):
+        if self._leases.pop(lease, None) is not None:
+            self._hand_off()
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "inflight": len(self._leases), "queued": len(self._waiters),
+                "max_inflight": self.max_inflight, "max_queue": self.max_queue,
+                "rate": self.rate, "burst": self.burst, **self.counts}
+
+class SQLiteAdmission(MemoryAdmission):
+    """Same policy, with buckets, slots and the queue in a local SQLite file
+    shared by every worker on the host.
+
+    Queued requests poll for a slot every `poll` seconds (sooner when a slot
+    is released in the same worker) and are admitted in arrival order. A
+    worker that dies holding slots frees them when their leases lapse.
+    Counters in `counts` are per worker; inflight and queued are host-wide.
+
+    Each decision reads first and takes the write lock (BEGIN IMMEDIATE) only
+    when it has something to change, so rejected and still-queued requests
+    never contend for it. The SQLite calls run in a thread and wait at most
+    `busy_timeout` seconds for the lock; a decision that finds the file busy
+    sleeps `poll` seconds and tries again on the event loop.
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, poll: float = 0.02, busy_timeout: float = 0.05, **kw):
+        super().__init__(**kw)
+        self.path, self.poll = path, poll
+        self._lock = threading.Lock()
+        self._released = asyncio.Event()
+        self._releasing = set()
+        self._purged = 0.0
+        self._db = _sqlite.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                         " updated REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS slots (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                         " waiting INTEGER NOT NULL, expires REAL NOT NULL)")
+        _sqlite.set_busy_timeout(self._db, busy_timeout)
+
+    def _tx(self, fn, check=None):
+        # check(now), if given, runs first without the write lock: anything but None is
+        # the answer. Otherwise fn(now) runs in one IMMEDIATE transaction, a
+        # read-modify-write without another worker in between.
+        with self._lock:
+            now = time.time()
+            if check is not None:
+                out = check(now)
+                if out is not None:
+                    return out
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(now)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return out
+
+    async def _run(self, fn, check=None, deadline: Optional[float] = None):
+        while True:
+            try:
+                return await asyncio.to_thread(self._tx, fn, check)
+            except sqlite3.OperationalError as e:
+                if not _sqlite.is_busy(e):
+                    raise
+            if deadline is not None and time.time() > deadline:
+                self.counts["queue_timeout"] += 1
+                raise Rejected("queue_timeout", 1)
+            await asyncio.sleep(self.poll)
+
+    def _tokens(self, key: str, now: float) -> float:
+        row = self._db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        return self.burst if row is None else min(self.burst, row[0] + (now - row[1]) * self.rate)
+
+    async def _take(self, key: str) -> float:
+        def empty(now):
+            # an empty bucket stays as it is: nothing to write
+            tokens = self._tokens(key, now)
+            return (1 - tokens) / self.rate if tokens < 1 else None
+
+        def take(now):
+            tokens = self._tokens(key, now)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (key, tokens, now))
+            if now - self._purged > 60:
+                # a bucket idle this long is full again; dropping it changes nothing
+                self._db.execute("DELETE FROM buckets WHERE updated < ?", (now - self.burst / self.rate,))
+                self._purged = now
+            return wait
+        return await self._run(take, empty, time.time() + self.queue_timeout)
+
+    def _counts(self, now: float):
+        return self._db.execute("SELECT COUNT(*) - COALESCE(SUM(waiting), 0), COALESCE(SUM(waiting), 0)"
+                                " FROM slots WHERE expires >= ?", (now,)).fetchone()
+
+    async def acquire(self) -> int:
+        deadline = time.time() + self.queue_timeout
+
+        def full(now):
+            return (None, False) if self._counts(now)[1] >= self.max_queue else None
+
+        def enter(now):
+            self._db.execute("DELETE FROM slots WHERE expires < ?", (now,))
+            running, waiting = self._counts(now)
+            if running < self.max_inflight and not waiting:
+                return self._db.execute("INSERT INTO slots (waiting, expires) VALUES (0, ?)",
+                                        (now + self.lease_ttl,)).lastrowid, False
+            if waiting >= self.max_queue:
+                return None, False
+            return self._db.execute("INSERT INTO slots (waiting, expires) VALUES (1, ?)",
+                                    (deadline + 1,)).lastrowid, True
+
+        def room(now) -> bool:
+            running, _ = self._counts(now)
+            ahead = self._db.execute("SELECT COUNT(*) FROM slots WHERE waiting = 1 AND id < ? AND expires >= ?",
+                                     (lease, now)).fetchone()[0]
+            return running + ahead < self.max_inflight
+
+        def promote(now):
+            return room(now) and self._db.execute(
+                "UPDATE slots SET waiting = 0, expires = ? WHERE id = ? AND waiting = 1",
+                (now + self.lease_ttl, lease)).rowcount == 1
+
+        lease, queued = await self._run(enter, full, deadline)
+        if lease is None:
+            self.counts["queue_full"] += 1
+            raise Rejected("queue_full", 1)
+        try:
+            while queued:
+                try:
+                    await asyncio.wait_for(self._released.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                if await self._run(promote, lambda now: None if room(now) else False, deadline):
+                    break
+                if time.time() > deadline:
+                    self.counts["queue_timeout"] += 1
+                    raise Rejected("queue_timeout", 1)
+        except BaseException:
+            self._free(lease)
+            raise
+        self.counts["admitted"] += 1
+        return lease
+
+    def _free(self, lease: int):
+        # deletes the slot row in the background, retrying while the file is busy
+        task = asyncio.ensure_future(self._run(
+            lambda now: self._db.execute("DELETE FROM slots WHERE id = ?", (lease,))))
+        self._releasing.add(task)
+        task.add_done_callback(self._released_slot)
+
+    def _released_slot(self, task: asyncio.Task):
+        self._releasing.discard(task)
+        if not task.cancelled():
+            task.exception()  # a failed delete leaves the lease to lapse
+        # wake this worker's queued requests; other workers notice on their next poll
+        self._released.set()
+        self._released = asyncio.Event()
+
+    def release(self, lease: Optional[int]):
+        if lease is not None:
+            self._free(lease)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running, waiting = self._counts(time.time())
+        return {**super().stats(), "inflight": running, "queued": waiting}
+
+def make_admission(kind: str, path: str = "admission.sqlite3", **kw):
+    if kind == "memory":
+        return MemoryAdmission(**kw)
+    if kind == "sqlite":
+        return SQLiteAdmission(os.path.abspath(path), **kw)
+    return None
@@ -0,0 +1,71 @@
+# batcher.py
+import asyncio, json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+class MicroBatcher:
+    """Collects LLM calls for up to `max_wait` seconds and dispatches them per group.
+
+    Requests are grouped by a caller-supplied key (here: the system + KB
+    context). A group is flushed when it reaches `max_batch` or its wait
+    expires; its calls then go out together over the shared connection pool,
+    and identical payloads within a batch share one upstream call. Each
+    submit() resolves with its own result or exception.
+    """
+
+    def __init__(self, call: Callable[[Dict], Awaitable[Any]], max_batch: int = 8, max_wait: float = 0.005):
+        self.call, self.max_batch, self.max_wait = call, max_batch, max_wait
+        self._pending: Dict[Hashable, List[Tuple[Dict, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: set = set()  # strong refs so in-flight dispatches aren't collected
+        self.batches = self.requests = self.deduped = 0
+
+    async def submit(self, group: Hashable, payload: Dict) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        batch = self._pending.setdefault(group, [])
+        batch.append((payload, fut))
+        if len(batch) >= self.max_batch:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+        return await fut
+
+    def _flush(self, group: Hashable):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if batch:
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Dict, asyncio.Future]]):
+        self.batches += 1
+        self.requests += len(batch)
+        unique: Dict[str, List[asyncio.Future]] = {}
+        payloads: Dict[str, Dict] = {}
+        for payload, fut in batch:
+            key = json.dumps(payload, sort_keys=True, default=dict)
+            unique.setdefault(key, []).append(fut)
+            payloads[key] = payload
+        self.deduped += len(batch) - len(unique)
+        # resolve each caller as soon as its own call returns, not when the whole batch does
+        await asyncio.gather(*(self._resolve(payloads[k], futs) for k, futs in unique.items()))
+
+    async def _resolve(self, payload: Dict, futs: List[asyncio.Future]):
+        try:
+            result = await self.call(payload)
+        except Exception as e:
+            for fut in futs:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for fut in futs:
+            if not fut.done():
+                fut.set_result(result)
+
+    def stats(self) -> Dict:
+        return {"batches": self.batches, "requests": self.requests, "deduped": self.deduped,
+                "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1000}
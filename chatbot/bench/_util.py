@@ -0,0 +1,8 @@
+# _util.py -- helpers shared by the bench scripts
+from typing import Sequence
+
+def pct(values: Sequence[float], p: float) -> float:
+    """Nearest-rank p-quantile (0 <= p <= 1) of latencies in seconds, in ms; nan if empty."""
+    if not values:
+        return float("nan")
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))] * 1000
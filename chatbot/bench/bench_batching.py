@@ -0,0 +1,89 @@
+# bench_batching.py -- stats-mode bursts with LLM micro-batching off vs on
+# Run from chatbot/:  python bench/bench_batching.py [--concurrency 64] [--requests 256]
+# Each run starts a fresh server against the stub LLM with the response cache
+# off, so every request reaches the batcher (or the LLM directly).
+import argparse, asyncio, os, statistics, sys, time
+
+import httpx
+
+from loadtest_chat import HERE, spawn, wait_ready
+
+# a match-night burst: a few hot questions asked over and over, plus a long tail
+HOT = ["How many goals has Saka scored?", "Saka assists this season", "Foden passing accuracy",
+       "Who leads the league in key passes?"]
+
+def question(i: int) -> str:
+    return HOT[i % len(HOT)] if i % 4 else f"Stats for player #{i}"
+
+async def burst(base: str, concurrency: int, total: int):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as c:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                t0 = time.perf_counter()
+                try:
+                    r = await c.get("/chat", params={"q": question(i), "mode": "stats"})
+                    errors += r.status_code != 200
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+        batching = (await c.get("/health")).json().get("batching", {})
+    latencies.sort()
+    return {"rps": total / wall, "p50_ms": statistics.median(latencies) * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000, "errors": errors,
+            "batching": batching}
+
+def run(args, stub_port: int, batch_env: dict):
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               ENV="dev", PLAYERS_STORE="", RESPONSE_CACHE="off", **batch_env)
+    server = spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port),
+                    "--log-level", "warning"], os.path.join(HERE, ".."), env)
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        asyncio.run(wait_ready(base + "/healthz"))
+        return asyncio.run(burst(base, args.concurrency, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=256)
+    ap.add_argument("--delay", type=float, default=0.5, help="stub LLM seconds per completion")
+    ap.add_argument("--port", type=int, default=8910)
+    args = ap.parse_args()
+
+    configs = [("off", {"LLM_BATCH": "off"})]
+    for size, wait in ((8, 2), (8, 5), (16, 10), (32, 20)):
+        configs.append((f"on  size={size:<2} wait={wait:>2}ms",
+                        {"LLM_BATCH": "on", "LLM_BATCH_MAX_SIZE": str(size), "LLM_BATCH_MAX_WAIT_MS": str(wait)}))
+
+    stub_port = args.port + 1
+    stub = spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(stub_port),
+                  "--delay", str(args.delay)], HERE)
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{stub_port}/docs"))
+        print(f"stats mode, concurrency={args.concurrency} requests={args.requests} llm_delay={args.delay}s")
+        for label, batch_env in configs:
+            res = run(args, stub_port, batch_env)
+            b = res["batching"]
+            upstream = b["requests"] - b["deduped"] if b.get("batches") else args.requests
+            print(f"batch {label:<24} {res['rps']:6.1f} req/s  p50 {res['p50_ms']:6.0f} ms  "
+                  f"p99 {res['p99_ms']:6.0f} ms  llm calls {upstream:4d}  "
+                  f"avg batch {b.get('avg_batch', 1.0):5.2f}  errors {res['errors']}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench_fuzzy_names.py -- recall and latency of player-name detection on misspelled,
+# possessive and unaccented queries: exact automaton alone vs exact + fuzzy index
+# Run from chatbot/:  python bench/bench_fuzzy_names.py [roster size] [queries per kind]
+import os, random, string, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from bench_names import synthetic_roster
+from fuzzy_names import FuzzyNameIndex
+from name_matcher import NameMatcher
+import server
+
+ACCENTED = [("martin ødegaard", "Odegaard"), ("luka modrić", "Modric"), ("kylian mbappé", "Mbappe"),
+            ("vinícius júnior", "Vinicius Junior")]
+TEMPLATES = ["How good is {} this season?", "Is {} overrated?", "Rate {} as a #10 in a 4-2-3-1", "{} vs a low block"]
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    kind = rng.choice("dist")
+    if kind == "d":
+        return word[:i] + word[i + 1:]
+    if kind == "i":
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if kind == "s":
+        return word[:i] + rng.choice(string.ascii_lowercase.replace(word[i], "")) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:] if word[i] != word[i + 1] else word[:i] + word[i + 1:]
+
+def make_queries(names, fuzzy, per_kind: int, rng: random.Random):
+    unique = [n for n in names[20:] if len(n.split()[-1]) >= 5 and not fuzzy.is_ambiguous_last(n)]
+    shared = [n for n in names[20:] if fuzzy.is_ambiguous_last(n)]
+    out = {"surname typo": [], "full name typo": [], "possessive": [], "unaccented": [], "shared surname": []}
+    for _ in range(per_kind):
+        n = rng.choice(unique)
+        first, last = n.split()[0], n.split()[-1]
+        out["surname typo"].append((rng.choice(TEMPLATES).format(typo(last, rng).title()), n))
+        out["full name typo"].append((rng.choice(TEMPLATES).format(f"{first.title()} {typo(last, rng).title()}"), n))
+        out["possessive"].append((f"What makes {last.title()}'s pressing work?", n))
+        full, plain = rng.choice(ACCENTED)
+        out["unaccented"].append((rng.choice(TEMPLATES).format(plain), full))
+        s = rng.choice(shared)
+        out["shared surname"].append((rng.choice(TEMPLATES).format(s.split()[-1].title()), s))
+    return out
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    per_kind = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    names = synthetic_roster(size)
+    t0 = time.perf_counter()
+    fuzzy = FuzzyNameIndex(names)
+    build = time.perf_counter() - t0
+    exact = NameMatcher(names)
+    print(f"{len(names)} names: fuzzy index build {build:.2f}s, {len(fuzzy._del_hash)} delete keys, "
+          f"{len(fuzzy.ambiguous_last)} shared surnames")
+
+    server.FUZZY_NAMES = True
+    server.PLAYERS = server.PLAYERS._replace(matcher=exact, fuzzy=fuzzy)
+    queries = make_queries(names, fuzzy, per_kind, random.Random(7))
+    print(f"{'query kind':<16} {'exact hit':>9} {'fuzzy hit':>9} {'wrong':>6} {'p50 ms':>7} {'p99 ms':>7}")
+    for kind, qs in queries.items():
+        hit_exact = hit = wrong = 0
+        times = []
+        for text, want in qs:
+            hit_exact += want in exact.find(text)
+            t0 = time.perf_counter()
+            got = server._find_players_in_text(text)
+            times.append(time.perf_counter() - t0)
+            hit += want in got
+            wrong += any(g != want for g in got)
+        times.sort()
+        n = len(qs)
+        print(f"{kind:<16} {hit_exact / n:>9.1%} {hit / n:>9.1%} {wrong / n:>6.1%} "
+              f"{times[n // 2] * 1000:>7.3f} {times[int(n * 0.99)] * 1000:>7.3f}")
+    print("shared surname: a hit is a guess; the resolver should withhold these (hit ~0%, wrong ~0%)")
+
+if __name__ == "__main__":
+    main()
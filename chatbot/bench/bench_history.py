@@ -0,0 +1,45 @@
+# bench_history.py -- history compaction on synthetic long chats
+# Run from chatbot/:  python bench/bench_history.py
+import os, random, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from history import HistoryCompactor
+
+TOPICS = ["Saka", "Foden", "Rodri", "Bellingham", "rest defense", "the double pivot", "xG", "pressing traps"]
+WORDS = ("the press works because the winger jumps early and the fullback steps into midfield while "
+         "the six screens the lane and the striker curves his run to cut the pass").split()
+
+def synthetic_chat(turns: int, seed: int = 5):
+    rng = random.Random(seed)
+    chat = []
+    for t in range(turns):
+        topic = rng.choice(TOPICS)
+        chat.append({"role": "user", "content": f"Turn {t}: what about {topic}? " +
+                     " ".join(rng.choices(WORDS, k=rng.randint(8, 25)))})
+        chat.append({"role": "assistant", "content": f"On {topic}: " +
+                     ". ".join(" ".join(rng.choices(WORDS, k=20)) for _ in range(rng.randint(4, 8))) + "."})
+    return chat
+
+def main():
+    chat = synthetic_chat(200)
+    compactor = HistoryCompactor(budget=1500, keep_turns=6, summary_tokens=300)
+    print(f"{'turn':>5} {'tokens before':>14} {'tokens after':>13} {'summarized':>11} {'ms':>7}")
+    total_ms = 0.0
+    for turn in range(1, 201):
+        msgs = chat[:2 * turn - 1]  # history so far + the new question
+        t0 = time.perf_counter()
+        _, info = compactor.compact(msgs)
+        ms = (time.perf_counter() - t0) * 1000
+        total_ms += ms
+        if turn in (1, 10, 25, 50, 100, 200):
+            print(f"{turn:>5} {info['tokens_before']:>14} {info['tokens_after']:>13} "
+                  f"{info['summarized_turns']:>11} {ms:>7.2f}")
+    print(f"\nwhole 200-turn thread (rolling summary cache): {total_ms:.1f} ms total, "
+          f"{total_ms / 200:.2f} ms/request")
+    cold = HistoryCompactor(budget=1500, keep_turns=6, summary_tokens=300)
+    t0 = time.perf_counter()
+    cold.compact(chat[:399])
+    print(f"cold compaction of the 200-turn thread: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_kb_store.py -- KB startup cost vs size: parsing a directory of markdown/JSONL
+# sections and building the index in memory, vs opening the compiled store, plus
+# per-query latency (bm25, with and without a section filter) on each.
+# Run from chatbot/:  python bench/bench_kb_store.py [--sizes 1000,10000,100000]
+import argparse, json, os, random, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from bench_retrieve import QUERIES, synthetic_kb
+from kb import KBIndex, compile_kb, open_kb, read_kb
+
+SECTIONS = ["Tactical talking points", "Roles & positions", "Competitions", "Common pundit query patterns"]
+STATS_ONLY = frozenset(["Tactical talking points"])
+
+def write_kb_dir(path: str, n: int, competitions: int = 4, seed: int = 7):
+    # per competition: one markdown file with headed sections and one JSONL file
+    rng = random.Random(seed)
+    lines = synthetic_kb(n, seed).splitlines()
+    per = len(lines) // (competitions * 2) + 1
+    for c in range(competitions):
+        chunk_md, chunk_jsonl = lines[2 * c * per:(2 * c + 1) * per], lines[(2 * c + 1) * per:(2 * c + 2) * per]
+        with open(os.path.join(path, f"comp{c}.md"), "w", encoding="utf-8") as f:
+            for i, line in enumerate(chunk_md):
+                if i % 50 == 0:
+                    f.write(f"\n# {rng.choice(SECTIONS)}\n")
+                f.write(line + "\n")
+        with open(os.path.join(path, f"comp{c}.jsonl"), "w", encoding="utf-8") as f:
+            for line in chunk_jsonl:
+                f.write(json.dumps({"section": rng.choice(SECTIONS), "text": line[2:]}) + "\n")
+
+def per_query_ms(index: KBIndex, sections, reps: int = 50) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        for q in QUERIES:
+            index.search(q, 6, "bm25", sections)
+    return (time.perf_counter() - t0) * 1000 / (reps * len(QUERIES))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    args = ap.parse_args()
+    print(f"{'entries':>8} {'build s':>8} {'compile s':>10} {'open ms':>8} {'q ms mem':>9} {'q ms mmap':>10} "
+          f"{'filtered':>9}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            src, store = os.path.join(tmp, "kb"), os.path.join(tmp, "kb.kbindex")
+            os.makedirs(src)
+            write_kb_dir(src, n)
+            t0 = time.perf_counter()
+            built = KBIndex(read_kb(src))
+            build = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            compile_kb(src, store)
+            compiled = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            mapped = open_kb(store)
+            opened = (time.perf_counter() - t0) * 1000
+            for q in QUERIES:
+                assert built.search(q, 6, "bm25") == mapped.search(q, 6, "bm25"), q
+            print(f"{len(built.lines):>8} {build:>8.2f} {compiled:>10.2f} {opened:>8.2f} "
+                  f"{per_query_ms(built, None):>9.3f} {per_query_ms(mapped, None):>10.3f} "
+                  f"{per_query_ms(mapped, STATS_ONLY):>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_metrics.py -- cost of /chat stage instrumentation relative to non-LLM request time
+# Run from chatbot/:  python bench/bench_metrics.py [--requests 2000] [--rounds 7]
+# Requests go through the ASGI app in-process with an instant fake LLM call
+# and the response cache off, so everything measured is non-LLM request
+# time. "bare" swaps the metrics hooks for no-ops.
+import argparse, asyncio, os, statistics, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["RESPONSE_CACHE"] = "off"
+
+import httpx
+import server
+from llm_backend import Completion
+
+QUESTIONS = ["Is Saka better than Foden?", "Explain xG and rest defense", "How does a 4-2-3-1 press?",
+             "Compare Rodri and Rice as a #6", "Who wins the Champions League final?"]
+
+COMPLETION = Completion("Bench take.", 100, 3)
+
+async def _complete(payload):
+    return COMPLETION
+
+class _NullStage:
+    __slots__ = ()
+
+    def __init__(self, name):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _NullMetric:
+    def inc(self, *a, **kw):
+        pass
+
+    def observe(self, *a, **kw):
+        pass
+
+INSTRUMENTED = {name: getattr(server, name) for name in
+                ("stage", "start_timings", "CHAT_REQUESTS", "CHAT_SECONDS", "LLM_TOKENS", "SERVER_TIMING")}
+BARE = dict(stage=_NullStage, start_timings=dict, CHAT_REQUESTS=_NullMetric(), CHAT_SECONDS=_NullMetric(),
+            LLM_TOKENS=_NullMetric(), SERVER_TIMING=False)
+
+async def run(n: int, setup: dict) -> float:
+    for name, value in setup.items():
+        setattr(server, name, value)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        t0 = time.perf_counter()
+        for i in range(n):
+            r = await c.get("/chat", params={"q": QUESTIONS[i % len(QUESTIONS)], "mode": "compare"})
+            assert r.status_code == 200, r.text
+        return (time.perf_counter() - t0) / n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--rounds", type=int, default=7)
+    args = ap.parse_args()
+
+    server._safe_load_players(os.path.join(os.path.dirname(server.__file__), "players.csv"))
+    server._complete = _complete
+    setups = {"bare": BARE, "metrics": INSTRUMENTED, "metrics+server-timing": {**INSTRUMENTED, "SERVER_TIMING": True}}
+
+    asyncio.run(run(200, INSTRUMENTED))  # warm caches (lru, KB index)
+    results = {k: [] for k in setups}
+    for _ in range(args.rounds):  # interleave to spread drift evenly
+        for label, setup in setups.items():
+            results[label].append(asyncio.run(run(args.requests, setup)))
+
+    base = statistics.median(results["bare"])
+    print(f"{args.requests} requests x {args.rounds} rounds, median per request")
+    for label, times in results.items():
+        t = statistics.median(times)
+        print(f"{label:<22} {t * 1e6:7.1f} us/request  overhead {(t - base) / base * 100:+5.2f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# bench_names.py -- player-name detection latency, linear scan vs automaton
+# Run from chatbot/:  python bench/bench_names.py
+import os, random, re, string, sys, time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from name_matcher import NameMatcher
+
+BASE = [
+    "erling haaland", "kevin de bruyne", "phil foden", "bukayo saka", "martin ødegaard",
+    "jude bellingham", "vinícius júnior", "rodri", "pedri", "frenkie de jong",
+    "robert lewandowski", "kylian mbappé", "harry kane", "mohamed salah", "declan rice",
+    "toni kroos", "luka modrić", "marcus rashford", "casemiro", "antoine griezmann",
+]
+QUERIES = [
+    "Compare Haaland vs Lewandowski in a 4-3-3 vs low blocks",
+    "Is Foden better than Saka on the right?",
+    "kevin de bruyne or bellingham as a #10",
+    "Why does Arsenal's press work so well?",
+]
+
+def legacy_find(names: List[str], text: str) -> List[str]:
+    t = " " + text.lower() + " "
+    found = []
+    for nm in names:
+        if f" {nm} " in t or t.strip().startswith(nm) or t.strip().endswith(nm):
+            found.append(nm)
+    tokens = set(re.findall(r"[a-zA-Z]+", text.lower()))
+    for nm in names:
+        if nm.split()[-1] in tokens:
+            found.append(nm)
+    seen, out = set(), []
+    for n in found:
+        if n not in seen:
+            out.append(n); seen.add(n)
+    return out[:6]
+
+def synthetic_roster(n: int, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    names = list(BASE)
+    while len(names) < n:
+        word = lambda: "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+        names.append(f"{word()} {word()}")
+    return list(dict.fromkeys(names))[:n]
+
+def per_query_ms(fn, reps: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - t0) * 1000 / (reps * len(QUERIES))
+
+def main():
+    print(f"{'players':>8} {'build ms':>10} {'linear ms/q':>12} {'automaton ms/q':>15} {'speedup':>8}")
+    for n in (20, 10_000, 100_000):
+        names = synthetic_roster(n)
+        t0 = time.perf_counter()
+        matcher = NameMatcher(names)
+        build = (time.perf_counter() - t0) * 1000
+        for q in QUERIES:
+            assert matcher.find(q) == legacy_find(names, q), q
+        reps = max(3, 100_000 // n)
+        linear = per_query_ms(lambda q: legacy_find(names, q), reps)
+        fast = per_query_ms(matcher.find, reps * 10)
+        print(f"{n:>8} {build:>10.1f} {linear:>12.3f} {fast:>15.4f} {linear / fast:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# bench_players.py -- /players queries on a large synthetic roster: pandas
+# mask/sort_values/to_dict per request vs the prebuilt RosterIndex + orjson
+# endpoint, and top-k leaderboards (sort_values vs RosterIndex.leaders)
+# Run from chatbot/:  python bench/bench_players.py [rows]
+import asyncio, json, os, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+os.environ["PLAYERS_STORE"] = ""
+
+import httpx
+
+from bench_roster import write_roster
+from roster import column_arrays, player_record
+import server
+from roster_index import RosterIndex
+
+QUERIES = [
+    ("first page", {}),
+    ("league+position, sort KP/90", {"league": "Premier League", "position": "Midfielder", "sort": "KeyPassesPer90"}),
+    ("club, goals>=20, sort goals", {"club": "Club 7", "goals_min": 20, "sort": "Goals"}),
+    ("nation+position, fields", {"nationality": "Nation 3", "position": "Defender", "fields": "Name,Club,PassingAccuracy"}),
+    ("range only, sort pass%", {"passing_accuracy_min": 90, "sort": "PassingAccuracy", "order": "asc"}),
+]
+LEADERS = [
+    ("goals, all", ["Goals"], {}),
+    ("assists in a league", ["Assists"], {"League": "La Liga"}),
+    ("KP/90 in a club", ["KeyPassesPer90"], {"Club": "Club 7"}),
+    ("goals, league+position", ["Goals"], {"League": "Serie A", "Position": "Striker"}),
+    ("goals+assists, all", ["Goals", "Assists"], {}),
+]
+EQ = {"league": "League", "club": "Club", "position": "Position", "nationality": "Nationality"}
+RANGE = {"goals_min": ("Goals", ">="), "passing_accuracy_min": ("PassingAccuracy", ">=")}
+
+def pandas_query(df, params, limit=50):
+    mask = None
+    for p, v in params.items():
+        if p in EQ:
+            m = df[EQ[p]] == v
+        elif p in RANGE:
+            m = df[RANGE[p][0]] >= v
+        else:
+            continue
+        mask = m if mask is None else mask & m
+    out = df if mask is None else df[mask]
+    if "sort" in params:
+        out = out.sort_values(params["sort"], ascending=params.get("order") == "asc", kind="stable")
+    page = out.head(limit)
+    if "fields" in params:
+        page = page[params["fields"].split(",")]
+    cols = column_arrays(page)
+    return json.dumps({"players": [player_record(cols, i) for i in range(len(page))], "total": len(out)})
+
+def pandas_leaders(df, stats, scope, k=10):
+    out = df
+    for col, v in scope.items():
+        out = out[out[col] == v]
+    score = sum(out[s].astype("float64") for s in stats)
+    return out.loc[score.sort_values(ascending=False, kind="stable").index[:k]]
+
+def best(fn, repeat=20) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+async def endpoint_times(repeat=20):
+    out = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as c:
+        for label, params in QUERIES:
+            await c.get("/players", params=params)  # first sort on a column builds its rank
+            times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                r = await c.get("/players", params=params)
+                times.append(time.perf_counter() - t0)
+            etag = r.headers["etag"]
+            t304 = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                r304 = await c.get("/players", params=params, headers={"If-None-Match": etag})
+                t304.append(time.perf_counter() - t0)
+            assert r304.status_code == 304
+            out[label] = (min(times), min(t304), r.json()["total"])
+    return out
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.csv")
+        write_roster(path, rows)
+        t0 = time.perf_counter()
+        server._safe_load_players(path)
+        load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        RosterIndex(server.PLAYERS.df)
+        build = time.perf_counter() - t0
+        df = server.PLAYERS.df
+        print(f"{rows} rows: roster load {load:.2f}s (of which index build {build * 1000:.0f} ms)")
+        print(f"{'query':<30} {'matches':>8} {'pandas':>10} {'endpoint':>10} {'304':>8}")
+        ep = asyncio.run(endpoint_times())
+        for label, params in QUERIES:
+            t_pd = best(lambda: pandas_query(df, params), repeat=5)
+            t_ep, t_304, total = ep[label]
+            print(f"{label:<30} {total:>8} {t_pd * 1000:>8.1f}ms {t_ep * 1000:>8.2f}ms {t_304 * 1000:>6.2f}ms")
+        print(f"\n{'top-10 leaders':<30} {'pandas':>10} {'index':>10}")
+        index = server.PLAYERS.index
+        for label, stats, scope in LEADERS:
+            index.leaders(stats, 10, scope)  # build the scope run once
+            t_pd = best(lambda: pandas_leaders(df, stats, scope), repeat=5)
+            t_ix = best(lambda: index.leaders(stats, 10, scope), repeat=50)
+            print(f"{label:<30} {t_pd * 1000:>8.2f}ms {t_ix * 1000:>8.3f}ms")
+
+if __name__ == "__main__":
+    main()
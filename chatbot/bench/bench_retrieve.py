@@ -0,0 +1,83 @@
+# bench_retrieve.py -- per-query retrieve() latency, linear scan vs KB index,
+# and per-engine latency on a large corpus
+# Run from chatbot/:  python bench/bench_retrieve.py [--engines-only]
+import os, random, re, sys, time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from kb import KBIndex, ENGINES
+
+QUERIES = [
+    "Compare Haaland vs Lewandowski in a 4-3-3 vs low blocks",
+    "Why does Arsenal's press work so well?",
+    "How does xG explain unlucky losses?",
+    "rest defense and counter-press in transitions",
+]
+
+def legacy_retrieve(query: str, kb: str, top_k: int = 6) -> List[str]:
+    lines = [l.strip() for l in kb.splitlines() if l.strip()]
+    q = query.lower()
+    scored = []
+    for i, line in enumerate(lines):
+        hits = sum(1 for w in re.findall(r"\w+", q) if w in line.lower())
+        if hits:
+            scored.append((hits, i, line))
+    scored.sort(reverse=True)
+    return [ln for _, _, ln in scored[:top_k]]
+
+HEADERS = ["Roles & positions", "Tactical talking points", "Competitions", "Common pundit query patterns"]
+
+def synthetic_kb(n: int, seed: int = 7) -> str:
+    # a markdown header before every 50 bullet lines, as in a hand-written KB
+    rng = random.Random(seed)
+    words = re.findall(r"\w+", " ".join(QUERIES).lower()) + [
+        "pivot", "fullback", "winger", "overload", "half", "space", "zonal", "marking",
+        "tempo", "pressing", "trigger", "block", "striker", "keeper", "set", "piece",
+    ] + [f"term{i}" for i in range(max(50, n // 4))]
+    lines = []
+    for i in range(n):
+        if i % 50 == 0:
+            lines.append(f"# {HEADERS[i // 50 % len(HEADERS)]}")
+        lines.append("- " + " ".join(rng.choice(words) for _ in range(rng.randint(6, 14))))
+    return "\n".join(lines)
+
+def per_query_ms(fn, reps: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        for q in QUERIES:
+            fn(q)
+    return (time.perf_counter() - t0) * 1000 / (reps * len(QUERIES))
+
+def bench_linear():
+    print(f"{'lines':>8} {'build ms':>10} {'linear ms/q':>12} {'index ms/q':>11} {'speedup':>8}")
+    for n in (20, 1_000, 10_000, 100_000):
+        kb = synthetic_kb(n)
+        t0 = time.perf_counter()
+        index = KBIndex(kb)
+        build = (time.perf_counter() - t0) * 1000
+        for q in QUERIES + ["roles positions"]:
+            assert index.search(q) == legacy_retrieve(q, kb), q
+        # header lines are entries too, in the section they open
+        assert index.search("roles positions", 1) == ["# Roles & positions"]
+        assert index.search("roles positions", 1, "bm25", frozenset(["Roles & positions"])) == ["# Roles & positions"]
+        reps = max(1, 20_000 // n)
+        linear = per_query_ms(lambda q: legacy_retrieve(q, kb), reps)
+        index.lines_for.cache_clear()
+        indexed = per_query_ms(index.search, reps)
+        print(f"{n:>8} {build:>10.1f} {linear:>12.3f} {indexed:>11.3f} {linear / indexed:>7.0f}x")
+
+def bench_engines(n: int = 500_000):
+    kb = synthetic_kb(n)
+    t0 = time.perf_counter()
+    index = KBIndex(kb)
+    print(f"\n{n} lines, index build {time.perf_counter() - t0:.1f} s")
+    print(f"{'engine':>8} {'ms/q':>8}")
+    for engine in ENGINES:
+        index.lines_for.cache_clear()
+        ms = per_query_ms(lambda q: index.search(q, 6, engine), 50)
+        print(f"{engine:>8} {ms:>8.3f}")
+
+if __name__ == "__main__":
+    if "--engines-only" not in sys.argv:
+        bench_linear()
+    bench_engines()
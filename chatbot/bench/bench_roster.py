@@ -0,0 +1,90 @@
+# bench_roster.py -- players.csv load time and memory: legacy iterrows loader,
+# typed CSV loader, and the compiled mmap store
+# Run from chatbot/:  python bench/bench_roster.py [rows]
+import csv, os, random, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+CLUBS = [f"Club {i}" for i in range(400)]
+LEAGUES = ["Premier League", "La Liga", "Serie A", "Bundesliga", "Ligue 1"]
+POSITIONS = ["Striker", "Winger", "Forward", "Midfielder", "Defender", "Goalkeeper"]
+NATIONS = [f"Nation {i}" for i in range(150)]
+
+def write_roster(path: str, rows: int, seed: int = 3):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["Name", "Club", "League", "Position", "Nationality", "Goals", "Assists",
+                    "PassingAccuracy", "KeyPassesPer90", "PressingIntensity", "StyleNotes"])
+        for i in range(rows):
+            w.writerow([f"Player {i}", rng.choice(CLUBS), rng.choice(LEAGUES), rng.choice(POSITIONS),
+                        rng.choice(NATIONS), rng.randint(0, 40), rng.randint(0, 25), rng.randint(55, 95),
+                        round(rng.uniform(0, 4), 1), rng.choice(["Low", "Medium", "High"]),
+                        f"Synthetic profile {i}; box-to-box runner."])
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+def private_mb() -> float:
+    # memory not shareable with other workers (mapped store pages are shared)
+    kb = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                kb += int(line.split()[1])
+    return kb / 1024
+
+def legacy_load(path: str):
+    import pandas as pd
+    df = pd.read_csv(path)
+    for col in ["Goals", "Assists", "PassingAccuracy", "KeyPassesPer90"]:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df.fillna("")
+    return df, {str(r["Name"]).strip().lower(): r.to_dict() for _, r in df.iterrows()}
+
+def typed_load(path: str):
+    from roster import read_roster_csv, name_index
+    df = read_roster_csv(path)
+    return df, name_index(df)
+
+def store_load(path: str):
+    from roster import open_store, name_index
+    df = open_store(path + ".roster")
+    df["Goals"].sum()  # touch a mapped column
+    return df, name_index(df)
+
+LOADERS = {"legacy": legacy_load, "typed": typed_load, "store": store_load}
+
+def child(kind: str, path: str):
+    import pandas  # noqa: F401  -- keep import cost out of the measurement
+    base, base_private = rss_mb(), private_mb()
+    t0 = time.perf_counter()
+    state = LOADERS[kind](path)
+    elapsed = time.perf_counter() - t0
+    print(f"{kind:>7} {elapsed:>9.2f} {rss_mb() - base:>12.1f} {private_mb() - base_private:>14.1f}")
+    del state
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "players.csv")
+        write_roster(path, rows)
+        from roster import compile_store
+        t0 = time.perf_counter()
+        compile_store(path, path + ".roster")
+        print(f"{rows} rows, store compiled once in {time.perf_counter() - t0:.2f} s")
+        print(f"{'loader':>7} {'load s':>9} {'RSS +MB':>12} {'private +MB':>14}")
+        for kind in LOADERS:
+            subprocess.run([sys.executable, __file__, "--child", kind, path], check=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
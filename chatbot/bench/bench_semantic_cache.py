@@ -0,0 +1,46 @@
+# bench_semantic_cache.py -- semantic cache lookup latency as the cache grows
+# Run from chatbot/:  python bench/bench_semantic_cache.py
+import os, sys, time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from semantic_cache import SemanticCache, embed
+
+QUERIES = ["Foden vs Saka who is better", "explain xG please", "what is rest defense", "why does city press so well"]
+
+def filled(n: int, dim: int = 256) -> SemanticCache:
+    # bulk-fill with random unit vectors; embedding 1M strings one by one
+    # would only measure embed(), which lookup() pays once per query anyway
+    cache = SemanticCache(capacity=n, dim=dim)
+    rng = np.random.default_rng(0)
+    for start in range(0, n, 100_000):
+        block = rng.standard_normal((min(100_000, n - start), dim), dtype=np.float32)
+        cache._vecs[start:start + len(block)] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    cache._parts[:n] = rng.integers(0, 8, n)
+    cache._values = [{"answer": ""}] * n
+    cache._size = n
+    return cache
+
+def main():
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        embed(QUERIES[0])
+    print(f"embed(): {(time.perf_counter() - t0):.3f} ms/query\n")
+    print(f"{'entries':>9} {'matrix MB':>10} {'lookup ms':>10} {'add (evict) ms':>15}")
+    for n in (10_000, 100_000, 1_000_000):
+        cache = filled(n)
+        reps = 50
+        t0 = time.perf_counter()
+        for i in range(reps):
+            cache.lookup(i % 8, QUERIES[i % len(QUERIES)])
+        lookup = (time.perf_counter() - t0) * 1000 / reps
+        t0 = time.perf_counter()
+        for i in range(reps):
+            cache.add(i % 8, QUERIES[i % len(QUERIES)], {"answer": "x"})
+        add = (time.perf_counter() - t0) * 1000 / reps
+        print(f"{n:>9} {cache._vecs.nbytes / 2**20:>10.0f} {lookup:>10.2f} {add:>15.2f}")
+        del cache
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# bench_similarity.py -- "players like X" latency on a synthetic 1M-player roster
+# Run from chatbot/:  python bench/bench_similarity.py [rows] [queries]
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+import pandas as pd
+
+from _util import pct
+from similarity import SimilarityIndex
+
+POSITIONS = ["Striker", "Winger", "Forward", "Midfielder", "Defender", "Goalkeeper"]
+
+def synthetic_roster(rows: int, seed: int = 5) -> pd.DataFrame:
+    # same dtypes read_roster_csv produces, built directly (a 1M-row CSV is slow to write)
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": [f"Player {i}" for i in range(rows)],
+        "Position": pd.Categorical.from_codes(rng.integers(0, len(POSITIONS), rows), POSITIONS),
+        "Goals": rng.integers(0, 40, rows).astype(np.int32),
+        "Assists": rng.integers(0, 25, rows).astype(np.int32),
+        "PassingAccuracy": rng.integers(55, 96, rows).astype(np.int32),
+        "KeyPassesPer90": rng.uniform(0, 4, rows).round(1).astype(np.float32),
+        "PressingIntensity": pd.Categorical.from_codes(rng.integers(0, 3, rows), ["Low", "Medium", "High"]),
+    })
+
+def full_sort(index: SimilarityIndex, row: int, k: int):
+    # baseline: same scores, full argsort instead of partial selection
+    scores = index.matrix @ index.matrix[row]
+    scores[row] = -np.inf
+    return np.argsort(-scores, kind="stable")[:k]
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    df = synthetic_roster(rows)
+    t0 = time.perf_counter()
+    index = SimilarityIndex(df)
+    build = time.perf_counter() - t0
+    print(f"{rows} players x {index.matrix.shape[1]} features: build {build:.2f}s, "
+          f"matrix {index.matrix.nbytes / 2**20:.0f} MiB float32")
+
+    picks = np.random.default_rng(1).integers(0, rows, queries)
+    for k in (5, 50):
+        for label, fn in (("matvec+partition", index.similar), ("matvec+argsort", lambda r, k: full_sort(index, r, k))):
+            times = []
+            for r in picks:
+                t0 = time.perf_counter()
+                fn(int(r), k)
+                times.append(time.perf_counter() - t0)
+            print(f"k={k:<3} {label:<17} p50 {pct(times, 0.5):7.2f} ms  p99 {pct(times, 0.99):7.2f} ms")
+
+    top, scores = index.similar(int(picks[0]), 5)
+    assert list(top) == list(full_sort(index, int(picks[0]), 5))
+
+if __name__ == "__main__":
+    main()
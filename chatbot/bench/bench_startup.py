@@ -0,0 +1,84 @@
+# bench_startup.py -- cold start: `python -X importtime` breakdown of `import server`
+# (what a worker loads before it can serve) vs a full warm-up, and wall time from
+# process spawn to the first /healthz answer and to a loaded roster, per STARTUP_MODE
+# Run from chatbot/:  python bench/bench_startup.py [roster rows] [runs]
+import json, os, socket, statistics, subprocess, sys, tempfile, time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(HERE, "..")
+sys.path.insert(0, HERE)
+
+from bench_roster import write_roster
+
+PACKAGES = ["fastapi", "pydantic", "numpy", "kb", "pandas", "httpx", "openai"]
+
+def importtime(code: str, cwd: str) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": "bench", "PYTHONPATH": APP_DIR}
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True).stderr
+    cumulative = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line.split("|")
+        if cum.strip().isdigit():
+            name = name.strip()
+            cumulative[name] = max(cumulative.get(name, 0), int(cum) / 1000)
+    return cumulative
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for(url: str, done, deadline: float) -> float:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as r:
+                if done(r.read()):
+                    return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+def cold_start(mode: str, cwd: str):
+    port = free_port()
+    env = {**os.environ, "OPENAI_API_KEY": "bench", "PYTHONPATH": APP_DIR, "STARTUP_MODE": mode}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=cwd, env=env)
+    try:
+        base = f"http://127.0.0.1:{port}"
+        t_healthz = wait_for(base + "/healthz", lambda body: True, t0 + 60)
+        t_ready = wait_for(base + "/health", lambda body: json.loads(body)["startup"]["ready"], t0 + 60)
+        return t_healthz - t0, t_ready - t0
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with tempfile.TemporaryDirectory() as tmp:
+        write_roster(os.path.join(tmp, "players.csv"), rows)
+        # the Procfile compiles the store before workers start; do the same
+        subprocess.run([sys.executable, os.path.join(APP_DIR, "roster.py"), "players.csv", "players.roster"],
+                       cwd=tmp, check=True, capture_output=True)
+
+        serving = importtime("import server", tmp)
+        warm = importtime("import server; server._warm_up('players.csv')", tmp)
+        print(f"{'module (cumulative ms)':<24} {'import server':>14} {'after warm-up':>14}")
+        for name in PACKAGES + ["server"]:
+            print(f"{name:<24} {serving.get(name, 0):>14.1f} {warm.get(name, 0):>14.1f}")
+
+        print(f"\n{rows}-row roster, median of {runs} cold starts (uvicorn, 1 worker)")
+        print(f"{'STARTUP_MODE':<14} {'first /healthz':>15} {'roster ready':>13}")
+        for mode in ("blocking", "fast"):
+            times = [cold_start(mode, tmp) for _ in range(runs)]
+            print(f"{mode:<14} {statistics.median(t[0] for t in times) * 1000:>13.0f}ms "
+                  f"{statistics.median(t[1] for t in times) * 1000:>11.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_static.py -- requests/sec and bytes on the wire for GET /: the old handler
+# (open + read index.html per request, uncompressed) vs the in-memory precompressed
+# StaticAsset route, with and without a conditional request. Requests go straight
+# into the ASGI app, so client-side decompression is not counted.
+# Run from chatbot/:  python bench/bench_static.py [requests]
+import asyncio, os, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+os.chdir(os.path.join(HERE, ".."))  # index.html is resolved relative to the working directory
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from fastapi.responses import HTMLResponse
+
+import server
+
+def legacy_root():
+    try:
+        with open("index.html", "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception:
+        return HTMLResponse("<h3>Soccer Pundit API is running</h3>", status_code=200)
+
+# same app and middleware, old handler
+server.app.add_api_route("/legacy", legacy_root, response_class=HTMLResponse)
+
+BROWSER = "gzip, deflate, br"
+
+async def get(path: str, headers: dict):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+             "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+    out = {"status": 0, "bytes": 0, "headers": {}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(msg):
+        if msg["type"] == "http.response.start":
+            out["status"] = msg["status"]
+            out["headers"] = {k.decode(): v.decode() for k, v in msg["headers"]}
+        elif msg["type"] == "http.response.body":
+            out["bytes"] += len(msg.get("body", b""))
+
+    await server.app(scope, receive, send)
+    return out
+
+async def run(path: str, n: int, headers: dict, conditional: bool):
+    first = await get(path, headers)
+    if conditional:
+        headers = {**headers, "If-None-Match": first["headers"]["etag"]}
+    best = 0.0
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            r = await get(path, headers)
+        best = max(best, n / (time.perf_counter() - t0))
+    return best, r
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    sizes = {enc or "identity": len(v.body) for enc, v in server.INDEX_PAGE.variants().items()}
+    print("index.html variants: " + ", ".join(f"{k} {v} B" for k, v in sizes.items()))
+    cases = [
+        ("legacy handler", "/legacy", {"Accept-Encoding": BROWSER}, False),
+        ("static asset, identity", "/", {"Accept-Encoding": "identity"}, False),
+        ("static asset, browser", "/", {"Accept-Encoding": BROWSER}, False),
+        ("static asset, 304", "/", {"Accept-Encoding": BROWSER}, True),
+    ]
+    print(f"{'case':<24} {'req/s':>8} {'status':>7} {'encoding':>9} {'body B':>7}")
+    for label, path, headers, conditional in cases:
+        rps, r = asyncio.run(run(path, n, headers, conditional))
+        enc = r["headers"].get("content-encoding", "identity")
+        print(f"{label:<24} {rps:>8.0f} {r['status']:>7} {enc:>9} {r['bytes']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# bench_suite.py -- throughput and p50/p99 of GET /health, /players and /chat for each
+# uvicorn worker count, with the offline fake LLM backend (no key, no network).
+# Results are written as JSON; --baseline compares with an earlier run and exits 1
+# if any endpoint lost more than --tolerance of its throughput or p99.
+# bench/results/baseline.json is the committed reference run (defaults, meta records the
+# host); other result files stay local. Compare on comparable hardware, or re-record it.
+# Run from chatbot/:  python bench/bench_suite.py [--workers 1,2,4] [--baseline bench/results/baseline.json]
+import argparse, asyncio, json, os, platform, subprocess, sys, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from _util import pct
+from loadtest_chat import spawn, wait_ready
+
+ENDPOINTS = {
+    "health": lambda i: ("/health", {}),
+    "players": lambda i: ("/players", {"limit": 50, "position": ("Midfielder", "Winger", "Forward")[i % 3]}),
+    "chat": lambda i: ("/chat", {"q": f"Is Saka better than Foden? #{i}", "mode": "compare"}),
+}
+
+async def drive(base: str, path_for, concurrency: int, duration: float) -> dict:
+    latencies, errors, n = [], 0, 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as c:
+        stop = time.perf_counter() + duration
+
+        async def loop():
+            nonlocal errors, n
+            while time.perf_counter() < stop:
+                n += 1
+                path, params = path_for(n)
+                t0 = time.perf_counter()
+                try:
+                    r = await c.get(path, params=params)
+                    errors += r.status_code != 200
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+    return {"requests": len(latencies), "rps": round(len(latencies) / wall, 1),
+            "p50_ms": round(pct(latencies, 0.5), 2), "p99_ms": round(pct(latencies, 0.99), 2), "errors": errors}
+
+def run_workers(workers: int, args) -> list:
+    env = dict(os.environ, LLM_BACKEND="fake", FAKE_LLM_LATENCY_MS=str(args.llm_latency_ms),
+               FAKE_LLM_TOKENS_PER_S=str(args.llm_tokens_per_s), PLAYERS_STORE="", RESPONSE_CACHE="off",
+               SEMANTIC_CACHE="off", ADMISSION="off", RELOAD_INTERVAL="0")
+    env.pop("OPENAI_API_KEY", None)
+    proc = spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--workers", str(workers),
+                  "--log-level", "warning"], os.path.join(HERE, ".."), env)
+    base = f"http://127.0.0.1:{args.port}"
+    rows = []
+    try:
+        asyncio.run(wait_ready(base + "/healthz", timeout=60))
+        for name in args.endpoints:
+            # first requests in each worker build the KB index, tokenizer caches etc.
+            asyncio.run(drive(base, ENDPOINTS[name], args.concurrency, args.warmup))
+            res = asyncio.run(drive(base, ENDPOINTS[name], args.concurrency, args.duration))
+            rows.append({"workers": workers, "endpoint": name, **res})
+            print(f"{workers:>7} {name:<8} {res['rps']:>8.1f} {res['p50_ms']:>8.1f} {res['p99_ms']:>8.1f} "
+                  f"{res['errors']:>6}", flush=True)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return rows
+
+def git(*cmd) -> str:
+    try:
+        return subprocess.run(["git", *cmd], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare(rows: list, baseline: dict, tolerance: float) -> bool:
+    old = {(r["workers"], r["endpoint"]): r for r in baseline["results"]}
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} (tolerance {tolerance:.0%})")
+    print(f"{'workers':>7} {'endpoint':<8} {'rps':>8} {'p99':>8}")
+    ok = True
+    for r in rows:
+        b = old.get((r["workers"], r["endpoint"]))
+        if b is None:
+            continue
+        d_rps, d_p99 = r["rps"] / b["rps"] - 1, r["p99_ms"] / b["p99_ms"] - 1
+        bad = d_rps < -tolerance or d_p99 > tolerance
+        ok &= not bad
+        print(f"{r['workers']:>7} {r['endpoint']:<8} {d_rps:>+8.0%} {d_p99:>+8.0%}{'   <-- regression' if bad else ''}")
+    return ok
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated uvicorn worker counts")
+    ap.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="measured seconds per endpoint")
+    ap.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per endpoint")
+    ap.add_argument("--llm-latency-ms", type=float, default=100.0, help="fake LLM time to first token")
+    ap.add_argument("--llm-tokens-per-s", type=float, default=0.0, help="fake LLM pacing after that (0 = instant)")
+    ap.add_argument("--out", help="results file (default bench/results/<commit>.json)")
+    ap.add_argument("--baseline", help="earlier results file to compare with")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed rps drop / p99 rise, as a fraction")
+    ap.add_argument("--port", type=int, default=8930)
+    args = ap.parse_args()
+    args.endpoints = [e for e in args.endpoints.split(",") if e]
+
+    commit = git("rev-parse", "--short", "HEAD")
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    meta = {"commit": commit + ("-dirty" if dirty else ""), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform(),
+            "concurrency": args.concurrency, "duration": args.duration,
+            "llm_latency_ms": args.llm_latency_ms, "llm_tokens_per_s": args.llm_tokens_per_s}
+    print(f"commit {meta['commit']}, {meta['cpus']} CPUs, concurrency {args.concurrency}, {args.duration:.0f}s "
+          f"per endpoint, fake LLM {args.llm_latency_ms:.0f}ms")
+    print(f"{'workers':>7} {'endpoint':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    rows = []
+    for w in (int(x) for x in args.workers.split(",")):
+        rows += run_workers(w, args)
+
+    out = args.out or os.path.join(HERE, "results", f"{meta['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump({"meta": meta, "results": rows}, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        sys.exit(0 if compare(rows, baseline, args.tolerance) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# fault_llm.py -- the LLM retry/deadline/circuit-breaker policy against the stub LLM
+# with injected faults: healthy, flaky (5xx), down, hanging, then recovery.
+# Exits non-zero if a phase does not behave as expected.
+# Run from chatbot/:  python bench/fault_llm.py
+import asyncio, os, sys, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from _util import pct
+from loadtest_chat import spawn, wait_ready
+
+PORT, STUB_PORT = 8920, 8921
+BREAKER_RESET = 2.0
+MAX_TOKENS = 100
+DEADLINE = 1.0 + 0.002 * MAX_TOKENS  # LLM_TIMEOUT_BASE + LLM_TIMEOUT_PER_TOKEN * max_tokens
+
+async def phase(c, stub, faults, n, stream=False):
+    await stub.post("/_faults", json=faults)
+    lat, outcomes = [], {}
+    for i in range(n):
+        t0 = time.perf_counter()
+        if stream:
+            r = await c.get("/chat/stream", params={"q": f"Rate Saka's pressing #{i}", "max_tokens": MAX_TOKENS})
+            body = r.text
+            outcome = "fallback" if '"degraded": true' in body else "error" if "event: error" in body else "llm"
+        else:
+            r = await c.get("/chat", params={"q": f"Rate Saka's pressing #{i}", "max_tokens": MAX_TOKENS})
+            body = r.json()
+            outcome = body.get("degraded_reason", "llm") if r.status_code == 200 else f"http {r.status_code}"
+        lat.append(time.perf_counter() - t0)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    breaker = (await c.get("/health")).json()["llm"]
+    return lat, outcomes, breaker
+
+async def run():
+    ok = True
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as c, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{STUB_PORT}") as stub:
+        print(f"deadline {DEADLINE:.1f}s, breaker opens after 5 failures for {BREAKER_RESET:.0f}s")
+        print(f"{'phase':<22} {'p50 ms':>8} {'max ms':>8}  {'outcomes':<42} breaker")
+
+        def report(name, res, expect):
+            nonlocal ok
+            lat, outcomes, breaker = res
+            good = expect(outcomes, breaker, lat)
+            ok &= good
+            print(f"{name:<22} {pct(lat, 0.5):>8.0f} {max(lat) * 1000:>8.0f}  {str(outcomes):<42} "
+                  f"{breaker['state']} (attempts {breaker['attempts']}, retries {breaker['retries']})"
+                  f"{'' if good else '   <-- unexpected'}")
+
+        none = {"error_rate": 0.0, "hang_rate": 0.0}
+        report("healthy", await phase(c, stub, none, 20),
+               lambda o, b, lat: o == {"llm": 20} and b["state"] == "closed")
+        report("flaky (30% 503)", await phase(c, stub, {"error_rate": 0.3, "hang_rate": 0.0}, 40),
+               lambda o, b, lat: o.get("llm", 0) >= 34 and b["retries"] > 0)
+        report("down (100% 503)", await phase(c, stub, {"error_rate": 1.0, "hang_rate": 0.0}, 20),
+               lambda o, b, lat: o.get("circuit_open", 0) >= 15 and b["state"] == "open")
+        report("down, streaming", await phase(c, stub, {"error_rate": 1.0}, 5, stream=True),
+               lambda o, b, lat: o == {"fallback": 5} and max(lat) < 0.5)
+        await asyncio.sleep(BREAKER_RESET)
+        report("hanging (30s stall)", await phase(c, stub, {"error_rate": 0.0, "hang_rate": 1.0}, 3),
+               lambda o, b, lat: sum(o.values()) == 3 and max(lat) < DEADLINE + 0.5 and b["state"] == "open")
+        await asyncio.sleep(BREAKER_RESET)
+        report("recovered", await phase(c, stub, none, 20),
+               lambda o, b, lat: o == {"llm": 20} and b["state"] == "closed")
+    return ok
+
+def main():
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{STUB_PORT}/v1",
+               PLAYERS_STORE="", RESPONSE_CACHE="off", RELOAD_INTERVAL="0",
+               LLM_TIMEOUT_BASE="1.0", LLM_TIMEOUT_PER_TOKEN="0.002", LLM_RETRIES="2", LLM_RETRY_BASE_MS="50",
+               LLM_BREAKER_FAILURES="5", LLM_BREAKER_RESET=str(BREAKER_RESET))
+    procs = [
+        spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(STUB_PORT),
+               "--delay", "0.05", "--token-delay", "0.001"], HERE),
+        spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(PORT), "--log-level", "warning"],
+              os.path.join(HERE, ".."), env),
+    ]
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{STUB_PORT}/docs"))
+        asyncio.run(wait_ready(f"http://127.0.0.1:{PORT}/healthz"))
+        ok = asyncio.run(run())
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# loadtest_admission.py -- one abusive client vs well-behaved clients on GET /chat,
+# with admission control off, per worker (memory) and shared by the workers (sqlite)
+# Run from chatbot/:  python bench/loadtest_admission.py [--workers 4] [--duration 15]
+# The stub LLM stands in for upstream capacity: LLM_MAX_CONCURRENCY per worker.
+import argparse, asyncio, os, sys, tempfile, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from _util import pct
+from loadtest_chat import spawn, wait_ready
+
+async def drive(base: str, duration: float, abusers: int, polite: int, backoff: float):
+    stop = time.perf_counter() + duration
+    good, bad = {"lat": [], "codes": {}}, {"codes": {}}
+    limits = httpx.Limits(max_connections=abusers + polite, max_keepalive_connections=abusers + polite)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as c:
+        async def abuser(i):
+            n = 0
+            while time.perf_counter() < stop:
+                n += 1
+                try:
+                    r = await c.get("/chat", params={"q": f"spam {i}-{n}"}, headers={"X-Client-Id": "abuser"})
+                    bad["codes"][r.status_code] = bad["codes"].get(r.status_code, 0) + 1
+                    if r.status_code == 429:
+                        await asyncio.sleep(backoff)  # retries at once; ignores Retry-After
+                except httpx.TransportError:
+                    bad["codes"]["conn"] = bad["codes"].get("conn", 0) + 1
+
+        async def polite_client(i):
+            n = 0
+            while time.perf_counter() < stop:
+                n += 1
+                t0 = time.perf_counter()
+                try:
+                    r = await c.get("/chat", params={"q": f"Is Saka better than Foden? {i}-{n}"},
+                                    headers={"X-Client-Id": f"fan-{i}"})
+                    code = r.status_code
+                except httpx.TransportError:
+                    code = "conn"
+                good["lat"].append(time.perf_counter() - t0)
+                good["codes"][code] = good["codes"].get(code, 0) + 1
+                await asyncio.sleep(max(0.0, 1.0 - (time.perf_counter() - t0)))  # one request a second
+
+        await asyncio.gather(*[abuser(i) for i in range(abusers)], *[polite_client(i) for i in range(polite)])
+    return good, bad
+
+def run(mode: str, args, tmp: str):
+    stub_port, port = args.port + 1, args.port
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               PLAYERS_STORE="", RESPONSE_CACHE="off", RELOAD_INTERVAL="0",
+               LLM_MAX_CONCURRENCY=str(args.llm_slots), ADMISSION=mode,
+               ADMISSION_PATH=os.path.join(tmp, f"admission-{mode}.sqlite3"),
+               ADMISSION_MAX_INFLIGHT=str(args.llm_slots * args.workers), ADMISSION_QUEUE=str(args.queue),
+               RATE_LIMIT_RPS="2", RATE_LIMIT_BURST="5", RATE_LIMIT_KEY_HEADER="X-Client-Id")
+    procs = [
+        spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(stub_port),
+               "--delay", str(args.delay)], HERE),
+        spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--workers", str(args.workers),
+               "--log-level", "warning"], os.path.join(HERE, ".."), env),
+    ]
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_ready(f"http://127.0.0.1:{stub_port}/docs"))
+        asyncio.run(wait_ready(base + "/healthz"))
+        # first requests in each worker load the tokenizer etc.; keep them out of the numbers
+        asyncio.run(drive(base, args.warmup, 0, args.workers * 4, args.backoff))
+        return asyncio.run(drive(base, args.duration, args.abusers, args.polite, args.backoff))
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--warmup", type=float, default=3.0, help="seconds of polite-only traffic before measuring")
+    ap.add_argument("--abusers", type=int, default=100, help="concurrent request loops of the abusive client")
+    ap.add_argument("--polite", type=int, default=10, help="clients sending one request a second")
+    ap.add_argument("--backoff", type=float, default=0.5, help="abuser pause after a 429")
+    ap.add_argument("--llm-slots", type=int, default=4, help="LLM_MAX_CONCURRENCY per worker")
+    ap.add_argument("--queue", type=int, default=32, help="ADMISSION_QUEUE")
+    ap.add_argument("--delay", type=float, default=0.5, help="stub LLM seconds per completion")
+    ap.add_argument("--port", type=int, default=8910)
+    args = ap.parse_args()
+    print(f"{args.workers} workers x {args.llm_slots} LLM slots, stub delay {args.delay}s, "
+          f"{args.abusers} abusive loops vs {args.polite} clients at 1 req/s, {args.duration:.0f}s")
+    print(f"{'ADMISSION':<10} {'polite p50':>11} {'p99':>8} {'polite codes':<22} {'abuser codes'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "memory", "sqlite"):
+            good, bad = run(mode, args, tmp)
+            print(f"{mode:<10} {pct(good['lat'], 0.5):>9.0f}ms {pct(good['lat'], 0.99):>6.0f}ms "
+                  f"{str(dict(sorted(good['codes'].items(), key=str))):<22} {dict(sorted(bad['codes'].items(), key=str))}")
+
+if __name__ == "__main__":
+    main()
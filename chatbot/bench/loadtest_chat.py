@@ -0,0 +1,86 @@
+# loadtest_chat.py -- concurrent /chat throughput against a local stub LLM
+# Run from chatbot/:  python bench/loadtest_chat.py [--concurrency 120] [--requests 240]
+# --app-dir points at another checkout of chatbot/ to compare before/after.
+import argparse, asyncio, os, statistics, subprocess, sys, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def spawn(args, cwd, env=None):
+    return subprocess.Popen(args, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    async with httpx.AsyncClient() as c:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await c.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+async def drive(base: str, concurrency: int, total: int):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as c:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                t0 = time.perf_counter()
+                try:
+                    r = await c.get("/chat", params={"q": f"Is Saka better than Foden? #{i}"})
+                    errors += r.status_code != 200
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "rps": total / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app-dir", default=os.path.join(HERE, ".."))
+    ap.add_argument("--concurrency", type=int, default=120)
+    ap.add_argument("--requests", type=int, default=240)
+    ap.add_argument("--delay", type=float, default=5.0, help="stub LLM seconds per completion")
+    ap.add_argument("--port", type=int, default=8900)
+    args = ap.parse_args()
+
+    stub_port = args.port + 1
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               ENV="dev", PLAYERS_STORE="")
+    procs = [
+        spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(stub_port),
+               "--delay", str(args.delay)], HERE),
+        spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port),
+               "--log-level", "warning"], os.path.abspath(args.app_dir), env),
+    ]
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        asyncio.run(wait_ready(f"http://127.0.0.1:{stub_port}/docs"))
+        asyncio.run(wait_ready(base + "/healthz"))
+        res = asyncio.run(drive(base, args.concurrency, args.requests))
+        print(f"concurrency={args.concurrency} requests={args.requests} llm_delay={args.delay}s (1 worker)")
+        print(f"throughput {res['rps']:.1f} req/s  p50 {res['p50_ms']:.0f} ms  "
+              f"p99 {res['p99_ms']:.0f} ms  errors {res['errors']}")
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+if __name__ == "__main__":
+    main()
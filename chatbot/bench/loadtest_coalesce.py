@@ -0,0 +1,76 @@
+# loadtest_coalesce.py -- bursts of identical GET /chat requests (everyone asking the same
+# thing at the final whistle) with single-flight off, per worker (memory) and shared by the
+# workers (sqlite). Counts the completions that reach the stub LLM.
+# Run from chatbot/:  python bench/loadtest_coalesce.py [--workers 4] [--burst 50] [--rounds 5]
+import argparse, asyncio, os, sys, tempfile, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from _util import pct
+from loadtest_chat import spawn, wait_ready
+
+async def bursts(base: str, stub: str, burst: int, rounds: int, topic: str = "final"):
+    lat, errors, coalesced = [], 0, 0
+    limits = httpx.Limits(max_connections=burst, max_keepalive_connections=burst)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as c, httpx.AsyncClient() as s:
+        before = (await s.get(stub + "/_stats")).json()["completions"]
+
+        async def one(q):
+            nonlocal errors, coalesced
+            t0 = time.perf_counter()
+            r = await c.get("/chat", params={"q": q})
+            lat.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+            elif r.json().get("coalesced"):
+                coalesced += 1
+
+        for i in range(rounds):
+            q = f"What did you make of that {topic}, Saka's winner in minute {90 + i}?"
+            await asyncio.gather(*(one(q) for _ in range(burst)))
+        upstream = (await s.get(stub + "/_stats")).json()["completions"] - before
+    return {"upstream": upstream, "coalesced": coalesced, "errors": errors, "p50": pct(lat, 0.5), "p99": pct(lat, 0.99)}
+
+def run(mode: str, args, tmp: str):
+    stub_port, port = args.port + 1, args.port
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               PLAYERS_STORE="", RESPONSE_CACHE="off", RELOAD_INTERVAL="0",
+               COALESCE=mode, COALESCE_PATH=os.path.join(tmp, f"coalesce-{mode}.sqlite3"))
+    procs = [
+        spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(stub_port),
+               "--delay", str(args.delay)], HERE),
+        spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--workers", str(args.workers),
+               "--log-level", "warning"], os.path.join(HERE, ".."), env),
+    ]
+    try:
+        base, stub = f"http://127.0.0.1:{port}", f"http://127.0.0.1:{stub_port}"
+        asyncio.run(wait_ready(stub + "/docs"))
+        asyncio.run(wait_ready(base + "/healthz"))
+        asyncio.run(bursts(base, stub, args.workers * 4, 1, "warm-up"))  # warm every worker's KB index and tokenizer
+        return asyncio.run(bursts(base, stub, args.burst, args.rounds))
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--burst", type=int, default=50, help="identical requests sent at once")
+    ap.add_argument("--rounds", type=int, default=5, help="bursts, each with a different question")
+    ap.add_argument("--delay", type=float, default=0.5, help="stub LLM seconds to first token")
+    ap.add_argument("--port", type=int, default=8940)
+    args = ap.parse_args()
+    print(f"{args.workers} workers, {args.rounds} bursts of {args.burst} identical requests, "
+          f"stub delay {args.delay}s, response cache off")
+    print(f"{'COALESCE':<9} {'upstream calls':>14} {'coalesced':>10} {'errors':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "memory", "sqlite"):
+            r = run(mode, args, tmp)
+            print(f"{mode:<9} {r['upstream']:>14} {r['coalesced']:>10} {r['errors']:>7} {r['p50']:>8.0f} {r['p99']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# stub_llm.py -- local stand-in for the OpenAI chat completions API
+# Run from chatbot/:  python bench/stub_llm.py --port 8901 --delay 1.0
+# then point the server at it with OPENAI_BASE_URL=http://127.0.0.1:8901/v1
+# Faults: --error-rate/--hang-rate at startup, or POST /_faults with the same keys
+# (error_rate, error_status, hang_rate, hang) to change them while running.
+# GET /_stats counts the completions requested so far.
+import argparse, asyncio, json, random, time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Stub LLM")
+DELAY = 1.0         # time to first token
+TOKEN_DELAY = 0.02  # per generated token
+FAULTS = {"error_rate": 0.0, "error_status": 503, "hang_rate": 0.0, "hang": 30.0}
+STATS = {"completions": 0}
+
+def _answer(body) -> str:
+    return f"Stub pundit take on: {body['messages'][-1]['content']}"
+
+def _usage(body, answer: str):
+    prompt_tokens = sum(len(m["content"].split()) for m in body["messages"])
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer.split()),
+            "total_tokens": prompt_tokens + len(answer.split())}
+
+def _chunk(body, delta, finish=None):
+    return {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+async def _stream(body):
+    answer = _answer(body)
+    await asyncio.sleep(DELAY)
+    yield f"data: {json.dumps(_chunk(body, {'role': 'assistant', 'content': ''}))}\n\n"
+    for i, word in enumerate(answer.split(" ")):
+        yield f"data: {json.dumps(_chunk(body, {'content': word if i == 0 else ' ' + word}))}\n\n"
+        await asyncio.sleep(TOKEN_DELAY)
+    yield f"data: {json.dumps(_chunk(body, {}, 'stop'))}\n\n"
+    if (body.get("stream_options") or {}).get("include_usage"):
+        tail = _chunk(body, {})
+        tail["choices"], tail["usage"] = [], _usage(body, answer)
+        yield f"data: {json.dumps(tail)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.post("/_faults")
+async def set_faults(request: Request):
+    FAULTS.update(await request.json())
+    return FAULTS
+
+@app.get("/_stats")
+async def stats():
+    return STATS
+
+@app.post("/v1/chat/completions")
+async def completions(request: Request):
+    body = await request.json()
+    STATS["completions"] += 1
+    if random.random() < FAULTS["error_rate"]:
+        return JSONResponse({"error": {"message": "injected fault", "type": "server_error"}},
+                            status_code=FAULTS["error_status"])
+    if random.random() < FAULTS["hang_rate"]:
+        await asyncio.sleep(FAULTS["hang"])
+    if body.get("stream"):
+        return StreamingResponse(_stream(body), media_type="text/event-stream")
+    answer = _answer(body)
+    await asyncio.sleep(DELAY + TOKEN_DELAY * len(answer.split(" ")))
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": answer}}],
+        "usage": _usage(body, answer),
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8901)
+    ap.add_argument("--delay", type=float, default=1.0, help="seconds to first token")
+    ap.add_argument("--token-delay", type=float, default=0.02, help="seconds per generated token")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with an error status")
+    ap.add_argument("--hang-rate", type=float, default=0.0, help="share of calls that stall for 30s first")
+    args = ap.parse_args()
+    DELAY, TOKEN_DELAY = args.delay, args.token_delay
+    FAULTS.update(error_rate=args.error_rate, hang_rate=args.hang_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
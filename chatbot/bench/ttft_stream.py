@@ -0,0 +1,61 @@
+# ttft_stream.py -- time to first token on /chat/stream vs full /chat latency
+# Run from chatbot/:  python bench/ttft_stream.py [--delay 0.3] [--token-delay 0.05]
+import argparse, asyncio, os, statistics, sys, time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from loadtest_chat import spawn, wait_ready
+
+async def measure(base: str, n: int):
+    ttft, full_stream, full_chat = [], [], []
+    async with httpx.AsyncClient(base_url=base, timeout=60) as c:
+        for i in range(n):
+            q = {"q": f"Foden vs Saka on the right #{i}"}
+            t0 = time.perf_counter()
+            first, events = None, []
+            async with c.stream("GET", "/chat/stream", params=q) as r:
+                async for line in r.aiter_lines():
+                    if line.startswith("event: "):
+                        events.append(line[7:])
+                        if line == "event: delta" and first is None:
+                            first = time.perf_counter() - t0
+            full_stream.append(time.perf_counter() - t0)
+            ttft.append(first)
+            assert events[0] == "meta" and events[-1] == "done", events
+            t0 = time.perf_counter()
+            (await c.get("/chat", params=q)).raise_for_status()
+            full_chat.append(time.perf_counter() - t0)
+    ms = lambda xs: statistics.median(xs) * 1000
+    print(f"/chat/stream  first token p50 {ms(ttft):.0f} ms, last event p50 {ms(full_stream):.0f} ms")
+    print(f"/chat         full answer p50 {ms(full_chat):.0f} ms")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--delay", type=float, default=0.3, help="stub time to first token")
+    ap.add_argument("--token-delay", type=float, default=0.05)
+    ap.add_argument("--requests", type=int, default=20)
+    ap.add_argument("--port", type=int, default=8910)
+    args = ap.parse_args()
+    stub_port = args.port + 1
+    # caches off: /chat asks the same questions right after /chat/stream
+    env = dict(os.environ, OPENAI_API_KEY="stub", OPENAI_BASE_URL=f"http://127.0.0.1:{stub_port}/v1",
+               ENV="dev", PLAYERS_STORE="", RESPONSE_CACHE="off")
+    procs = [
+        spawn([sys.executable, os.path.join(HERE, "stub_llm.py"), "--port", str(stub_port),
+               "--delay", str(args.delay), "--token-delay", str(args.token_delay)], HERE),
+        spawn([sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port),
+               "--log-level", "warning"], os.path.join(HERE, ".."), env),
+    ]
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{stub_port}/docs"))
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.port}/healthz"))
+        asyncio.run(measure(f"http://127.0.0.1:{args.port}", args.requests))
+    finally:
+        for p in procs:
+            p.terminate()
+            p.wait()
+
+if __name__ == "__main__":
+    main()
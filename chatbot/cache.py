@@ -0,0 +1,139 @@
+# cache.py
+import asyncio, hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import _sqlite
+
+def cache_key(model: str, mode: str, hot: bool, max_tokens: int, messages: List[Dict]) -> str:
+    # whitespace- and case-insensitive on content, so trivially different
+    # spellings of the same evergreen question share an entry
+    norm = [[m["role"].strip().lower(), " ".join(m["content"].split()).casefold()] for m in messages]
+    raw = json.dumps([model, mode, bool(hot), int(max_tokens), norm], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class MemoryCache:
+    """In-process LRU with a per-entry TTL."""
+    backend = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries, self.ttl = max_entries, ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: str, value: Dict):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    # what the event loop calls; the SQLite backend runs get/put in a thread
+    async def aget(self, key: str) -> Optional[Dict]:
+        return self.get(key)
+
+    async def aput(self, key: str, value: Dict):
+        self.put(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {"backend": self.backend, "entries": len(self), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+class SQLiteCache(MemoryCache):
+    """LRU + TTL cache in a local SQLite file, shared by every worker on the host.
+
+    Hit/miss counters are per worker; entries and eviction are shared. The
+    entry count is kept by triggers in a one-row table, so a put reads it
+    instead of counting the table. Writes wait at most `busy_timeout` seconds
+    for another worker's lock; past that a lookup is a miss and a put is
+    dropped, rather than the request waiting on the cache.
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: float = 3600.0, busy_timeout: float = 0.05):
+        super().__init__(max_entries, ttl)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = _sqlite.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                         " expires REAL NOT NULL, used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._db.execute("BEGIN IMMEDIATE")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses_count (id INTEGER PRIMARY KEY, n INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO responses_count VALUES (0, (SELECT COUNT(*) FROM responses))")
+        self._db.execute("CREATE TRIGGER IF NOT EXISTS responses_added AFTER INSERT ON responses"
+                         " BEGIN UPDATE responses_count SET n = n + 1; END")
+        self._db.execute("CREATE TRIGGER IF NOT EXISTS responses_removed AFTER DELETE ON responses"
+                         " BEGIN UPDATE responses_count SET n = n - 1; END")
+        self._db.execute("COMMIT")
+        _sqlite.set_busy_timeout(self._db, busy_timeout)
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            hit = row is not None and row[1] >= now
+            try:
+                if hit:
+                    self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+                elif row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            except sqlite3.OperationalError as e:
+                if not _sqlite.is_busy(e):
+                    raise  # busy: the LRU touch or expired-row cleanup is skipped this time
+        if not hit:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict):
+        try:
+            self._put(key, value)
+        except sqlite3.OperationalError as e:
+            if not _sqlite.is_busy(e):
+                raise  # busy: this answer just isn't cached
+
+    def _put(self, key: str, value: Dict):
+        now = time.time()
+        with self._lock:
+            # an upsert, not INSERT OR REPLACE: REPLACE's implicit delete skips the count trigger
+            self._db.execute("INSERT INTO responses VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE"
+                             " SET value = excluded.value, expires = excluded.expires, used = excluded.used",
+                             (key, json.dumps(value, ensure_ascii=False), now + self.ttl, now))
+            over = len(self) - self.max_entries
+            if over > 0:
+                self._db.execute("DELETE FROM responses WHERE key IN"
+                                 " (SELECT key FROM responses ORDER BY used LIMIT ?)", (over,))
+                self.evictions += over
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, value: Dict):
+        await asyncio.to_thread(self.put, key, value)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT n FROM responses_count").fetchone()[0]
+
+def make_cache(kind: str, max_entries: int, ttl: float, path: str = "response_cache.sqlite3"):
+    if kind == "memory":
+        return MemoryCache(max_entries, ttl)
+    if kind == "sqlite":
+        return SQLiteCache(os.path.abspath(path), max_entries, ttl)
+    return None
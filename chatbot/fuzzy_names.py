@@ -0,0 +1,153 @@
+# fuzzy_names.py
+import re, unicodedata
+from itertools import product
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+")
+# letters NFKD does not decompose
+_FOLD = str.maketrans({"ø": "o", "æ": "ae", "œ": "oe", "ß": "ss", "đ": "d", "ł": "l", "ı": "i", "ð": "d", "þ": "th"})
+# never fuzzy-matched: frequent query words that sit one edit away from some surname
+_SKIP = frozenset(
+    "about after again against also than that then there their these they this those what when where which "
+    "while with would could should better worse best worst compare season player players league goals assists "
+    "pressing press passing passes winger striker midfielder defender keeper forward".split())
+
+def normalize(text: str) -> List[str]:
+    """Casefolded ASCII-ish word tokens: accents dropped, possessives split off."""
+    text = unicodedata.normalize("NFKD", text.casefold().translate(_FOLD))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _TOKEN_RE.findall(text)
+
+def _deletes(token: str) -> List[str]:
+    return [token] + [token[:i] + token[i + 1:] for i in range(len(token))]
+
+def _distance(a: str, b: str) -> int:
+    # edit distance (with adjacent transpositions) for symmetric-delete
+    # candidates, which are at most 2 apart: 1 when one edit explains the pair
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    i = next((k for k, (x, y) in enumerate(zip(a, b)) if x != y), len(b))
+    if len(a) == len(b):
+        if a[i + 1:] == b[i + 1:]:
+            return 1  # substitution
+        return 1 if a[i + 2:] == b[i + 2:] and a[i] == b[i + 1] and a[i + 1] == b[i] else 2
+    return 1 if a[i + 1:] == b[i:] else 2
+
+class NameMatch(NamedTuple):
+    name: str             # the roster's lowercase name
+    score: float          # confidence in [0, 1]; 1.0 is an exact (normalised) match
+    kind: str             # "full" (every name token present) or "last" (surname only)
+    ambiguous: Tuple[str, ...]  # other players it could equally be; non-empty means "don't use"
+
+class FuzzyNameIndex:
+    """Typo-, accent- and possessive-tolerant player-name resolution.
+
+    Name tokens go into a symmetric-delete index (SymSpell, edit distance 1
+    per side): every token and each of its one-character deletions is hashed
+    into a sorted int64 array, so a query word finds its near spellings with
+    one searchsorted call, and candidates are then verified with a real edit
+    distance. A full name needs all of its tokens in sequence; a surname on
+    its own resolves only if no other player shares it -- shared surnames
+    are precomputed into `ambiguous_last` and reported instead of guessed.
+    """
+
+    def __init__(self, names: List[str], min_fuzzy_len: int = 4):
+        self.names = list(names)
+        self.min_fuzzy_len = min_fuzzy_len
+        self._full: Dict[Tuple[str, ...], List[int]] = {}
+        self._last: Dict[str, List[int]] = {}
+        vocab: Dict[str, int] = {}
+        for idx, nm in enumerate(self.names):
+            toks = tuple(normalize(nm))
+            if not toks:
+                continue
+            self._full.setdefault(toks, []).append(idx)
+            if len(toks) > 1:
+                self._last.setdefault(toks[-1], []).append(idx)
+            for t in toks:
+                vocab.setdefault(t, len(vocab))
+        self._vocab = vocab
+        self._tokens = list(vocab)
+        self.max_tokens = min(max((len(k) for k in self._full), default=1), 4)
+        self.ambiguous_last = {last: tuple(self.names[i] for i in ids)
+                               for last, ids in self._last.items() if len(ids) > 1}
+
+        hashes, ids = [], []
+        for tok, tid in vocab.items():
+            if len(tok) >= min_fuzzy_len:
+                for d in set(_deletes(tok)):
+                    hashes.append(hash(d))
+                    ids.append(tid)
+        order = np.argsort(np.asarray(hashes, dtype=np.int64), kind="stable")
+        self._del_hash = np.asarray(hashes, dtype=np.int64)[order]
+        self._del_tok = np.asarray(ids, dtype=np.int32)[order]
+
+    def _candidates(self, token: str) -> List[Tuple[str, float]]:
+        if token in self._vocab:
+            return [(token, 1.0)]
+        if len(token) < self.min_fuzzy_len or token in _SKIP:
+            return []
+        keys = np.asarray([hash(d) for d in set(_deletes(token))], dtype=np.int64)
+        lo = np.searchsorted(self._del_hash, keys, "left")
+        hi = np.searchsorted(self._del_hash, keys, "right")
+        found = {}
+        for a, b in zip(lo, hi):
+            for tid in self._del_tok[a:b]:
+                cand = self._tokens[tid]
+                if cand not in found:
+                    dist = _distance(token, cand)
+                    if dist <= 2:
+                        found[cand] = 1.0 - dist / max(len(token), len(cand))
+        return sorted(found.items(), key=lambda kv: -kv[1])[:3]
+
+    def resolve(self, text: str) -> List[NameMatch]:
+        """Players named in `text`, in order of appearance."""
+        toks = normalize(text)
+        cands = [self._candidates(t) for t in toks]
+        out: List[NameMatch] = []
+        used = [False] * len(toks)
+        # full names first, longest spans first
+        for span in range(self.max_tokens, 0, -1):
+            for i in range(len(toks) - span + 1):
+                if any(used[i:i + span]) or not all(cands[i:i + span]):
+                    continue
+                best = None
+                for combo in product(*cands[i:i + span]):
+                    ids = self._full.get(tuple(t for t, _ in combo))
+                    if ids:
+                        score = sum(s for _, s in combo) / span
+                        if best is None or score > best[0]:
+                            best = (score, ids)
+                if best is None:
+                    continue
+                score, ids = best
+                names = tuple(self.names[j] for j in ids)
+                out.append((i, NameMatch(names[0], round(score, 4), "full", names[1:] if len(ids) > 1 else ())))
+                used[i:i + span] = [True] * span
+        # then lone surnames
+        for i, tok_cands in enumerate(cands):
+            if used[i]:
+                continue
+            hits = [(t, s) for t, s in tok_cands if t in self._last]
+            if not hits:
+                continue
+            top = hits[0][1]
+            tied = [t for t, s in hits if s == top]
+            names = tuple(self.names[j] for t in tied for j in self._last[t])
+            out.append((i, NameMatch(names[0], round(top, 4), "last", names[1:])))
+            used[i] = True
+        out.sort(key=lambda p: p[0])
+        seen, result = set(), []
+        for _, m in out:
+            if m.name not in seen:
+                seen.add(m.name)
+                result.append(m)
+        return result
+
+    def is_ambiguous_last(self, name: str) -> bool:
+        toks = normalize(name)
+        return len(toks) > 1 and toks[-1] in self.ambiguous_last
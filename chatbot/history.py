@@ -0,0 +1,96 @@
+# history.py
+import hashlib, re
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+from prompt import count_tokens, MESSAGE_OVERHEAD
+
+SUMMARY_HEADER = "Earlier in this conversation (summarised):"
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_ROLE_LABEL = {"user": "User", "assistant": "Pundit"}
+
+def _gist(content: str, max_words: int = 30) -> str:
+    # first sentence, capped -- enough to keep the thread's topics and names
+    first = _SENTENCE_RE.split(" ".join(content.split()), 1)[0]
+    words = first.split()
+    return " ".join(words[:max_words]) + (" …" if len(words) > max_words else "")
+
+def _msg_tokens(m: Dict) -> int:
+    return count_tokens(m["content"]) + MESSAGE_OVERHEAD
+
+class HistoryCompactor:
+    """Caps conversation history at a token budget.
+
+    The last `keep_turns` messages stay verbatim; everything older is folded
+    into a one-line-per-turn extractive summary. Summaries are cached by a
+    hash chain over the history prefix, so each request of a long thread only
+    summarises the turns that scrolled out since the previous request.
+    Client-sent echoes of our own system/KB messages and repeated messages
+    are dropped first.
+    """
+
+    def __init__(self, budget: int = 1500, keep_turns: int = 6, summary_tokens: int = 300,
+                 echo_prefixes: Sequence[str] = (), cache_size: int = 2048):
+        self.budget, self.keep_turns, self.summary_tokens = budget, keep_turns, summary_tokens
+        self.echo_prefixes = tuple(p.strip() for p in echo_prefixes if p.strip())
+        self._summaries: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self.cache_size = cache_size
+
+    def _is_echo(self, m: Dict, prev: Dict) -> bool:
+        if prev is not None and m["role"] == prev["role"] and m["content"] == prev["content"]:
+            return True
+        return m["role"] == "system" and m["content"].strip().startswith(self.echo_prefixes)
+
+    def _summary_lines(self, older: List[Dict]) -> Tuple[str, ...]:
+        # walk the hash chain, reusing the longest cached prefix
+        digests, h = [], hashlib.sha1()
+        for m in older:
+            h.update(m["role"].encode() + b"\0" + m["content"].encode("utf-8") + b"\0")
+            digests.append(h.copy().hexdigest())
+        start, lines = 0, ()
+        for i in range(len(digests) - 1, -1, -1):
+            if digests[i] in self._summaries:
+                start, lines = i + 1, self._summaries[digests[i]]
+                self._summaries.move_to_end(digests[i])
+                break
+        for i in range(start, len(older)):
+            m = older[i]
+            lines += (f"- {_ROLE_LABEL.get(m['role'], m['role'].title())}: {_gist(m['content'])}",)
+            self._summaries[digests[i]] = lines
+        while len(self._summaries) > self.cache_size:
+            self._summaries.popitem(last=False)
+        return lines
+
+    def compact(self, messages: List[Dict]) -> Tuple[List[Dict], Dict]:
+        before = sum(_msg_tokens(m) for m in messages)
+        kept, prev = [], None
+        for m in messages:
+            if not self._is_echo(m, prev):
+                kept.append(m)
+            prev = m
+        if not kept:
+            kept = messages[-1:]
+        info = {"tokens_before": before, "dropped_echoes": len(messages) - len(kept), "summarized_turns": 0}
+        total = sum(_msg_tokens(m) for m in kept)
+        if total > self.budget and len(kept) > 1:
+            recent = kept[-self.keep_turns:] if self.keep_turns > 0 else kept[-1:]
+            # the newest turns alone may still be over budget; keep at least the question
+            while len(recent) > 1 and sum(_msg_tokens(m) for m in recent) > self.budget:
+                recent = recent[1:]
+            older = kept[:len(kept) - len(recent)]
+            if older:
+                lines = self._summary_lines(older)
+                # oldest lines go first when the summary itself is over its cap
+                line_tokens = [count_tokens(l) + 1 for l in lines]
+                cut, size = 0, sum(line_tokens)
+                while cut < len(lines) - 1 and size > self.summary_tokens:
+                    size -= line_tokens[cut]
+                    cut += 1
+                lines = lines[cut:]
+                summary = {"role": "system", "content": "\n".join([SUMMARY_HEADER, *lines])}
+                kept = [summary] + recent
+                info["summarized_turns"] = len(older)
+            else:
+                kept = recent
+        info["tokens_after"] = sum(_msg_tokens(m) for m in kept)
+        return kept, info
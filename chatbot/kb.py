@@ -0,0 +1,309 @@
+# kb.py
+import json, os, re, heapq, sys
+from collections import Counter
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import store
+
+TOKEN_RE = re.compile(r"\w+")
+HEADER_RE = re.compile(r"#{1,6}\s+(.+?)[\s#]*")
+
+# "hits" is the original substring hit count; the others rank whole-word
+# matches over a sparse term-document matrix.
+ENGINES = ("hits", "bm25", "tfidf")
+BM25_K1, BM25_B = 1.5, 0.75
+
+# ---------------- Sources ----------------
+# A KB is a list of (section, entry) pairs. Markdown: every non-empty line is
+# an entry, and a "# Header" line also names the section of itself and the
+# lines below it (header text stays retrievable, as in a single-file KB).
+# JSONL: one {"text": ..., "section": ...} record per line. In a directory,
+# entries before the first header (or records without a section) take the
+# file name as their section.
+KB_SUFFIXES = (".md", ".markdown", ".txt", ".jsonl")
+
+def parse_markdown(text: str, section: str = "") -> List[Tuple[str, str]]:
+    entries = []
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if not line:
+            continue
+        m = HEADER_RE.fullmatch(line)
+        if m:
+            section = m.group(1)
+        entries.append((section, line))
+    return entries
+
+def _source_files(path: str) -> List[str]:
+    if not os.path.isdir(path):
+        return [path]
+    return sorted(os.path.join(d, f) for d, _, files in os.walk(path) for f in files
+                  if f.endswith(KB_SUFFIXES) and not f.startswith("."))
+
+def read_kb(path: str) -> List[Tuple[str, str]]:
+    """Entries of a KB file, or of every KB file under a directory in path order."""
+    entries = []
+    for f in _source_files(path):
+        default = os.path.splitext(os.path.basename(f))[0] if f != path else ""
+        with open(f, encoding="utf-8") as fh:
+            if not f.endswith(".jsonl"):
+                entries.extend(parse_markdown(fh.read(), default))
+                continue
+            for n, line in enumerate(fh, 1):
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                    text = " ".join(str(rec["text"]).split())
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{f}:{n}: bad KB record ({e})") from None
+                if text:
+                    entries.append((str(rec.get("section") or default), text))
+    return entries
+
+def source_stamp(path: str) -> List:
+    # changes when any KB file is added, removed or rewritten
+    out = []
+    for f in _source_files(path):
+        st = os.stat(f)
+        out.append([os.path.relpath(f, path) if f != path else "", st.st_mtime_ns, st.st_size])
+    return out
+
+# ---------------- Index ----------------
+class _Strings:
+    """Read-only sequence of strings over one UTF-8 buffer and an offsets array."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob, self.offsets = blob, offsets
+        self._buf, self._off = memoryview(blob), memoryview(offsets)  # plain-int indexing, no numpy scalars
+
+    @classmethod
+    def pack(cls, items: Sequence[str]) -> "_Strings":
+        raw = [s.encode("utf-8") for s in items]
+        offsets = np.zeros(len(raw) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in raw], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(raw), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self._buf[self._off[i]:self._off[i + 1]], "utf-8")
+
+class _Suffixes:
+    """Sorted suffixes of the vocabulary, as (term, offset) pairs, for bisection."""
+
+    def __init__(self, terms: Sequence[str], term: np.ndarray, off: np.ndarray):
+        self.terms, self.term, self.off = terms, memoryview(term), memoryview(off)
+
+    def __len__(self) -> int:
+        return len(self.term)
+
+    def __getitem__(self, i: int) -> str:
+        return self.terms[self.term[i]][self.off[i]:]
+
+def _distinct(ids: np.ndarray, size: int) -> np.ndarray:
+    # sorted unique ids below size; a marker array beats np.unique's hashing here
+    seen = np.zeros(size, dtype=bool)
+    seen[ids] = True
+    return np.flatnonzero(seen)
+
+class KBIndex:
+    """Inverted index over KB entries, built once and queried per request.
+
+    Matching keeps the original semantics of retrieve(): a query token hits an
+    entry when it is a substring of the lowercased entry. Query tokens are pure
+    word characters, so any such occurrence sits inside one of the entry's own
+    word tokens -- the sorted suffixes of the vocabulary find those tokens by
+    bisection, and their postings give the matching entries.
+
+    The postings, laid out column-wise (indptr/indices per term), back the
+    bm25 and tfidf engines: a query is a gather of its terms' columns and one
+    weighted bincount. Everything lives in flat arrays, so save() writes them
+    out and open() maps them back without rebuilding anything.
+    """
+    ARRAYS = ("section_of", "indptr", "indices", "idf", "bm25", "tfidf", "suffix_term", "suffix_off")
+
+    def __init__(self, kb):
+        # kb: markdown text, or a list of (section, entry) pairs from read_kb()
+        entries = parse_markdown(kb) if isinstance(kb, str) else list(kb)
+        self.sections = list(dict.fromkeys(s for s, _ in entries))
+        section_ids = {s: k for k, s in enumerate(self.sections)}
+        self.section_of = np.fromiter((section_ids[s] for s, _ in entries), dtype=np.int32, count=len(entries))
+        self.lines = [text for _, text in entries]
+        tfs = [Counter(TOKEN_RE.findall(text.lower())) for text in self.lines]
+        self.terms = sorted({tok for tf in tfs for tok in tf})
+        term_ids = {t: k for k, t in enumerate(self.terms)}
+        postings: List[List[int]] = [[] for _ in self.terms]
+        for i, tf in enumerate(tfs):
+            for tok in tf:
+                postings[term_ids[tok]].append(i)
+        suffixes = sorted((t[j:], k, j) for k, t in enumerate(self.terms) for j in range(len(t)))
+        self.suffix_term = np.fromiter((k for _, k, _ in suffixes), dtype=np.int32, count=len(suffixes))
+        self.suffix_off = np.fromiter((j for _, _, j in suffixes), dtype=np.int32, count=len(suffixes))
+        self._build_matrix(tfs, postings)
+        self.backing = "memory"
+        self._ready()
+
+    def _build_matrix(self, tfs: List[Counter], postings: List[List[int]]):
+        n = len(self.lines)
+        df = np.fromiter((len(p) for p in postings), dtype=np.float64, count=len(postings))
+        self.indptr = np.concatenate(([0], np.cumsum(df, dtype=np.int64)))
+        self.indices = np.fromiter((i for p in postings for i in p), dtype=np.int32, count=int(self.indptr[-1]))
+        tf = np.fromiter((tfs[i][t] for t, p in zip(self.terms, postings) for i in p),
+                         dtype=np.float64, count=len(self.indices))
+        term_of = np.repeat(np.arange(len(self.terms)), df.astype(np.int64))
+
+        doc_len = np.fromiter((sum(c.values()) for c in tfs), dtype=np.float64, count=n)
+        avgdl = doc_len.mean() if n else 1.0
+        bm25_idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len[self.indices] / avgdl)
+        self.bm25 = (bm25_idf[term_of] * tf * (BM25_K1 + 1) / (tf + norm)).astype(np.float32)
+
+        self.idf = np.log((1 + n) / (1 + df)) + 1
+        tfidf = (1 + np.log(tf)) * self.idf[term_of]
+        doc_norm = np.sqrt(np.bincount(self.indices, tfidf ** 2, minlength=n))
+        self.tfidf = (tfidf / doc_norm[self.indices]).astype(np.float32)
+
+    def _ready(self):
+        self.weights = {"bm25": self.bm25, "tfidf": self.tfidf}
+        self._suffixes = _Suffixes(self.terms, self.suffix_term, self.suffix_off)
+        self._masks: Dict[FrozenSet[str], Optional[np.ndarray]] = {}
+        self.lines_for = lru_cache(maxsize=4096)(self._lines_containing)
+        self.term_id = lru_cache(maxsize=16384)(self._term_id)
+
+    # -- persistence --
+    def save(self, path: str, source: Optional[List] = None):
+        """Writes the index as a store directory (replaced atomically)."""
+        with store.writing(path) as tmp:
+            for name in self.ARRAYS:
+                np.save(os.path.join(tmp, f"{name}.npy"), getattr(self, name))
+            for name in ("lines", "terms"):
+                packed = _Strings.pack(getattr(self, name))
+                np.save(os.path.join(tmp, f"{name}.npy"), packed.blob)
+                np.save(os.path.join(tmp, f"{name}.off.npy"), packed.offsets)
+            store.write_meta(tmp, {"version": STORE_VERSION, "entries": len(self.lines),
+                                   "sections": self.sections, "source": source})
+
+    @classmethod
+    def open(cls, path: str) -> "KBIndex":
+        """Maps a saved index read-only; cost does not depend on the KB's size."""
+        self = cls.__new__(cls)
+        self.sections = store.read_meta(path)["sections"]
+        load = lambda name: store.load_array(os.path.join(path, f"{name}.npy"))
+        for name in self.ARRAYS:
+            setattr(self, name, load(name))
+        self.lines = _Strings(load("lines"), load("lines.off"))
+        self.terms = _Strings(load("terms"), load("terms.off"))
+        self.backing = "mmap"
+        self._ready()
+        return self
+
+    # -- search --
+    def _postings(self, k: int) -> np.ndarray:
+        return self.indices[self.indptr[k]:self.indptr[k + 1]]
+
+    def _term_id(self, tok: str) -> Optional[int]:
+        k = bisect_left(self.terms, tok)
+        return k if k < len(self.terms) and self.terms[k] == tok else None
+
+    def _lines_containing(self, w: str) -> Tuple[int, ...]:
+        # the suffixes starting with w are one contiguous run
+        lo = bisect_left(self._suffixes, w)
+        hi = bisect_left(self._suffixes, w + "\U0010ffff", lo)
+        term_ids = _distinct(self.suffix_term[lo:hi], len(self.terms))
+        if len(term_ids) == 1:
+            return tuple(self._postings(term_ids[0]).tolist())
+        if not len(term_ids):
+            return ()
+        return tuple(_distinct(np.concatenate([self._postings(k) for k in term_ids]), len(self.lines)).tolist())
+
+    def _mask(self, sections: FrozenSet[str]) -> Optional[np.ndarray]:
+        # None (no filtering) when the KB has none of the wanted sections
+        if sections not in self._masks:
+            wanted = {s.lower() for s in sections}
+            ids = [k for k, s in enumerate(self.sections) if s.lower() in wanted]
+            self._masks[sections] = np.isin(self.section_of, ids) if ids else None
+        return self._masks[sections]
+
+    def search(self, query: str, top_k: int = 6, engine: str = "hits",
+               sections: Optional[FrozenSet[str]] = None) -> List[str]:
+        """Top entries for the query, optionally only from the named sections."""
+        mask = self._mask(frozenset(sections)) if sections else None
+        if engine == "hits":
+            return self._search_hits(query, top_k, mask)
+        if engine not in self.weights:
+            raise ValueError(f"unknown KB engine: {engine}")
+        return self._search_ranked(query, top_k, self.weights[engine], engine == "tfidf", mask)
+
+    def _search_hits(self, query: str, top_k: int, mask: Optional[np.ndarray] = None) -> List[str]:
+        scores: Counter = Counter()
+        for w in TOKEN_RE.findall(query.lower()):
+            scores.update(self.lines_for(w))
+        items = scores.items() if mask is None else [(i, s) for i, s in scores.items() if mask[i]]
+        # same order as sorting (hits, line_no) descending
+        best = heapq.nlargest(top_k, items, key=lambda kv: (kv[1], kv[0]))
+        return [self.lines[i] for i, _ in best]
+
+    def _search_ranked(self, query: str, top_k: int, weights: np.ndarray, idf_query: bool,
+                       mask: Optional[np.ndarray] = None) -> List[str]:
+        qtf = Counter(k for k in map(self.term_id, TOKEN_RE.findall(query.lower())) if k is not None)
+        if not qtf:
+            return []
+        terms = np.fromiter(qtf, dtype=np.int64, count=len(qtf))
+        qw = np.fromiter(qtf.values(), dtype=np.float32, count=len(qtf))
+        if idf_query:
+            qw = (1 + np.log(qw)) * self.idf[terms].astype(np.float32)
+        starts, ends = self.indptr[terms], self.indptr[terms + 1]
+        cols = [np.arange(s, e) for s, e in zip(starts, ends)]
+        slots = np.concatenate(cols)
+        docs = self.indices[slots]
+        contrib = weights[slots] * np.repeat(qw, ends - starts)
+        if mask is not None:
+            keep = mask[docs]
+            docs, contrib = docs[keep], contrib[keep]
+            if not len(docs):
+                return []
+        ids, inv = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inv, contrib)
+        if len(scores) > top_k:
+            cut = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+            keep = scores >= cut
+            ids, scores = ids[keep], scores[keep]
+        order = np.lexsort((ids, scores))[::-1][:top_k]
+        return [self.lines[i] for i in ids[order]]
+
+    def stats(self) -> Dict:
+        return {"backing": self.backing, "entries": len(self.lines), "sections": len(self.sections),
+                "terms": len(self.terms)}
+
+@lru_cache(maxsize=8)
+def kb_index(kb: str) -> KBIndex:
+    return KBIndex(kb)
+
+# ---------------- Compiled KB store ----------------
+# A store (see store.py) is a directory: meta.json plus one mapped .npy file per
+# array. Entries and the vocabulary are UTF-8 buffers with offsets, decoded per
+# result.
+STORE_VERSION = 1
+
+def compile_kb(src: str, store_path: str) -> int:
+    index = KBIndex(read_kb(src))
+    index.save(store_path, source_stamp(src))
+    return len(index.lines)
+
+def kb_store_is_fresh(src: str, store_path: str) -> bool:
+    return store.is_fresh(store_path, STORE_VERSION, src, source_stamp)
+
+def open_kb(store_path: str) -> KBIndex:
+    return KBIndex.open(store_path)
+
+if __name__ == "__main__":
+    # python kb.py <KB file or directory> [store]
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.getenv("KB_STORE") or src.rstrip("/\\") + ".kbindex"
+    print(f"compiled {compile_kb(src, dst)} entries -> {dst}")
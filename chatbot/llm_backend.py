@@ -0,0 +1,126 @@
+# llm_backend.py
+import asyncio, hashlib, os, random
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+
+from prompt import MESSAGE_OVERHEAD, count_tokens
+
+# A backend answers chat payloads ({"model", "messages", "temperature", "max_tokens"}):
+#   complete(payload) -> Completion
+#   stream(payload)   -> async iterator of Chunk; awaiting it opens the stream, so
+#                        connection errors surface there and can be retried
+#   retryable(exc)    -> whether a failure is the upstream's health rather than the request's
+#   close()
+
+class Completion(NamedTuple):
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+class Chunk(NamedTuple):
+    text: str  # "" for the usage-only chunk at the end
+    usage: Optional[Dict] = None
+
+class OpenAIBackend:
+    """The OpenAI SDK, or any compatible server via OPENAI_BASE_URL."""
+    name = "openai"
+
+    def __init__(self, pool_size: int = 64):
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,  # the caller retries, within the request's deadline
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)),
+        )
+
+    async def complete(self, payload: Dict) -> Completion:
+        resp = await self.client.chat.completions.create(**payload)
+        usage = resp.usage
+        return Completion(resp.choices[0].message.content,
+                          usage.prompt_tokens if usage else None, usage.completion_tokens if usage else None)
+
+    async def stream(self, payload: Dict) -> AsyncIterator[Chunk]:
+        stream = await self.client.chat.completions.create(**payload, stream=True,
+                                                           stream_options={"include_usage": True})
+        return self._chunks(stream)
+
+    async def _chunks(self, stream):
+        try:
+            async for chunk in stream:
+                text = "".join(c.delta.content for c in chunk.choices if c.delta.content)
+                if text or chunk.usage:
+                    yield Chunk(text, chunk.usage.model_dump() if chunk.usage else None)
+        finally:
+            await stream.close()
+
+    def retryable(self, exc: BaseException) -> bool:
+        import openai
+        if isinstance(exc, openai.APIConnectionError):  # includes openai's own timeouts
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+        return False
+
+    async def close(self):
+        await self.client.close()
+
+# Vocabulary for fake answers: pundit filler, so answers tokenize like the real thing
+_WORDS = ("press", "transition", "half-space", "overload", "xG", "rest", "defense", "tempo", "width",
+          "pivot", "block", "counter", "touch", "final", "third", "runs", "shape", "lines", "switch",
+          "the", "a", "and", "with", "into", "his", "their", "when", "keeps", "wins", "drives", "finds")
+
+class FakeBackend:
+    """Deterministic stand-in for the upstream: no network and no API key.
+
+    The same payload always gets the same answer. Answers are paced like a
+    model: `latency` seconds to the first token, then `tokens_per_s`
+    (0 = all at once). Each word of the answer counts as one token.
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.2, tokens_per_s: float = 50.0, answer_tokens: int = 60):
+        self.latency, self.tokens_per_s, self.answer_tokens = latency, tokens_per_s, answer_tokens
+        self.calls = 0
+
+    def _answer(self, payload: Dict) -> List[str]:
+        messages = payload["messages"]
+        seed = hashlib.blake2b(repr([(m["role"], m["content"]) for m in messages]).encode(), digest_size=8).digest()
+        rng = random.Random(seed)
+        n = max(1, min(self.answer_tokens, payload.get("max_tokens") or self.answer_tokens))
+        return ["[fake]"] + [rng.choice(_WORDS) for _ in range(n - 1)]
+
+    def _usage(self, payload: Dict, words: List[str]) -> Dict:
+        prompt = sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in payload["messages"])
+        return {"prompt_tokens": prompt, "completion_tokens": len(words), "total_tokens": prompt + len(words)}
+
+    async def complete(self, payload: Dict) -> Completion:
+        self.calls += 1
+        words = self._answer(payload)
+        await asyncio.sleep(self.latency + (len(words) / self.tokens_per_s if self.tokens_per_s > 0 else 0.0))
+        usage = self._usage(payload, words)
+        return Completion(" ".join(words), usage["prompt_tokens"], usage["completion_tokens"])
+
+    async def stream(self, payload: Dict) -> AsyncIterator[Chunk]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._chunks(payload, self._answer(payload))
+
+    async def _chunks(self, payload: Dict, words: List[str]):
+        gap = 1 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        for i, word in enumerate(words):
+            if gap:
+                await asyncio.sleep(gap)
+            yield Chunk(word if i == 0 else " " + word)
+        yield Chunk("", self._usage(payload, words))
+
+    def retryable(self, exc: BaseException) -> bool:
+        return False
+
+    async def close(self):
+        pass
+
+def make_backend(kind: str, pool_size: int = 64, **fake):
+    if kind == "fake":
+        return FakeBackend(**fake)
+    return OpenAIBackend(pool_size)
@@ -0,0 +1,142 @@
+# metrics.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Minimal Prometheus text-format (0.0.4) metrics; counters are per process,
+# so with several gunicorn workers each scrape sees the worker that served it.
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = ['%s="%s"' % (n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " "))
+             for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, v in self._values.items():
+            yield f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_value(v)}"
+
+class Histogram:
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                       0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        row = self._values.get(labels)
+        if row is None:
+            row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, row in self._values.items():
+            cum = 0
+            for bound, n in zip(self.buckets + (float("inf"),), row):
+                cum += n
+                le = 'le="%s"' % _fmt_value(bound)
+                yield f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cum}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {_fmt_value(row[-1])}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {cum}"
+
+class Gauge:
+    """Read at scrape time from `fn`, which returns [(label values, value), ...].
+
+    kind="counter" exposes a monotonic total kept elsewhere (e.g. cache stats).
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Iterable[Tuple[Sequence[str], float]]],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        self.name, self.help, self.labelnames, self.fn, self.kind = name, help, tuple(labelnames), fn, kind
+
+    def samples(self) -> Iterable[str]:
+        for labels, v in self.fn():
+            yield f"{self.name}{_fmt_labels(self.labelnames, labels)} {_fmt_value(v)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), **kw) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, **kw))
+
+    def gauge(self, name: str, help: str, fn, labelnames: Sequence[str] = (), kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, help, fn, labelnames, kind))
+
+    def render(self) -> str:
+        out = []
+        for m in self._metrics:
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            try:
+                out.extend(m.samples())
+            except Exception:
+                pass  # a broken gauge callback must not take the endpoint down
+        return "\n".join(out) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram("chat_stage_seconds", "Time spent per chat pipeline stage.", ["stage"])
+
+# ---------------- Per-request stage timing ----------------
+# Stage durations of the current request, for the Server-Timing header
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("chat_stage_timings", default=None)
+
+def start_timings() -> Dict[str, float]:
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+class stage:
+    """`with stage("retrieve"):` observes the block in chat_stage_seconds."""
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        STAGE_SECONDS.observe(dt, self.name)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + dt
+        return False
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={dt * 1000:.3f}" for name, dt in timings.items())
@@ -0,0 +1,102 @@
+# name_matcher.py
+import re
+from collections import deque
+from typing import Dict, List, Tuple
+
+_LAST_NAME_RE = re.compile(r"[a-zA-Z]+")
+_ASCII_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+class NameMatcher:
+    """Aho-Corasick automaton over lowercase player names and their last names.
+
+    One pass over the query finds every pattern occurrence; the boundary rules
+    are then checked per hit so results match the original scan exactly:
+    a full name counts when it is space-delimited or at either end of the
+    stripped text, a last name when it is a whole [a-zA-Z]+ token.
+    """
+
+    def __init__(self, names: List[str]):
+        self.names = list(names)
+        patterns: Dict[str, List] = {}  # text -> [full name idx, last name idxs]
+        for idx, nm in enumerate(self.names):
+            patterns.setdefault(nm, [-1, []])[0] = idx
+            last = nm.split()[-1] if nm.split() else ""
+            if _LAST_NAME_RE.fullmatch(last):
+                patterns.setdefault(last, [-1, []])[1].append(idx)
+
+        # goto transitions live in one flat dict keyed by state * K + symbol,
+        # where symbols are dense ids for the characters used in the patterns
+        self._alphabet = {ch: i + 1 for i, ch in enumerate(sorted({ch for p in patterns for ch in p}))}
+        K = self._K = len(self._alphabet) + 1
+        goto: Dict[int, int] = {}
+        children: List[List[Tuple[int, int]]] = [[]]
+        terminal: Dict[int, int] = {}
+        self._pat_len: List[int] = []
+        self._pat_full: List[int] = []
+        self._pat_last: List[Tuple[int, ...]] = []
+        n_states = 1
+        for text, (full, lasts) in patterns.items():
+            s = 0
+            for ch in text:
+                sym = self._alphabet[ch]
+                nxt = goto.get(s * K + sym)
+                if nxt is None:
+                    nxt = goto[s * K + sym] = n_states
+                    children[s].append((sym, nxt))
+                    children.append([])
+                    n_states += 1
+                s = nxt
+            terminal[s] = len(self._pat_len)
+            self._pat_len.append(len(text))
+            self._pat_full.append(full)
+            self._pat_last.append(tuple(lasts))
+
+        fail = [0] * n_states
+        out: List[Tuple[int, ...]] = [()] * n_states
+        queue = deque([0])
+        while queue:
+            s = queue.popleft()
+            for sym, child in children[s]:
+                if s:
+                    f = fail[s]
+                    while f and f * K + sym not in goto:
+                        f = fail[f]
+                    fail[child] = goto.get(f * K + sym, 0)
+                own = (terminal[child],) if child in terminal else ()
+                out[child] = own + out[fail[child]]
+                queue.append(child)
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def find(self, text: str, limit: int = 6) -> List[str]:
+        low = text.lower()
+        start = len(low) - len(low.lstrip())
+        end = len(low.rstrip())
+        goto, fail, out, alphabet, K = self._goto, self._fail, self._out, self._alphabet, self._K
+        full_hits, last_hits = set(), set()
+        s = 0
+        for pos, ch in enumerate(low):
+            sym = alphabet.get(ch)
+            if sym is None:
+                s = 0
+                continue
+            while s and s * K + sym not in goto:
+                s = fail[s]
+            s = goto.get(s * K + sym, 0)
+            for p in out[s]:
+                e = pos + 1
+                b = e - self._pat_len[p]
+                full = self._pat_full[p]
+                if full >= 0 and (b == start or e == end or (
+                        (b == 0 or low[b - 1] == " ") and (e == len(low) or low[e] == " "))):
+                    full_hits.add(full)
+                if self._pat_last[p] and (b == 0 or low[b - 1] not in _ASCII_LETTERS) and (
+                        e == len(low) or low[e] not in _ASCII_LETTERS):
+                    last_hits.update(self._pat_last[p])
+        # full-name matches first, then last-name ones, each in roster order
+        seen, found = set(), []
+        for idx in sorted(full_hits) + sorted(last_hits):
+            if idx not in seen:
+                found.append(self.names[idx]); seen.add(idx)
+                if len(found) == limit:
+                    break
+        return found
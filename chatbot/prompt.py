@@ -0,0 +1,27 @@
+# prompt.py
+import math, os, re
+from functools import lru_cache
+
+# Local token counting for prompt budgeting. The default is an approximation
+# of BPE tokenizers (a word piece per ~4 characters, one per punctuation mark);
+# PROMPT_TOKENIZER=tiktoken uses the real encoding if tiktoken is installed.
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+
+if os.getenv("PROMPT_TOKENIZER", "approx").lower() == "tiktoken":
+    try:
+        import tiktoken
+        _encoding = tiktoken.encoding_for_model(os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+    except Exception:
+        _encoding = None
+
+TOKENIZER = "tiktoken" if _encoding is not None else "approx"
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum(math.ceil(len(p) / 4) for p in _PIECE_RE.findall(text))
+
+# per-message framing overhead in the chat format (role, separators)
+MESSAGE_OVERHEAD = 4
@@ -0,0 +1,99 @@
+# resilience.py
+import asyncio, random, time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class CircuitOpen(Exception):
+    """The breaker is open: the upstream is being given time to recover."""
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures.
+
+    While open every call fails fast. After `reset_timeout` seconds one
+    trial call is let through (half-open): success closes the breaker,
+    failure opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold, self.reset_timeout = failure_threshold, reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = self.short_circuited = 0
+        self._trial = 0.0  # when the half-open trial call started
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at >= self.reset_timeout:
+            self.state, self._trial = "half_open", 0.0
+        # a trial that never reported back (cancelled) is replaced after reset_timeout
+        if self.state == "half_open" and now - self._trial >= self.reset_timeout:
+            self._trial = now
+            return True
+        if self.state == "closed":
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        self.state, self.failures, self._trial = "closed", 0, 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state, self.opened_at, self._trial = "open", time.monotonic(), 0.0
+
+    def stats(self) -> Dict:
+        out = {"state": self.state, "consecutive_failures": self.failures, "opens": self.opens,
+               "short_circuited": self.short_circuited}
+        if self.state == "open":
+            out["retry_in"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 2)
+        return out
+
+class RetryPolicy:
+    """Deadline-bounded retries with full-jitter exponential backoff behind a breaker.
+
+    Every attempt shares one deadline, so a request never waits on the
+    upstream for longer than it; backoff sleeps that would overrun it are
+    not taken. Only failures `retryable` accepts are retried, and only
+    those count against the breaker.
+    """
+
+    def __init__(self, breaker: CircuitBreaker, retryable: Callable[[BaseException], bool],
+                 retries: int = 2, base_delay: float = 0.25, max_delay: float = 4.0):
+        self.breaker, self.retryable = breaker, retryable
+        self.retries, self.base_delay, self.max_delay = retries, base_delay, max_delay
+        self.attempts = self.retried = self.timeouts = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]], deadline: float) -> T:
+        """Runs fn() until it succeeds, fails non-retryably, runs out of retries or passes `deadline` seconds."""
+        end = time.monotonic() + deadline
+        for attempt in range(self.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpen()
+            self.attempts += 1
+            try:
+                result = await asyncio.wait_for(fn(), max(0.0, end - time.monotonic()))
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                elif not self.retryable(e):
+                    self.breaker.record_success()  # the upstream answered; the request was the problem
+                    raise
+                self.breaker.record_failure()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt == self.retries or isinstance(e, asyncio.TimeoutError) \
+                        or time.monotonic() + delay >= end:
+                    raise
+                self.retried += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict:
+        return {**self.breaker.stats(), "attempts": self.attempts, "retries": self.retried,
+                "timeouts": self.timeouts}
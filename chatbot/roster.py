@@ -0,0 +1,132 @@
+# roster.py
+import os, sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import store
+
+NUMERIC_COLS = ["Goals", "Assists", "PassingAccuracy", "KeyPassesPer90"]
+CATEGORY_COLS = ["Club", "League", "Position", "Nationality", "PressingIntensity"]
+STORE_VERSION = 2
+
+def _compact_numeric(s: pd.Series) -> pd.Series:
+    s = pd.to_numeric(s, errors="coerce")
+    vals = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    if len(vals) and not np.isnan(vals).any() and (vals == np.round(vals)).all() \
+            and np.abs(vals).max() < 2 ** 31:
+        return s.astype(np.int32)
+    return s.astype(np.float32)
+
+def read_roster_csv(path: str) -> pd.DataFrame:
+    """Parse players.csv into compact typed columns.
+
+    Stat columns become int32 (float32 when they hold fractions or gaps) and
+    the low-cardinality text columns become categoricals. Missing values stay
+    as NA; callers blank them out when rendering.
+    """
+    df = pd.read_csv(path, dtype={c: "category" for c in CATEGORY_COLS})
+    for col in df.columns:
+        if col in NUMERIC_COLS or (col not in CATEGORY_COLS and pd.api.types.is_numeric_dtype(df[col])):
+            df[col] = _compact_numeric(df[col])
+    return df
+
+def name_index(df: pd.DataFrame) -> Dict[str, int]:
+    # lowercase name -> row position; later duplicates win, as with a dict build
+    names = df["Name"].fillna("").astype(str).str.strip().str.lower()
+    return dict(zip(names, range(len(df))))
+
+def _py_value(v):
+    if pd.isna(v):
+        return ""
+    if isinstance(v, np.float32):
+        return float(str(v))  # shortest repr, so 1.3 stays 1.3 rather than 1.2999999523
+    return v.item() if isinstance(v, np.generic) else v
+
+def column_arrays(df: pd.DataFrame) -> List[Tuple[str, object]]:
+    # (name, backing array) pairs; indexing these skips per-call DataFrame overhead
+    return [(col, df[col].array) for col in df.columns]
+
+def player_record(columns: List[Tuple[str, object]], row: int) -> Dict:
+    return {col: _py_value(arr[row]) for col, arr in columns}
+
+# ---------------- Compiled roster store ----------------
+# A store (see store.py) is a directory: meta.json plus one file per column.
+# Numeric columns and categorical codes are mapped .npy arrays; text columns
+# are NUL-joined UTF-8. The /players row orders and ranks and the similarity
+# matrix are saved alongside.
+
+def _source_stamp(csv_path: str) -> Dict:
+    st = os.stat(csv_path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def compile_store(csv_path: str, store_path: str) -> int:
+    df = read_roster_csv(csv_path)
+    with store.writing(store_path) as tmp:
+        cols = _write_columns(df, tmp)
+        _write_indexes(df, tmp)
+        store.write_meta(tmp, {"version": STORE_VERSION, "rows": len(df), "source": _source_stamp(csv_path),
+                               "columns": cols})
+    return len(df)
+
+def _write_indexes(df: pd.DataFrame, tmp: str):
+    from roster_index import RosterIndex  # both import this module
+    from similarity import SimilarityIndex
+    RosterIndex(df).save(tmp)
+    SimilarityIndex(df).save(tmp)
+
+def _write_columns(df: pd.DataFrame, tmp: str) -> List[Dict]:
+    cols = []
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.array.codes
+            np.save(os.path.join(tmp, f"{i}.npy"), codes)
+            cols.append({"name": col, "kind": "category", "categories": [str(c) for c in s.cat.categories]})
+        elif pd.api.types.is_numeric_dtype(s):
+            np.save(os.path.join(tmp, f"{i}.npy"), s.to_numpy())
+            cols.append({"name": col, "kind": "numeric"})
+        else:
+            na = s.isna().to_numpy()
+            with open(os.path.join(tmp, f"{i}.txt"), "w", encoding="utf-8") as f:
+                f.write("\0".join(s.fillna("").astype(str)))
+            if na.any():
+                np.save(os.path.join(tmp, f"{i}.na.npy"), na)
+            cols.append({"name": col, "kind": "text", "has_na": bool(na.any())})
+    return cols
+
+def store_is_fresh(csv_path: str, store_path: str) -> bool:
+    return store.is_fresh(store_path, STORE_VERSION, csv_path, _source_stamp)
+
+def open_store(store_path: str) -> pd.DataFrame:
+    """Read-only DataFrame over a compiled store; numeric data is not copied."""
+    meta = store.read_meta(store_path)
+    data = {}
+    for i, c in enumerate(meta["columns"]):
+        base = os.path.join(store_path, str(i))
+        if c["kind"] == "numeric":
+            data[c["name"]] = pd.Series(np.load(base + ".npy", mmap_mode="r"), copy=False)
+        elif c["kind"] == "category":
+            codes = np.load(base + ".npy", mmap_mode="r")
+            cat = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(c["categories"]), validate=False)
+            data[c["name"]] = pd.Series(cat, copy=False)
+        else:
+            with open(base + ".txt", encoding="utf-8") as f:
+                text = f.read()
+            s = pd.Series(text.split("\0") if meta["rows"] else [], dtype=str)
+            if c["has_na"]:
+                s[np.load(base + ".na.npy")] = np.nan
+            data[c["name"]] = s
+    return pd.DataFrame(data, copy=False)
+
+if __name__ == "__main__":
+    # python roster.py [players.csv] [players.roster]
+    src = sys.argv[1] if len(sys.argv) > 1 else "players.csv"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.getenv("PLAYERS_STORE", "players.roster")
+    try:
+        print(f"compiled {compile_store(src, dst)} rows -> {dst}")
+    except Exception as e:
+        # the store is an optimisation: the server still starts, reading the CSV (or
+        # serving no roster) on its own, so a deploy's compile step never blocks it
+        print(f"warning: roster store not compiled ({type(e).__name__}: {e})", file=sys.stderr)
@@ -0,0 +1,236 @@
+# roster_index.py
+import base64, json, os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import store
+from roster import NUMERIC_COLS
+
+FILTER_COLS = ["League", "Club", "Position", "Nationality"]
+_EMPTY = np.empty(0, dtype=np.int64)
+
+class RosterIndex:
+    """Query index over a roster DataFrame for /players.
+
+    Equality filters use per-value row lists built once from the categorical
+    codes (ascending row order, case-insensitive values). Sorting uses a rank
+    per (column, direction), built on first use: a row's rank is its position
+    in the sorted order, ties broken by row order and NaN always last. Ranks
+    double as keyset cursors, so a page costs O(matches), never a full sort.
+
+    Descending ranks of every stat are built up front for leaderboards; see
+    leaders().
+
+    Stats keep the frame's dtype (int32/float32, mmapped with a compiled
+    store); arithmetic on them is float64 per query. Given `store_path`, the
+    row orders and ranks saved there by save() are mapped (see store.py).
+    """
+
+    def __init__(self, df: pd.DataFrame, store_path: Optional[str] = None):
+        self.rows = len(df)
+        self._store = store_path
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._code_of: Dict[str, Dict[str, List[int]]] = {}  # casefolded value -> category codes
+        self._ncat: Dict[str, int] = {}
+        self._orders: Dict[str, np.ndarray] = {}  # rows in category code order
+        for col in FILTER_COLS:
+            if col not in df.columns:
+                continue
+            cat = df[col].astype("category").array
+            codes = np.asarray(cat.codes)
+            order = self._saved(f"order.{col}")
+            if order is None:
+                order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            n = len(cat.categories)
+            starts = np.searchsorted(sorted_codes, np.arange(n), "left")
+            ends = np.searchsorted(sorted_codes, np.arange(n), "right")
+            postings: Dict[str, np.ndarray] = {}
+            code_of: Dict[str, List[int]] = {}
+            for code, (value, s, e) in enumerate(zip(cat.categories, starts, ends)):
+                key = str(value).strip().casefold()
+                rows = order[s:e]
+                postings[key] = np.union1d(postings[key], rows) if key in postings else rows
+                code_of.setdefault(key, []).append(code)
+            self._postings[col], self._codes[col], self._code_of[col] = postings, codes, code_of
+            self._orders[col], self._ncat[col] = order, n
+        self._values = {col: df[col].to_numpy().view(np.ndarray) for col in NUMERIC_COLS if col in df.columns}
+        self._valid = {col: int(np.count_nonzero(~np.isnan(v))) for col, v in self._values.items()}
+        self._ranks: Dict[Tuple[str, bool], Tuple[np.ndarray, np.ndarray]] = {}
+        self._grouped: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        for col in self._values:
+            self._rank(col, True)
+
+    @property
+    def filter_cols(self) -> List[str]:
+        return list(self._postings)
+
+    @property
+    def sort_cols(self) -> List[str]:
+        return list(self._values)
+
+    def scope_values(self, col: str) -> List[str]:
+        """Casefolded distinct values of a filter column."""
+        return list(self._code_of.get(col, ()))
+
+    # -- compiled store --
+    def _saved(self, name: str) -> Optional[np.ndarray]:
+        path = os.path.join(self._store, f"{name}.npy") if self._store else None
+        if path is None or not os.path.exists(path):
+            return None
+        a = store.load_array(path)
+        return a if len(a) == self.rows else None
+
+    def save(self, path: str):
+        """Writes every row order and rank into a store directory, for RosterIndex(df, path)."""
+        for col, order in self._orders.items():
+            np.save(os.path.join(path, f"order.{col}.npy"), order)
+        for col in self._values:
+            for desc in (True, False):
+                order, rank = self._rank(col, desc)
+                name = f"{col}.{'desc' if desc else 'asc'}"
+                np.save(os.path.join(path, f"order.{name}.npy"), order)
+                np.save(os.path.join(path, f"rank.{name}.npy"), rank)
+
+    def _rank(self, col: str, desc: bool) -> Tuple[np.ndarray, np.ndarray]:
+        key = (col, desc)
+        if key not in self._ranks:
+            name = f"{col}.{'desc' if desc else 'asc'}"
+            order, rank = self._saved(f"order.{name}"), self._saved(f"rank.{name}")
+            if order is None or rank is None:
+                v = self._values[col]
+                order = np.argsort(-v if desc else v, kind="stable")  # NaN sorts last either way
+                rank = np.empty(self.rows, dtype=np.int64)
+                rank[order] = np.arange(self.rows)
+            self._ranks[key] = (order, rank)
+        return self._ranks[key]
+
+    def query(self, equals: Dict[str, str], ranges: Dict[str, Tuple[Optional[float], Optional[float]]],
+              sort: Optional[str] = None, desc: bool = False, after: Optional[int] = None,
+              limit: int = 50) -> Tuple[np.ndarray, int, Optional[int]]:
+        """Returns (row positions of the page, total matches, cursor key for the next page or None).
+
+        `after` is the cursor key of the previous page's last row.
+        """
+        order, rank = self._rank(sort, desc) if sort else (None, None)
+        cand = None
+        lists = [self._postings.get(col, {}).get(value.strip().casefold(), _EMPTY) for col, value in equals.items()]
+        for rows in sorted(lists, key=len):  # intersect smallest first
+            cand = rows if cand is None else np.intersect1d(cand, rows, assume_unique=True)
+        for col, (lo, hi) in ranges.items():
+            # compared as float64, so a bound is never rounded to a float32 stat's precision
+            v = _f64(self._values[col] if cand is None else self._values[col][cand])
+            mask = np.ones(len(v), dtype=bool)
+            if lo is not None:
+                mask &= v >= lo
+            if hi is not None:
+                mask &= v <= hi
+            cand = np.flatnonzero(mask) if cand is None else cand[mask]
+
+        start = -1 if after is None else after
+        if cand is None:
+            # no filters: the page is a slice of the (sorted) row order
+            stop = min(start + 1 + limit, self.rows)
+            page = np.arange(start + 1, stop) if order is None else order[start + 1:stop]
+            return page, self.rows, stop - 1 if start + 1 < stop < self.rows else None
+
+        total = len(cand)
+        keys = cand if rank is None else rank[cand]
+        if after is not None:
+            keep = keys > after
+            cand, keys = cand[keep], keys[keep]
+        if len(keys) > limit:
+            top = np.argpartition(keys, limit)[:limit] if limit else _EMPTY
+            top = top[np.argsort(keys[top])]
+            return cand[top], total, int(keys[top[-1]]) if limit else None
+        top = np.argsort(keys)
+        return cand[top], total, None
+
+    def _group(self, scope: str, stat: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # rows ordered by (scope value, stat descending): each value's leaderboard
+        # is a contiguous run, built on first use per (scope column, stat)
+        key = (scope, stat)
+        if key not in self._grouped:
+            codes = self._codes[scope]
+            perm = np.lexsort((self._rank(stat, True)[1], codes))
+            sorted_codes = codes[perm]
+            n = np.arange(self._ncat[scope])
+            starts = np.searchsorted(sorted_codes, n, "left")
+            ends = np.searchsorted(sorted_codes, n, "right")
+            valid = ~np.isnan(self._values[stat][perm])
+            # per-run count of non-NaN values (NaN sort to the end of each run)
+            csum = np.concatenate(([0], np.cumsum(valid, dtype=np.int64)))
+            self._grouped[key] = (perm, starts, starts + (csum[ends] - csum[starts]))
+        return self._grouped[key]
+
+    def leaders(self, stats: List[str], k: int, equals: Dict[str, str],
+                weights: Optional[List[float]] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Top-k rows by one stat, or by a weighted sum of several (ad-hoc metric).
+
+        Returns (row positions, scores, number of ranked rows in scope). Rows
+        missing a stat are left out. A single stat with at most one scope
+        filter reads a prefix of a presorted run, O(k); other queries select
+        with argpartition over the rows in scope, O(matches) with no full sort.
+        """
+        weights = weights or [1.0] * len(stats)
+        if len(stats) == 1 and weights[0] > 0 and len(equals) <= 1:
+            stat = stats[0]
+            if not equals:
+                rows = self._rank(stat, True)[0][:min(k, self._valid[stat])]
+                return rows, _f64(self._values[stat][rows]) * weights[0], self._valid[stat]
+            (scope, value), = equals.items()
+            codes = self._code_of.get(scope, {}).get(value.strip().casefold(), [])
+            if scope in self._codes and len(codes) == 1:
+                perm, starts, stops = self._group(scope, stat)
+                s, e = starts[codes[0]], stops[codes[0]]
+                rows = perm[s:min(e, s + k)]
+                return rows, _f64(self._values[stat][rows]) * weights[0], int(e - s)
+            if not codes:
+                return _EMPTY, np.empty(0), 0
+
+        cand = None
+        lists = [self._postings.get(col, {}).get(value.strip().casefold(), _EMPTY) for col, value in equals.items()]
+        for rows in sorted(lists, key=len):
+            cand = rows if cand is None else np.intersect1d(cand, rows, assume_unique=True)
+        score = None
+        for stat, w in zip(stats, weights):
+            v = _f64(self._values[stat] if cand is None else self._values[stat][cand])
+            score = w * v if score is None else score + w * v
+        keep = np.flatnonzero(~np.isnan(score))
+        rows = keep if cand is None else cand[keep]
+        score = score[keep]
+        top = top_k(score, k)  # rows is ascending, so ties go by row order
+        return rows[top], score[top], len(rows)
+
+def _f64(v: np.ndarray) -> np.ndarray:
+    return v.astype(np.float64, copy=False)
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first, ties in position order."""
+    n = len(scores)
+    if k <= 0:
+        return _EMPTY
+    if k < n:
+        # k-th best score by partial selection; ties at the cut go to the earliest positions
+        cut = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > cut)
+        top = np.concatenate((above, np.flatnonzero(scores == cut)[:k - len(above)]))
+    else:
+        top = np.arange(n)
+    return top[np.lexsort((top, -scores[top]))]
+
+def encode_cursor(state: Dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("malformed cursor") from e
+    if not isinstance(state, dict) or type(state.get("k")) is not int:
+        raise ValueError("malformed cursor")
+    return state
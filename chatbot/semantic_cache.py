@@ -0,0 +1,92 @@
+# semantic_cache.py
+import re, time, zlib
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+# function words only: dropping them lets "who's better, X or Y" match "X vs Y who is better"
+_STOPWORDS = frozenset(
+    "a an the is are was be of to in on at for and or vs v versus who whos what why how "
+    "does do did s than please me can you tell".split())
+
+def embed(text: str, dim: int = 256) -> np.ndarray:
+    """Hashed bag of content words + in-word character trigrams, L2-normalised.
+
+    Word order and function words are ignored; trigrams absorb small spelling
+    and inflection differences. crc32 keeps the hashing stable across worker
+    processes.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    for tok in _WORD_RE.findall(text.casefold()):
+        if tok in _STOPWORDS:
+            continue
+        feats = [tok] + [f" {tok} "[i:i + 3] for i in range(len(tok))]
+        for f in feats:
+            h = zlib.crc32(f.encode("utf-8"))
+            vec[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+class SemanticCache:
+    """Near-duplicate answer cache: brute-force cosine search over a fixed-size matrix.
+
+    Entries carry a partition key and only match queries with the same key,
+    and expire `ttl` seconds after they were added. When full, an expired
+    slot is reused, else the least recently used one is overwritten.
+    """
+
+    def __init__(self, capacity: int = 10_000, dim: int = 256, threshold: float = 0.9, ttl: float = 3600.0):
+        self.capacity, self.dim, self.threshold, self.ttl = capacity, dim, threshold, ttl
+        self._vecs = np.zeros((capacity, dim), dtype=np.float32)
+        self._parts = np.zeros(capacity, dtype=np.int64)
+        self._used = np.zeros(capacity, dtype=np.int64)
+        self._expires = np.zeros(capacity, dtype=np.float64)
+        self._values: List[Optional[Dict]] = [None] * capacity
+        self._size = self._tick = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def partition_id(key: Hashable) -> int:
+        return zlib.crc32(repr(key).encode("utf-8"))
+
+    def lookup(self, partition: Hashable, text: str) -> Optional[Tuple[Dict, float]]:
+        if self._size:
+            scores = self._vecs[:self._size] @ embed(text, self.dim)
+            scores[self._parts[:self._size] != self.partition_id(partition)] = -1.0
+            scores[self._expires[:self._size] < time.monotonic()] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self._tick += 1
+                self._used[best] = self._tick
+                self.hits += 1
+                return self._values[best], float(scores[best])
+        self.misses += 1
+        return None
+
+    def add(self, partition: Hashable, text: str, value: Dict):
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            expired = np.flatnonzero(self._expires < time.monotonic())
+            if len(expired):
+                slot = int(expired[0])
+            else:
+                slot = int(np.argmin(self._used))
+                self.evictions += 1
+        self._tick += 1
+        self._vecs[slot] = embed(text, self.dim)
+        self._parts[slot] = self.partition_id(partition)
+        self._used[slot] = self._tick
+        self._expires[slot] = time.monotonic() + self.ttl
+        self._values[slot] = value
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {"backend": "semantic", "entries": len(self), "capacity": self.capacity,
+                "threshold": self.threshold, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
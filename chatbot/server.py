@@ -1,12 +1,52 @@
 # server.py
-import os, re
-from typing import List, Dict
-from fastapi import FastAPI, HTTPException, Query
+import os, re, sys, json, math, time, hashlib, importlib.util, threading
+from types import MappingProxyType
+from typing import TYPE_CHECKING, List, Dict, NamedTuple, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import pandas as pd
+from kb import KBIndex, kb_index, read_kb, compile_kb, kb_store_is_fresh, open_kb, source_stamp as kb_source_stamp, \
+    ENGINES as KB_ENGINES
+from name_matcher import NameMatcher
+from fuzzy_names import FuzzyNameIndex, normalize as normalize_name
+from cache import cache_key, make_cache
+from semantic_cache import SemanticCache
+from prompt import count_tokens, MESSAGE_OVERHEAD
+from history import HistoryCompactor, SUMMARY_HEADER
+from batcher import MicroBatcher
+from static_asset import StaticAsset, etag_matches
+from admission import Rejected, make_admission
+from resilience import CircuitBreaker, CircuitOpen, RetryPolicy
+from llm_backend import Completion, make_backend
+from singleflight import FlightFailed, make_singleflight
+from metrics import REGISTRY, STAGE_SECONDS, CONTENT_TYPE as METRICS_CONTENT_TYPE, stage, start_timings, server_timing
+try:
+    import orjson  # faster /players serialization when installed
+except ImportError:
+    orjson = None
+try:
+    import fcntl  # serialises store recompiles across workers on reload
+except ImportError:
+    fcntl = None
+if TYPE_CHECKING:
+    import pandas as pd
+
+def lazy_import(name: str):
+    # module object that runs the real import on first attribute access
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# pandas-backed roster layer: loaded with the first roster, not at import, so a
+# worker can answer /healthz before paying for pandas
+roster_lib = lazy_import("roster")
+roster_index = lazy_import("roster_index")
+similarity = lazy_import("similarity")
 
 load_dotenv()
 
@@ -34,16 +74,44 @@ KB = """
 - Predictions: probabilities + swing factors (injuries, fatigue, schedule).
 """
 
-def retrieve(query: str, kb: str, top_k: int = 6) -> List[str]:
-    lines = [l.strip() for l in kb.splitlines() if l.strip()]
-    q = query.lower()
-    scored = []
-    for i, line in enumerate(lines):
-        hits = sum(1 for w in re.findall(r"\w+", q) if w in line.lower())
-        if hits:
-            scored.append((hits, i, line))
-    scored.sort(reverse=True)
-    return [ln for _, _, ln in scored[:top_k]]
+# Ranking engine for retrieve(): "hits" (substring hit count), "bm25" or "tfidf"
+KB_ENGINE = os.getenv("KB_ENGINE", "hits").lower()
+if KB_ENGINE not in KB_ENGINES:
+    KB_ENGINE = "hits"
+
+def retrieve(query: str, index: KBIndex, top_k: int = 6, engine: str = "hits", sections=None) -> List[str]:
+    return index.search(query, top_k, engine, sections)
+
+# Optional KB replacing the inline text above: a markdown file, or a directory of
+# .md/.markdown/.txt sections and .jsonl {"section", "text"} records. Compiled once into
+# KB_STORE (python kb.py KB_PATH), which workers map like PLAYERS_STORE, and watched for
+# edits like players.csv.
+KB_PATH = os.getenv("KB_PATH", "")
+KB_STORE = os.getenv("KB_STORE", KB_PATH.rstrip("/\\") + ".kbindex" if KB_PATH else "")
+
+def _compile_locked(store: str, is_fresh, compile):
+    # one worker recompiles a stale store; the others wait on the lock, then map it
+    with open(store + ".lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not is_fresh():
+            compile()
+
+def load_kb(path: str) -> KBIndex:
+    if KB_STORE:
+        try:
+            if not kb_store_is_fresh(path, KB_STORE):
+                _compile_locked(KB_STORE, lambda: kb_store_is_fresh(path, KB_STORE),
+                                lambda: compile_kb(path, KB_STORE))
+            return open_kb(KB_STORE)
+        except OSError:
+            pass  # read-only deploy dir: build in memory
+    return KBIndex(read_kb(path))
+
+if KB_PATH and (os.path.exists(KB_PATH) or os.path.isdir(KB_STORE)):
+    KB_INDEX = load_kb(KB_PATH)
+else:
+    KB_INDEX = kb_index(KB)  # build the KB index once at startup
 
 PUNDIT_SYSTEM_PROMPT = """
 You are a charismatic, neutral football TV pundit.
@@ -55,26 +123,113 @@ If asked for real-time tables/fixtures, note they may have changed.
 Keep banter friendly and respectful.
 """
 
+MODE_INSTRUCTIONS = {
+    "pundit": "Be objective, balanced, and tactical.",
+    "banter": "Add mild, friendly banter. Keep it respectful.",
+    "compare": "Compare players/teams with role fit, outputs, system, and tactical context.",
+    "stats": "Lean on evergreen rules and explain how stats like xG, PPDA, progressive passes matter."
+}
+# KB sections each mode retrieves from: KB_SECTIONS_<MODE>, comma-separated headers
+# (e.g. KB_SECTIONS_STATS="Tactical talking points"). Unset, or naming no section in
+# the loaded KB, means the whole KB.
+KB_MODE_SECTIONS = {m: frozenset(s.strip() for s in os.getenv(f"KB_SECTIONS_{m.upper()}", "").split(",") if s.strip())
+                    for m in MODE_INSTRUCTIONS}
+HOT_TAKE = " Offer one bold but well-reasoned hot take at the end."
+
+# The 8 (mode, hot_takes) system messages, built once and shared read-only
+SYSTEM_MESSAGES = {
+    (mode, hot): MappingProxyType({"role": "system",
+                                   "content": PUNDIT_SYSTEM_PROMPT + f"\nMode: {text}{HOT_TAKE if hot else ''}"})
+    for mode, text in MODE_INSTRUCTIONS.items() for hot in (False, True)
+}
+SYSTEM_TOKENS = {k: count_tokens(m["content"]) + MESSAGE_OVERHEAD for k, m in SYSTEM_MESSAGES.items()}
+KB_HEADER = "Relevant evergreen context:"
+NO_KB_CONTEXT = MappingProxyType({"role": "system", "content": "No extra KB context."})
+KB_FRAME_TOKENS = count_tokens(KB_HEADER) + MESSAGE_OVERHEAD
+NO_KB_TOKENS = count_tokens(NO_KB_CONTEXT["content"]) + MESSAGE_OVERHEAD
+# Prompt-token budget per request; KB lines are dropped (lowest rank first) to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+# Conversation history over HISTORY_TOKEN_BUDGET keeps its last HISTORY_KEEP_TURNS
+# messages verbatim and folds the rest into a cached rolling summary
+HISTORY = HistoryCompactor(
+    budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500")),
+    keep_turns=int(os.getenv("HISTORY_KEEP_TURNS", "6")),
+    summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "300")),
+    echo_prefixes=(PUNDIT_SYSTEM_PROMPT, KB_HEADER, NO_KB_CONTEXT["content"], "Player stats context:", "Stat leaders context:", "Similar players context:", SUMMARY_HEADER),
+)
+
 # ---------------- Players CSV helpers ----------------
-PLAYERS_DF = pd.DataFrame()
-PLAYER_MAP: Dict[str, Dict] = {}
-PLAYER_NAMES_LOWER: List[str] = []
+# Typo/accent/possessive-tolerant second pass (FUZZY_NAMES=off to disable); matches
+# below FUZZY_NAME_MIN_SCORE or on a shared surname are not used
+FUZZY_NAMES = os.getenv("FUZZY_NAMES", "on").lower() in ("1", "on", "true")
+FUZZY_NAME_MIN_SCORE = float(os.getenv("FUZZY_NAME_MIN_SCORE", "0.8"))
+# Compiled roster (python roster.py); workers map it instead of parsing the CSV
+PLAYERS_STORE = os.getenv("PLAYERS_STORE", "players.roster")
+
+class Roster(NamedTuple):
+    """One roster load: the frame plus every index built from it.
+
+    Never mutated. Request code reads PLAYERS once and uses that snapshot
+    throughout, so a reload rebinding PLAYERS can't mix old and new data.
+    """
+    df: Optional["pd.DataFrame"]  # None in EMPTY_ROSTER
+    by_name: Dict[str, int]  # lowercase name -> row in df
+    columns: List
+    names_lower: List[str]
+    matcher: NameMatcher
+    fuzzy: FuzzyNameIndex
+    index: Optional["roster_index.RosterIndex"]
+    similarity: Optional["similarity.SimilarityIndex"]
+    backing: str       # "mmap" (compiled store) | "csv" | "none"
+    version: str       # changes whenever a different roster is loaded; part of /players ETags
+    load_seconds: float
+
+    @property
+    def empty(self) -> bool:
+        return self.df is None or self.df.empty
+
+def _build_roster(df: "pd.DataFrame", backing: str, version: str, t0: float) -> Roster:
+    by_name = roster_lib.name_index(df) if "Name" in df.columns else {}
+    names = list(by_name)
+    saved = PLAYERS_STORE if backing == "mmap" else None  # indexes compiled into the store
+    return Roster(df, by_name, roster_lib.column_arrays(df), names, NameMatcher(names),
+                  FuzzyNameIndex(names if FUZZY_NAMES else []), roster_index.RosterIndex(df, saved),
+                  similarity.SimilarityIndex(df, saved), backing, version, time.perf_counter() - t0)
+
+# no roster (missing/unreadable CSV, or still loading); built without pandas
+EMPTY_ROSTER = Roster(None, {}, [], [], NameMatcher([]), FuzzyNameIndex([]), None, None, "none", "0", 0.0)
+PLAYERS = EMPTY_ROSTER
+
+def _roster_version(path: str, backing: str) -> str:
+    src = path if os.path.exists(path) else os.path.join(PLAYERS_STORE, "meta.json")
+    st = os.stat(src)
+    return f"{backing}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def _refresh_store(path: str):
+    _compile_locked(PLAYERS_STORE, lambda: roster_lib.store_is_fresh(path, PLAYERS_STORE),
+                    lambda: roster_lib.compile_store(path, PLAYERS_STORE))
+
+def load_roster(path: str = "players.csv") -> Roster:
+    t0 = time.perf_counter()
+    if PLAYERS_STORE and os.path.isdir(PLAYERS_STORE) and os.path.exists(path) \
+            and not roster_lib.store_is_fresh(path, PLAYERS_STORE):
+        try:
+            _refresh_store(path)
+        except OSError:
+            pass  # read-only deploy dir: fall back to parsing the CSV
+    if PLAYERS_STORE and roster_lib.store_is_fresh(path, PLAYERS_STORE):
+        df, backing = roster_lib.open_store(PLAYERS_STORE), "mmap"
+    else:
+        df, backing = roster_lib.read_roster_csv(path), "csv"
+    return _build_roster(df, backing, _roster_version(path, backing), t0)
 
 def _safe_load_players(path: str = "players.csv"):
-    global PLAYERS_DF, PLAYER_MAP, PLAYER_NAMES_LOWER
+    global PLAYERS
     try:
-        df = pd.read_csv(path)
-        for col in ["Goals", "Assists", "PassingAccuracy", "KeyPassesPer90"]:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-        PLAYERS_DF = df.fillna("")
-        PLAYER_MAP = {str(r["Name"]).strip().lower(): r.to_dict() for _, r in PLAYERS_DF.iterrows()}
-        PLAYER_NAMES_LOWER = list(PLAYER_MAP.keys())
+        PLAYERS = load_roster(path)
         return True
     except Exception:
-        PLAYERS_DF = pd.DataFrame()
-        PLAYER_MAP = {}
-        PLAYER_NAMES_LOWER = []
+        PLAYERS = EMPTY_ROSTER
         return False
 
 def _fmt_player(d: Dict) -> str:
@@ -84,48 +239,417 @@ def _fmt_player(d: Dict) -> str:
         f"KP/90:{d.get('KeyPassesPer90','')} | Note: {d.get('StyleNotes','')}"
     )
 
-def _find_players_in_text(text: str) -> List[str]:
-    t = " " + text.lower() + " "
-    names = []
-    for nm in PLAYER_NAMES_LOWER:
-        if f" {nm} " in t or t.strip().startswith(nm) or t.strip().endswith(nm):
-            names.append(nm)
-    # also try last-name loose matches
-    tokens = set(re.findall(r"[a-zA-Z]+", text.lower()))
-    for nm in PLAYER_NAMES_LOWER:
-        last = nm.split()[-1]
-        if last in tokens:
-            names.append(nm)
-    # dedupe in order
-    seen, out = set(), []
-    for n in names:
-        if n not in seen:
-            out.append(n); seen.add(n)
-    return out[:6]
-
-def build_player_context(query: str) -> str:
-    if PLAYERS_DF.empty:
+def _find_players_in_text(text: str, roster: Optional[Roster] = None) -> List[str]:
+    roster = roster or PLAYERS
+    names = roster.matcher.find(text, limit=6)
+    if not FUZZY_NAMES:
+        return names
+    matches = roster.fuzzy.resolve(text)
+    named_in_full = {m.name for m in matches if m.kind == "full"}
+    # a shared surname alone doesn't say which player is meant, and a word that
+    # is part of someone's full name isn't another player's surname
+    taken = {t for n in named_in_full for t in normalize_name(n)}
+    names = [n for n in names if n in named_in_full or not (
+        roster.fuzzy.is_ambiguous_last(n) or (normalize_name(n) or [""])[-1] in taken)]
+    for m in matches:
+        if len(names) >= 6:
+            break
+        if not m.ambiguous and m.score >= FUZZY_NAME_MIN_SCORE and m.name not in names:
+            names.append(m.name)
+    return names
+
+# "Who leads La Liga in assists?" -> stat + optional scope, answered from the roster
+_LEADER_INTENT_RE = re.compile(r"\b(lead(s|ing|ers?)?|top|most|best|highest|rank(ing|ings)?)\b")
+_LEADER_STATS = [(re.compile(r"\bkey pass|\bchances? creat"), "KeyPassesPer90"),
+                 (re.compile(r"\bpass(ing|es)? (accuracy|completion|%)|\bpass ?%|\baccurate pass"), "PassingAccuracy"),
+                 (re.compile(r"\bassist"), "Assists"),
+                 (re.compile(r"\bgoals?\b|\bscor(er|ers|ing)\b"), "Goals")]
+LEADERS_CONTEXT_K = int(os.getenv("LEADERS_CONTEXT_K", "5"))
+
+def _norm_words(text: str) -> str:
+    return " " + " ".join(re.findall(r"\w+", text.casefold())) + " "
+
+def _leader_request(query: str, roster: Roster):
+    q = query.casefold()
+    if not _LEADER_INTENT_RE.search(q):
+        return None
+    stat = next((col for rx, col in _LEADER_STATS if rx.search(q)), None)
+    if stat is None or stat not in roster.index.sort_cols:
+        return None
+    words, scope = _norm_words(query), {}
+    for col in ("League", "Club", "Position"):
+        # longest value named in the query ("midfielders" matches "midfielder")
+        hits = [v for v in roster.index.scope_values(col)
+                if (w := _norm_words(v)) != "  " and (w in words or w[:-1] + "s " in words)]
+        if hits:
+            scope[col] = max(hits, key=len)
+    return stat, scope
+
+def build_leaders_context(query: str, roster: Roster) -> str:
+    found = _leader_request(query, roster)
+    if found is None:
         return ""
-    names = _find_players_in_text(query)
-    if not names:
+    stat, scope = found
+    rows, _, _ = roster.index.leaders([stat], LEADERS_CONTEXT_K, scope)
+    if not len(rows):
+        return ""
+    where = ", ".join(f"{col}: {roster_lib.player_record(roster.columns, int(rows[0]))[col]}" for col in scope)
+    lines = [f"Top {len(rows)} by {stat}" + (f" ({where})" if where else "") + ":"]
+    for i, row in enumerate(rows, 1):
+        d = roster_lib.player_record(roster.columns, int(row))
+        lines.append(f"{i}. {d.get('Name','')} ({d.get('Club','')}, {d.get('League','')}) — {stat}: {d.get(stat,'')}")
+    return "Stat leaders context:\n" + "\n".join(lines)
+
+SIMILAR_CONTEXT_K = int(os.getenv("SIMILAR_CONTEXT_K", "3"))
+
+def build_similar_context(row: int, roster: Roster) -> str:
+    rows, scores = roster.similarity.similar(row, SIMILAR_CONTEXT_K)
+    if not len(rows):
+        return ""
+    name = roster_lib.player_record(roster.columns, row).get("Name", "")
+    lines = [f"Most similar profiles to {name} (stats, position, pressing):"]
+    for r, sc in zip(rows, scores):
+        lines.append(f"{_fmt_player(roster_lib.player_record(roster.columns, int(r)))} | similarity {sc:.2f}")
+    return "Similar players context:\n" + "\n".join(lines)
+
+def build_player_context(query: str, mode: str = "pundit") -> str:
+    roster = PLAYERS
+    if roster.empty:
         return ""
-    lines = []
-    for nm in names:
-        d = PLAYER_MAP.get(nm)
-        if d:
-            lines.append(_fmt_player(d))
-    return "Player stats context:\n" + "\n".join(lines) if lines else ""
+    parts = []
+    lines, rows = [], []
+    for nm in _find_players_in_text(query, roster):
+        row = roster.by_name.get(nm)
+        if row is not None:
+            lines.append(_fmt_player(roster_lib.player_record(roster.columns, row)))
+            rows.append(row)
+    if lines:
+        parts.append("Player stats context:\n" + "\n".join(lines))
+    if mode == "compare" and len(rows) == 1:
+        # one named player: give the model natural comparison points
+        similar = build_similar_context(rows[0], roster)
+        if similar:
+            parts.append(similar)
+    if mode == "stats":
+        leaders = build_leaders_context(query, roster)
+        if leaders:
+            parts.append(leaders)
+    return "\n\n".join(parts)
 
 # ---------------- FastAPI app ----------------
-from openai import OpenAI
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import asyncio
+from contextlib import asynccontextmanager
+
+# One backend per worker; LLM_MAX_CONCURRENCY caps in-flight completions.
+# LLM_BACKEND=openai (pooled AsyncOpenAI client) | fake (deterministic, offline: no key,
+# FAKE_LLM_LATENCY_MS to the first token, then FAKE_LLM_TOKENS_PER_S, FAKE_LLM_ANSWER_TOKENS long).
+# Built on first use: the OpenAI SDK is the slowest import in the app.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", str(LLM_MAX_CONCURRENCY)))
+backend = None
+_backend_lock = threading.Lock()
+llm_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+llm_inflight = 0  # calls holding a slot, for the llm_inflight gauge
+
+def llm_configured() -> bool:
+    return LLM_BACKEND == "fake" or bool(os.getenv("OPENAI_API_KEY"))
+
+def llm_backend():
+    global backend
+    with _backend_lock:
+        if backend is None:
+            backend = make_backend(
+                LLM_BACKEND, LLM_POOL_SIZE,
+                latency=float(os.getenv("FAKE_LLM_LATENCY_MS", "200")) / 1000,
+                tokens_per_s=float(os.getenv("FAKE_LLM_TOKENS_PER_S", "50")),
+                answer_tokens=int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "60")),
+            )
+    return backend
+
+@asynccontextmanager
+async def llm_slot():
+    global llm_inflight
+    async with llm_slots:
+        llm_inflight += 1
+        try:
+            yield
+        finally:
+            llm_inflight -= 1
+
+async def _complete(payload: Dict) -> Completion:
+    # callers hold an llm_slot() around their whole LLM_POLICY.call
+    return await llm_backend().complete(payload)
+
+# Optional micro-batching (LLM_BATCH=on) for modes whose bursts share KB context
+LLM_BATCH_MODES = {m.strip() for m in os.getenv("LLM_BATCH_MODES", "stats,compare").split(",") if m.strip()}
+BATCHER = MicroBatcher(
+    _complete,
+    max_batch=int(os.getenv("LLM_BATCH_MAX_SIZE", "8")),
+    max_wait=float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "5")) / 1000,
+) if os.getenv("LLM_BATCH", "off").lower() in ("1", "on", "true") else None
+
+# ---------------- LLM resilience ----------------
+# A chat's LLM call gets LLM_TIMEOUT_BASE + LLM_TIMEOUT_PER_TOKEN * max_tokens seconds,
+# shared by up to LLM_RETRIES jittered retries of retryable errors. LLM_BREAKER_FAILURES
+# consecutive failures open the breaker for LLM_BREAKER_RESET seconds, during which chat
+# answers straight from the KB and roster context instead of waiting on the upstream.
+LLM_TIMEOUT_BASE = float(os.getenv("LLM_TIMEOUT_BASE", "10"))
+LLM_TIMEOUT_PER_TOKEN = float(os.getenv("LLM_TIMEOUT_PER_TOKEN", "0.05"))
+
+def _retryable(exc: BaseException) -> bool:
+    return llm_backend().retryable(exc)
+
+LLM_POLICY = RetryPolicy(
+    CircuitBreaker(int(os.getenv("LLM_BREAKER_FAILURES", "5")), float(os.getenv("LLM_BREAKER_RESET", "30"))),
+    _retryable,
+    retries=int(os.getenv("LLM_RETRIES", "2")),
+    base_delay=float(os.getenv("LLM_RETRY_BASE_MS", "250")) / 1000,
+    max_delay=float(os.getenv("LLM_RETRY_MAX_MS", "4000")) / 1000,
+)
+
+def llm_deadline(max_tokens: int) -> float:
+    return LLM_TIMEOUT_BASE + LLM_TIMEOUT_PER_TOKEN * max(0, max_tokens)
+
+def _fallback_reason(exc: BaseException) -> Optional[str]:
+    # None when the failure is not the upstream's health (bad request, auth, bugs)
+    if isinstance(exc, CircuitOpen):
+        return "circuit_open"
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    return "upstream_error" if _retryable(exc) else None
+
+def _fallback_answer(kb_hits: List[str], player_context: str) -> str:
+    parts = ["The pundit desk can't reach the model right now, so here are the notes it would be working from."]
+    if player_context:
+        parts.append(player_context)
+    if kb_hits:
+        parts.append("\n".join(kb_hits))
+    if len(parts) == 1:
+        parts.append("Nothing in the knowledge base matches this question; please try again shortly.")
+    return "\n\n".join(parts)
+
+# Response cache for /chat: RESPONSE_CACHE=memory (per worker) | sqlite (shared file) | off
+RESPONSE_CACHE = make_cache(
+    os.getenv("RESPONSE_CACHE", "memory").lower(),
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    path=os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3"),
+)
+# Second tier for paraphrases of cached questions (SEMANTIC_CACHE=on to enable; off
+# whenever RESPONSE_CACHE is). Entries expire after the same RESPONSE_CACHE_TTL.
+SEMANTIC_CACHE = SemanticCache(
+    capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "10000")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+) if RESPONSE_CACHE is not None and os.getenv("SEMANTIC_CACHE", "off").lower() in ("1", "on", "true") else None
+
+# Single-flight for /chat and /chat/stream: concurrent identical requests (cache-key
+# normalization) wait for the first one's LLM call. COALESCE=memory (per worker) |
+# sqlite (shared by the workers on a host through COALESCE_PATH) | off.
+COALESCER = make_singleflight(
+    os.getenv("COALESCE", "memory").lower(),
+    path=os.getenv("COALESCE_PATH", "coalesce.sqlite3"),
+)
+
+# Admission control for chat: ADMISSION=memory (per worker) | sqlite (shared by the
+# workers on a host) | off. Each client (IP, or RATE_LIMIT_KEY_HEADER when a trusted
+# proxy sets it) gets a token bucket; admitted requests share ADMISSION_MAX_INFLIGHT
+# slots with a bounded wait queue. Anything shed gets 429 + Retry-After.
+ADMISSION = make_admission(
+    os.getenv("ADMISSION", "off").lower(),
+    rate=float(os.getenv("RATE_LIMIT_RPS", "1")),
+    burst=float(os.getenv("RATE_LIMIT_BURST", "10")),
+    max_inflight=int(os.getenv("ADMISSION_MAX_INFLIGHT", "64")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE", "128")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+    path=os.getenv("ADMISSION_PATH", "admission.sqlite3"),
+)
+RATE_LIMIT_KEY_HEADER = os.getenv("RATE_LIMIT_KEY_HEADER", "")
+
+def _client_key(request: Request) -> str:
+    if RATE_LIMIT_KEY_HEADER:
+        key = request.headers.get(RATE_LIMIT_KEY_HEADER)
+        if key:
+            return "key:" + key
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+async def _admit(request: Request) -> Optional[int]:
+    if ADMISSION is None:
+        return None
+    try:
+        await ADMISSION.check_rate(_client_key(request))
+        return await ADMISSION.acquire()
+    except Rejected as e:
+        raise HTTPException(429, f"Too many requests ({e.reason.replace('_', ' ')})",
+                            headers={"Retry-After": str(e.retry_after)})
+
+def _release(lease: Optional[int]):
+    if ADMISSION is not None:
+        ADMISSION.release(lease)
+
+# ---------------- Metrics ----------------
+# /metrics is always on; SERVER_TIMING=on adds a Server-Timing header to /chat responses
+SERVER_TIMING = os.getenv("SERVER_TIMING", "off").lower() in ("1", "on", "true")
+CHAT_REQUESTS = REGISTRY.counter(
+    "chat_requests_total",
+    "Chat requests by endpoint, mode and outcome (llm, exact, semantic, coalesced, fallback, error).",
+    ["endpoint", "mode", "outcome"])
+CHAT_SECONDS = REGISTRY.histogram("chat_request_seconds", "Chat handler time, LLM included.", ["endpoint", "mode"])
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported in the LLM usage field.", ["kind"])
+
+def _mode_label(mode: str) -> str:
+    return mode if mode in MODE_INSTRUCTIONS else "other"
+
+def _cache_stat(field: str):
+    def samples():
+        for tier, c in (("exact", RESPONSE_CACHE), ("semantic", SEMANTIC_CACHE)):
+            if c is not None:
+                yield (tier,), c.stats()[field]
+    return samples
+
+for _field, _kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("entries", "gauge")):
+    REGISTRY.gauge(f"response_cache_{_field}" + ("_total" if _kind == "counter" else ""),
+                   f"Response cache {_field} per tier.", _cache_stat(_field), ["tier"], kind=_kind)
+REGISTRY.gauge("response_cache_hit_ratio", "Response cache hit ratio per tier.", _cache_stat("hit_ratio"), ["tier"])
+REGISTRY.gauge("players_loaded", "1 if the roster is loaded.", lambda: [((), int(not PLAYERS.empty))])
+REGISTRY.gauge("players_rows", "Rows in the loaded roster.", lambda: [((), 0 if PLAYERS.empty else len(PLAYERS.df))])
+REGISTRY.gauge("players_load_seconds", "Time the last roster load took.", lambda: [((), PLAYERS.load_seconds)])
+REGISTRY.gauge("players_backing", "Where the roster was loaded from.", lambda: [((PLAYERS.backing,), 1)], ["backing"])
+REGISTRY.gauge("admission_total", "Chat admission decisions in this worker.",
+               lambda: [((k,), v) for k, v in ADMISSION.counts.items()] if ADMISSION is not None else [],
+               ["outcome"], kind="counter")
+
+def _admission_load():
+    if ADMISSION is None:
+        return []
+    st = ADMISSION.stats()
+    return [(("inflight",), st["inflight"]), (("queued",), st["queued"])]
+
+REGISTRY.gauge("admission_requests", "Chat requests holding or queued for an admission slot.",
+               _admission_load, ["state"])
+REGISTRY.gauge("chat_coalesced_total",
+               "Chat requests answered by another request's LLM call, from this worker (local) or another (remote).",
+               lambda: [(("local",), COALESCER.coalesced), (("remote",), COALESCER.coalesced_remote)]
+               if COALESCER is not None else [], ["source"], kind="counter")
+REGISTRY.gauge("llm_breaker_state", "1 for the LLM circuit breaker's current state.",
+               lambda: [((LLM_POLICY.breaker.state,), 1)], ["state"])
+REGISTRY.gauge("llm_attempts_total", "LLM call attempts by kind (all, retry, timeout, short_circuited).",
+               lambda: [(("all",), LLM_POLICY.attempts), (("retry",), LLM_POLICY.retried),
+                        (("timeout",), LLM_POLICY.timeouts), (("short_circuited",), LLM_POLICY.breaker.short_circuited)],
+               ["kind"], kind="counter")
+REGISTRY.gauge("llm_inflight", "LLM calls currently holding a concurrency slot.",
+               lambda: [((), llm_inflight)])
+
+# ---------------- Hot reload ----------------
+# players.csv and KB_PATH are polled every RELOAD_INTERVAL seconds (0 = off). A
+# change is rebuilt in a thread into a new snapshot and published with a single
+# assignment; in-flight requests finish on the snapshot they started with.
+RELOAD_INTERVAL = float(os.getenv("RELOAD_INTERVAL", "2"))
+RELOAD_STATS = {src: {"reloads": 0, "errors": 0, "last_reload": None, "build_seconds": None,
+                      "swap_us": None, "lag_seconds": None, "last_error": None} for src in ("players", "kb")}
+REGISTRY.gauge("reloads_total", "Hot reloads per source and outcome.",
+               lambda: [((src, o), st[k]) for src, st in RELOAD_STATS.items() for o, k in (("ok", "reloads"), ("error", "errors"))],
+               ["source", "outcome"], kind="counter")
+REGISTRY.gauge("reload_build_seconds", "Time the last successful reload took to build.",
+               lambda: [((src,), st["build_seconds"]) for src, st in RELOAD_STATS.items() if st["build_seconds"] is not None],
+               ["source"])
+
+def _stamp(path: str):
+    try:
+        if os.path.isdir(path):
+            return kb_source_stamp(path)  # a KB directory: any file added, removed or edited
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _swap_players(roster: Roster) -> Roster:
+    global PLAYERS
+    old, PLAYERS = PLAYERS, roster
+    return old
+
+def _swap_kb(index: KBIndex) -> KBIndex:
+    global KB_INDEX
+    old, KB_INDEX = KB_INDEX, index
+    return old
+
+async def _reload(src: str, build, swap, changed_at: float):
+    stats = RELOAD_STATS[src]
+    t0 = time.perf_counter()
+    try:
+        new = await asyncio.to_thread(build)
+    except Exception as e:
+        stats["errors"] += 1
+        stats["last_error"] = f"{type(e).__name__}: {e}"  # keep serving the previous snapshot
+        return
+    t1 = time.perf_counter()
+    old = swap(new)
+    t2 = time.perf_counter()
+    del old  # the previous snapshot is freed once its last request finishes, outside the timed swap
+    stats.update(reloads=stats["reloads"] + 1, last_reload=time.time(), build_seconds=round(t1 - t0, 4),
+                 swap_us=round((t2 - t1) * 1e6, 2), lag_seconds=round(time.time() - changed_at, 4), last_error=None)
+
+async def watch_sources(players_path: str):
+    sources = [("players", players_path, lambda: load_roster(players_path), _swap_players)]
+    if KB_PATH:
+        sources.append(("kb", KB_PATH, lambda: load_kb(KB_PATH), _swap_kb))
+    seen = {src: _stamp(path) for src, path, _, _ in sources}
+    pending = {}
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        for src, path, build, swap in sources:
+            stamp = _stamp(path)
+            if stamp is None or stamp == seen[src]:
+                pending.pop(src, None)
+                continue
+            # reload once the file has stopped changing for a poll, not mid-write
+            if src not in pending or pending[src][0] != stamp:
+                pending[src] = (stamp, time.time() - RELOAD_INTERVAL / 2)
+                continue
+            seen[src] = stamp
+            await _reload(src, build, swap, pending.pop(src)[1])
+
+# ---------------- Startup ----------------
+# STARTUP_MODE=blocking: the roster and LLM backend are ready before the worker serves.
+# STARTUP_MODE=fast: serve /healthz and / at once and warm up in a thread; until it
+# finishes, /players* answer 503 and chat requests wait for it.
+STARTUP_MODE = os.getenv("STARTUP_MODE", "blocking").lower()
+STARTUP_STATS = {"mode": STARTUP_MODE, "ready": False, "warmup_seconds": None}
+WARMUP = None  # the background warm-up task in fast mode
+
+def _warm_up(players_path: str):
+    t0 = time.perf_counter()
+    _safe_load_players(players_path)
+    if llm_configured():
+        llm_backend()
+    STARTUP_STATS.update(ready=True, warmup_seconds=round(time.perf_counter() - t0, 4))
+
+async def _until_ready():
+    if WARMUP is not None and not WARMUP.done():
+        await asyncio.shield(WARMUP)
+
+def _players_snapshot() -> Roster:
+    if WARMUP is not None and not WARMUP.done():
+        raise HTTPException(503, "roster is still loading", headers={"Retry-After": "1"})
+    return PLAYERS
 
 # Use lifespan instead of deprecated on_event
-from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    _safe_load_players("players.csv")
+    global WARMUP
+    if STARTUP_MODE == "fast":
+        WARMUP = asyncio.create_task(asyncio.to_thread(_warm_up, "players.csv"))
+    else:
+        _warm_up("players.csv")
+    watcher = asyncio.create_task(watch_sources("players.csv")) if RELOAD_INTERVAL > 0 else None
     yield
+    if watcher is not None:
+        watcher.cancel()
+    if WARMUP is not None:
+        await WARMUP
+    if backend is not None:
+        await backend.close()
 
 app = FastAPI(title="Soccer Pundit Bot", lifespan=lifespan)
 
@@ -155,77 +679,471 @@ class ChatRequest(BaseModel):
 # Health endpoints (Render default is /healthz)
 @app.get("/health")
 def health():
-    return {"ok": True, "players_loaded": not PLAYERS_DF.empty, "rows": int(len(PLAYERS_DF)) if not PLAYERS_DF.empty else 0}
+    roster = PLAYERS
+    return {"ok": True, "players_loaded": not roster.empty, "rows": 0 if roster.empty else len(roster.df),
+            "store": roster.backing, "roster_version": roster.version, "startup": STARTUP_STATS,
+            "kb": {"engine": KB_ENGINE, **KB_INDEX.stats()},
+            "reload": {"interval": RELOAD_INTERVAL, **RELOAD_STATS},
+            "cache": RESPONSE_CACHE.stats() if RESPONSE_CACHE is not None else {"backend": "off"},
+            "semantic_cache": SEMANTIC_CACHE.stats() if SEMANTIC_CACHE is not None else {"backend": "off"},
+            "batching": BATCHER.stats() if BATCHER is not None else {"enabled": False},
+            "admission": ADMISSION.stats() if ADMISSION is not None else {"backend": "off"},
+            "coalescing": COALESCER.stats() if COALESCER is not None else {"backend": "off"},
+            "llm": {"backend": LLM_BACKEND, **LLM_POLICY.stats()}}
 
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
 
-# Optional: serve index.html from backend too (not required if using GitHub Pages)
+# Optional: serve index.html from backend too (not required if using GitHub Pages).
+# Held in memory with gzip/br variants; edits to the file are picked up on the next request.
+INDEX_PAGE = StaticAsset("index.html")
+INDEX_CACHE_CONTROL = os.getenv("INDEX_CACHE_CONTROL", "no-cache")
+
 @app.get("/", response_class=HTMLResponse)
-def root():
+async def root(request: Request):
     try:
-        with open("index.html", "r", encoding="utf-8") as f:
-            return f.read()
-    except Exception:
+        page = INDEX_PAGE.select(request.headers.get("accept-encoding", ""))
+    except OSError:
         return HTMLResponse("<h3>Soccer Pundit API is running</h3>", status_code=200)
+    headers = {"ETag": page.etag, "Cache-Control": INDEX_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=304, headers=headers)
+    if page.encoding:
+        headers["Content-Encoding"] = page.encoding
+    return Response(page.body, media_type="text/html", headers=headers)
+
+# Largest /players page; bigger limits are clamped
+PLAYERS_PAGE_MAX = int(os.getenv("PLAYERS_PAGE_MAX", "1000"))
+
+def _json(content: Dict, headers: Dict) -> Response:
+    if orjson is not None:
+        return Response(orjson.dumps(content), media_type="application/json", headers=headers)
+    return JSONResponse(content, headers=headers)
 
 @app.get("/players")
-def list_players(limit: int = 50):
-    if PLAYERS_DF.empty:
-        return {"players": []}
-    return {"players": PLAYERS_DF.head(limit).to_dict(orient="records")}
+def list_players(request: Request, limit: int = 50, cursor: Optional[str] = None,
+                 league: Optional[str] = None, club: Optional[str] = None,
+                 position: Optional[str] = None, nationality: Optional[str] = None,
+                 goals_min: Optional[float] = None, goals_max: Optional[float] = None,
+                 assists_min: Optional[float] = None, assists_max: Optional[float] = None,
+                 passing_accuracy_min: Optional[float] = None, passing_accuracy_max: Optional[float] = None,
+                 key_passes_per90_min: Optional[float] = None, key_passes_per90_max: Optional[float] = None,
+                 sort: Optional[str] = Query(None, description="Numeric column, e.g. KeyPassesPer90"),
+                 order: str = Query("desc", pattern="^(asc|desc)$"),
+                 fields: Optional[str] = Query(None, description="Comma-separated columns to return")):
+    # Pages are immutable for a given roster + query, so the ETag needs no query work
+    roster = _players_snapshot()
+    etag = f'W/"{roster.version}-{hashlib.sha1(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if roster.empty:
+        return _json({"players": [], "total": 0, "next_cursor": None}, headers)
+
+    by_lower = {c.lower(): c for c in roster.df.columns}
+    columns = roster.columns
+    if fields:
+        wanted = [f.strip().lower() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in by_lower]
+        if unknown:
+            raise HTTPException(400, f"unknown fields: {', '.join(unknown)}")
+        keep = {by_lower[f] for f in wanted}
+        columns = [(col, arr) for col, arr in roster.columns if col in keep]
+    sort_col = None
+    if sort:
+        sort_col = by_lower.get(sort.lower())
+        if sort_col not in roster.index.sort_cols:
+            raise HTTPException(400, f"cannot sort by {sort}; use one of {', '.join(roster.index.sort_cols)}")
+    desc = order == "desc"
+
+    equals = {col: v for col, v in (("League", league), ("Club", club), ("Position", position),
+                                    ("Nationality", nationality)) if v is not None}
+    ranges = {col: (lo, hi) for col, lo, hi in (
+        ("Goals", goals_min, goals_max), ("Assists", assists_min, assists_max),
+        ("PassingAccuracy", passing_accuracy_min, passing_accuracy_max),
+        ("KeyPassesPer90", key_passes_per90_min, key_passes_per90_max)) if lo is not None or hi is not None}
+    if any(col not in roster.index.sort_cols for col in ranges):
+        return _json({"players": [], "total": 0, "next_cursor": None}, headers)
+
+    after = None
+    if cursor:
+        try:
+            state = roster_index.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "malformed cursor")
+        if state.get("v") != roster.version or state.get("s") != sort_col or state.get("d") != desc:
+            raise HTTPException(400, "cursor does not match this roster or sort order; restart from the first page")
+        after = state["k"]
+        if not -1 <= after < roster.index.rows:
+            raise HTTPException(400, "invalid cursor")
+
+    rows, total, next_key = roster.index.query(equals, ranges, sort_col, desc, after,
+                                               max(0, min(limit, PLAYERS_PAGE_MAX)))
+    next_cursor = None
+    if next_key is not None:
+        next_cursor = roster_index.encode_cursor({"v": roster.version, "s": sort_col, "d": desc, "k": next_key})
+    return _json({"players": [roster_lib.player_record(columns, int(r)) for r in rows], "total": total,
+                  "next_cursor": next_cursor}, headers)
+
+@app.get("/players/leaders")
+def players_leaders(stat: str = Query("Goals", description="Stat column, or comma-separated columns ranked by their (weighted) sum"),
+                    weights: Optional[str] = Query(None, description="Comma-separated non-negative weights, one per stat"),
+                    k: int = 10, league: Optional[str] = None, club: Optional[str] = None,
+                    position: Optional[str] = None, nationality: Optional[str] = None):
+    roster = _players_snapshot()
+    sort_cols = [] if roster.empty else roster.index.sort_cols
+    by_lower = {c.lower(): c for c in sort_cols}
+    stats = [by_lower.get(s.strip().lower()) for s in stat.split(",") if s.strip()]
+    if not stats or None in stats:
+        raise HTTPException(400, f"stat must be one or more of {', '.join(sort_cols) or 'the roster stats'}")
+    w = None
+    if weights:
+        try:
+            w = [float(x) for x in weights.split(",")]
+        except ValueError:
+            raise HTTPException(400, "weights must be numbers")
+        if len(w) != len(stats):
+            raise HTTPException(400, "need one weight per stat")
+        # leaders are always highest first: a negative weight would quietly rank lowest first,
+        # and nan/inf would rank nothing
+        if not all(math.isfinite(x) and x >= 0 for x in w) or not any(w):
+            raise HTTPException(400, "weights must be finite, non-negative and not all zero")
+    scope = {col: v for col, v in (("League", league), ("Club", club), ("Position", position),
+                                   ("Nationality", nationality)) if v is not None}
+    rows, scores, total = roster.index.leaders(stats, max(0, min(k, PLAYERS_PAGE_MAX)), scope, w)
+    keep = {"Name", "Club", "League", "Position", *stats}
+    columns = [(col, arr) for col, arr in roster.columns if col in keep]
+    return _json({"stat": stats, "weights": w, "scope": scope, "total": total,
+                  "leaders": [{"rank": i, "score": round(float(sc), 4), **roster_lib.player_record(columns, int(r))}
+                              for i, (r, sc) in enumerate(zip(rows, scores), 1)]}, {})
+
+@app.get("/players/{name}/similar")
+def players_similar(name: str, k: int = 5):
+    roster = _players_snapshot()
+    row = roster.by_name.get(name.strip().lower())
+    if row is None:
+        raise HTTPException(404, f"unknown player: {name}")
+    rows, scores = roster.similarity.similar(row, max(0, min(k, PLAYERS_PAGE_MAX)))
+    return _json({"player": roster_lib.player_record(roster.columns, row),
+                  "features": roster.similarity.features,
+                  "similar": [{"rank": i, "similarity": round(float(sc), 4), **roster_lib.player_record(roster.columns, int(r))}
+                              for i, (r, sc) in enumerate(zip(rows, scores), 1)]}, {})
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.get("/chat")
-def chat_get(q: str = Query(..., description="Your question"),
+async def chat_get(request: Request, q: str = Query(..., description="Your question"),
              mode: str = "pundit", hot: bool = False, max_tokens: int = 400):
     # Convenience GET for quick tests in a browser
     user_msg = {"role": "user", "content": q}
-    return _chat_core([user_msg], mode, hot, max_tokens)
+    return await _chat_json(request, [user_msg], mode, hot, max_tokens)
 
 @app.post("/chat")
-def chat(req: ChatRequest):
+async def chat(request: Request, req: ChatRequest):
     if not req.messages:
         raise HTTPException(400, "messages required")
-    return _chat_core([m.model_dump() for m in req.messages], req.mode, req.hot_takes, req.max_tokens)
+    return await _chat_json(request, [m.model_dump() for m in req.messages], req.mode, req.hot_takes, req.max_tokens)
 
-def _chat_core(messages: List[Dict], mode: str, hot: bool, max_tokens: int):
-    if not os.getenv("OPENAI_API_KEY"):
-        raise HTTPException(500, "Missing OPENAI_API_KEY")
+# Streaming variants: Server-Sent Events (GET works with a browser EventSource)
+@app.get("/chat/stream")
+async def chat_stream_get(request: Request, q: str = Query(..., description="Your question"),
+                          mode: str = "pundit", hot: bool = False, max_tokens: int = 400):
+    return await _chat_stream(request, [{"role": "user", "content": q}], mode, hot, max_tokens)
 
+@app.post("/chat/stream")
+async def chat_stream(request: Request, req: ChatRequest):
+    if not req.messages:
+        raise HTTPException(400, "messages required")
+    return await _chat_stream(request, [m.model_dump() for m in req.messages], req.mode, req.hot_takes, req.max_tokens)
+
+def _build_prompt(messages: List[Dict], mode: str, hot: bool):
     user_query = messages[-1]["content"]
-    kb_hits = retrieve(user_query, KB, top_k=6)
-    player_context = build_player_context(user_query)
+    with stage("history"):
+        messages, history = HISTORY.compact(messages)
+    with stage("retrieve"):
+        kb_hits = retrieve(user_query, KB_INDEX, top_k=6, engine=KB_ENGINE, sections=KB_MODE_SECTIONS.get(mode))
+    with stage("players"):
+        player_context = build_player_context(user_query, mode)
+    with stage("prompt"):
+        return _assemble_prompt(messages, history, kb_hits, player_context, mode, hot)
 
-    mode_instructions = {
-        "pundit": "Be objective, balanced, and tactical.",
-        "banter": "Add mild, friendly banter. Keep it respectful.",
-        "compare": "Compare players/teams with role fit, outputs, system, and tactical context.",
-        "stats": "Lean on evergreen rules and explain how stats like xG, PPDA, progressive passes matter."
-    }.get(mode, "Be objective, balanced, and tactical.")
+def _assemble_prompt(messages: List[Dict], history: Dict, kb_hits: List[str], player_context: str, mode: str, hot: bool):
+    key = (mode if mode in MODE_INSTRUCTIONS else "pundit", bool(hot))
+    tokens = {
+        "system": SYSTEM_TOKENS[key],
+        "players": count_tokens(player_context) if player_context else 0,
+        "messages": history["tokens_after"],
+    }
+    # Trim the lowest-ranked KB lines until the prompt fits PROMPT_TOKEN_BUDGET
+    kb_tokens = [count_tokens(line) + 1 for line in kb_hits]
+    room = PROMPT_TOKEN_BUDGET - tokens["system"] - tokens["players"] - tokens["messages"] - KB_FRAME_TOKENS
+    while kb_hits and sum(kb_tokens) > room:
+        kb_hits, kb_tokens = kb_hits[:-1], kb_tokens[:-1]
+    tokens["kb"] = sum(kb_tokens) + KB_FRAME_TOKENS if kb_hits or player_context else NO_KB_TOKENS
+    tokens["total"] = tokens["system"] + tokens["kb"] + tokens["players"] + tokens["messages"]
+    tokens["history"] = history
 
-    spice = " Offer one bold but well-reasoned hot take at the end." if hot else ""
+    if kb_hits or player_context:
+        kb_context = {"role": "system", "content": "\n".join(
+            [KB_HEADER if kb_hits else NO_KB_CONTEXT["content"], *kb_hits, *(("", player_context) if player_context else ())])}
+    else:
+        kb_context = NO_KB_CONTEXT
+    return [SYSTEM_MESSAGES[key], kb_context] + messages, kb_hits, player_context, tokens
 
-    system = {"role": "system", "content": PUNDIT_SYSTEM_PROMPT + f"\nMode: {mode_instructions}{spice}"}
-    kb_context = {"role": "system", "content": "Relevant evergreen context:\n" + "\n".join(kb_hits) if kb_hits else "No extra KB context."}
-    if player_context:
-        kb_context["content"] += "\n\n" + player_context
+async def _cached(model: str, mode: str, hot: bool, max_tokens: int, messages: List[Dict]):
+    # (cached result or None, store) -- store(result) files a fresh answer in both tiers
+    key = cache_key(model, mode, hot, max_tokens, messages) if RESPONSE_CACHE is not None else None
+    if key:
+        cached = await RESPONSE_CACHE.aget(key)
+        if cached is not None:
+            return {**cached, "cached": True, "cache_tier": "exact"}, None
+    partition = user_query = None
+    if SEMANTIC_CACHE is not None:
+        # same settings, same earlier turns and same named players -- only the
+        # wording of the latest question may differ
+        user_query = messages[-1]["content"]
+        partition = (cache_key(model, mode, hot, max_tokens, messages[:-1]),
+                     tuple(sorted(_find_players_in_text(user_query))))
+        found = SEMANTIC_CACHE.lookup(partition, user_query)
+        if found is not None:
+            return {**found[0], "cached": True, "cache_tier": "semantic", "similarity": round(found[1], 4)}, None
 
+    async def store(result: Dict):
+        # only real LLM answers come here (degraded ones are never cached); skip empty ones
+        if not result["answer"]:
+            return
+        if key:
+            await RESPONSE_CACHE.aput(key, result)
+        if SEMANTIC_CACHE is not None:
+            SEMANTIC_CACHE.add(partition, user_query, result)
+    return None, store
+
+async def _coalesced(key: str, ask) -> Tuple[Dict, bool]:
+    # identical requests in flight share one answer (same normalization as the cache key)
+    if COALESCER is None:
+        return await ask(), False
     try:
-        resp = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[system, kb_context] + messages,
-            temperature=0.7,
-            max_tokens=max_tokens
-        )
-        answer = resp.choices[0].message.content
-        return {
+        return await COALESCER.do(key, ask)
+    except FlightFailed as e:
+        # another worker's call failed just now: share its error rather than retry it
+        raise HTTPException(e.status or 502, e.detail)
+
+def _degraded(kb_hits: List[str], player_context: str, prompt_tokens: int, reason: str) -> Dict:
+    return {"answer": _fallback_answer(kb_hits, player_context), "kb_used": kb_hits, "kb_engine": KB_ENGINE,
+            "players_context_added": bool(player_context), "prompt_tokens": prompt_tokens,
+            "cached": False, "degraded": True, "degraded_reason": reason}
+
+async def _chat_core(messages: List[Dict], mode: str, hot: bool, max_tokens: int):
+    await _until_ready()
+    if not llm_configured():
+        raise HTTPException(500, "Missing OPENAI_API_KEY")
+
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    with stage("cache"):
+        cached, store = await _cached(model, mode, hot, max_tokens, messages)
+    if cached is not None:
+        return cached
+
+    async def ask_llm():
+        llm_messages, kb_hits, player_context, prompt_tokens = _build_prompt(messages, mode, hot)
+        payload = {"model": model, "messages": llm_messages, "temperature": 0.7, "max_tokens": max_tokens}
+        if BATCHER is not None and mode in LLM_BATCH_MODES:
+            # group by system + KB context so a batch shares its prompt prefix
+            group = (llm_messages[0]["content"], llm_messages[1]["content"])
+            call = lambda: BATCHER.submit(group, payload)
+        else:
+            call = lambda: _complete(payload)
+        try:
+            with stage("llm"):
+                # slot first, then the deadline: time queued for a local slot is not the
+                # upstream's, and must not time out as if it were (or trip the breaker)
+                async with llm_slot():
+                    resp = await LLM_POLICY.call(call, llm_deadline(max_tokens))
+            answer = resp.text
+        except Exception as e:
+            reason = _fallback_reason(e)
+            if reason is None:
+                raise HTTPException(502, f"LLM error: {e}")
+            return _degraded(kb_hits, player_context, prompt_tokens, reason)
+        if resp.prompt_tokens is not None:
+            LLM_TOKENS.inc("prompt", amount=resp.prompt_tokens)
+            LLM_TOKENS.inc("completion", amount=resp.completion_tokens)
+        result = {
             "answer": answer,
             "kb_used": kb_hits,
-            "players_context_added": bool(player_context)
+            "kb_engine": KB_ENGINE,
+            "players_context_added": bool(player_context),
+            "prompt_tokens": prompt_tokens
         }
-    except Exception as e:
-        raise HTTPException(500, f"LLM error: {e}")
+        await store(result)
+        return {**result, "cached": False}
+
+    result, shared = await _coalesced(cache_key(model, mode, hot, max_tokens, messages), ask_llm)
+    return {**result, "coalesced": True} if shared else result
+
+async def _chat_json(request: Request, messages: List[Dict], mode: str, hot: bool, max_tokens: int) -> JSONResponse:
+    t0 = time.perf_counter()
+    timings = start_timings()
+    label = _mode_label(mode)
+    lease = await _admit(request)
+    try:
+        result = await _chat_core(messages, mode, hot, max_tokens)
+    except HTTPException:
+        CHAT_REQUESTS.inc("chat", label, "error")
+        raise
+    finally:
+        _release(lease)
+    with stage("serialize"):
+        response = JSONResponse(result)
+    elapsed = time.perf_counter() - t0
+    outcome = result.get("cache_tier") or ("coalesced" if result.get("coalesced")
+                                           else "fallback" if result.get("degraded") else "llm")
+    CHAT_REQUESTS.inc("chat", label, outcome)
+    CHAT_SECONDS.observe(elapsed, "chat", label)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+    return response
+
+def _sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _holding(lease: Optional[int], events):
+    # keeps the admission slot until the stream ends or the client goes away
+    try:
+        async for event in events:
+            yield event
+    finally:
+        _release(lease)
+
+async def _chat_stream(request: Request, messages: List[Dict], mode: str, hot: bool, max_tokens: int) -> StreamingResponse:
+    await _until_ready()
+    if not llm_configured():
+        raise HTTPException(500, "Missing OPENAI_API_KEY")
+    lease = await _admit(request)
+    try:
+        return await _stream_response(lease, messages, mode, hot, max_tokens)
+    except BaseException:
+        _release(lease)
+        raise
+
+_META_KEYS = ("kb_used", "kb_engine", "players_context_added", "prompt_tokens")
+
+async def _replay(result: Dict, done: Dict):
+    # a finished answer (cached, or another request's) as a single delta
+    yield _sse("meta", {k: result.get(k) for k in _META_KEYS})
+    yield _sse("delta", {"delta": result["answer"]})
+    yield _sse("done", {"usage": None, **done})
+
+async def _stream_response(lease: Optional[int], messages: List[Dict], mode: str, hot: bool, max_tokens: int) -> StreamingResponse:
+    # Events: "meta" (retrieval info, sent before the LLM call), "delta" per
+    # token chunk, then "done" with usage -- or "error" if the upstream fails.
+    # Like /chat, a stream is answered from the response caches when it can, and
+    # identical requests in flight share one LLM call: the request that makes the
+    # call streams it, the others get the finished answer as a single delta.
+
+    t0 = time.perf_counter()
+    timings = start_timings()
+    label = _mode_label(mode)
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    with stage("cache"):
+        cached, store = await _cached(model, mode, hot, max_tokens, messages)
+    if cached is not None:
+        CHAT_REQUESTS.inc("stream", label, cached["cache_tier"])
+        CHAT_SECONDS.observe(time.perf_counter() - t0, "stream", label)
+        done = {k: cached[k] for k in ("cached", "cache_tier", "similarity") if k in cached}
+        return StreamingResponse(_holding(lease, _replay(cached, done)), media_type="text/event-stream",
+                                 headers=headers)
+
+    llm_messages, kb_hits, player_context, prompt_tokens = _build_prompt(messages, mode, hot)
+    payload = {"model": model, "messages": llm_messages, "temperature": 0.7, "max_tokens": max_tokens}
+    if SERVER_TIMING:
+        # only the pre-LLM stages are known when headers go out
+        headers["Server-Timing"] = server_timing(timings)
+    deltas: asyncio.Queue = asyncio.Queue()
+    usage = None
+
+    async def ask_stream():
+        # runs only in the request that leads the flight; its deltas go to `deltas`
+        nonlocal usage
+        parts, llm_t0 = [], time.perf_counter()
+        deadline = llm_deadline(max_tokens)
+        end, opened = time.monotonic() + deadline, False
+        try:
+            async with llm_slot():
+                # retries only cover opening the stream; the deadline covers the whole answer
+                stream = await LLM_POLICY.call(lambda: llm_backend().stream(payload), deadline)
+                opened = True
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), max(0.0, end - time.monotonic()))
+                        except StopAsyncIteration:
+                            break
+                        if chunk.usage:
+                            usage = chunk.usage
+                        if chunk.text:
+                            if not parts:
+                                STAGE_SECONDS.observe(time.perf_counter() - llm_t0, "llm_first_token")
+                            parts.append(chunk.text)
+                            deltas.put_nowait(chunk.text)
+                finally:
+                    await stream.aclose()
+        except Exception as e:
+            reason = _fallback_reason(e)
+            if reason is not None and opened:
+                LLM_POLICY.breaker.record_failure()  # the upstream failed mid-answer
+            if reason is not None and not parts:
+                return _degraded(kb_hits, player_context, prompt_tokens, reason)
+            raise HTTPException(502, f"LLM error: {e}")
+        STAGE_SECONDS.observe(time.perf_counter() - llm_t0, "llm")
+        if usage:
+            LLM_TOKENS.inc("prompt", amount=usage["prompt_tokens"])
+            LLM_TOKENS.inc("completion", amount=usage["completion_tokens"])
+        result = {"answer": "".join(parts), "kb_used": kb_hits, "kb_engine": KB_ENGINE,
+                  "players_context_added": bool(player_context), "prompt_tokens": prompt_tokens}
+        await store(result)
+        return {**result, "cached": False}
+
+    async def events():
+        yield _sse("meta", {"kb_used": kb_hits, "kb_engine": KB_ENGINE,
+                            "players_context_added": bool(player_context), "prompt_tokens": prompt_tokens})
+        flight = asyncio.ensure_future(_coalesced(cache_key(model, mode, hot, max_tokens, messages), ask_stream))
+        get = None
+        try:
+            while True:
+                get = asyncio.ensure_future(deltas.get())
+                await asyncio.wait((get, flight), return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    break
+                yield _sse("delta", {"delta": get.result()})
+            while not deltas.empty():
+                yield _sse("delta", {"delta": deltas.get_nowait()})
+            try:
+                result, shared = flight.result()
+            except HTTPException as e:
+                CHAT_REQUESTS.inc("stream", label, "error")
+                yield _sse("error", {"detail": e.detail})
+                return
+        finally:
+            if get is not None:
+                get.cancel()
+            flight.cancel()  # client gone: stop the call, unless other requests share it
+        done = {"usage": None if shared else usage}
+        if shared or result.get("degraded"):
+            yield _sse("delta", {"delta": result["answer"]})
+        if shared:
+            done["coalesced"] = True
+        if result.get("degraded"):
+            done.update(degraded=True, degraded_reason=result["degraded_reason"])
+        CHAT_REQUESTS.inc("stream", label, "coalesced" if shared else "fallback" if result.get("degraded") else "llm")
+        CHAT_SECONDS.observe(time.perf_counter() - t0, "stream", label)
+        yield _sse("done", done)
+
+    return StreamingResponse(_holding(lease, events()), media_type="text/event-stream", headers=headers)
 
 # Note: On Render you’ll start with gunicorn; this __main__ is for local dev.
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+# similarity.py
+import json, os
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import store
+from roster import NUMERIC_COLS
+from roster_index import top_k
+
+ONE_HOT_COLS = ["Position", "PressingIntensity"]
+
+class SimilarityIndex:
+    """Cosine similarity between player profiles ("players like X").
+
+    A profile is the z-scored numeric stats plus one-hot Position and
+    PressingIntensity, L2-normalised into one float32 matrix at load time.
+    A query is one matrix-vector product and a partial selection of the top k.
+    Missing stats count as the column mean. Given `store_path`, the matrix
+    saved there by save() is mapped (see store.py).
+    """
+
+    def __init__(self, df: pd.DataFrame, store_path: Optional[str] = None):
+        self.rows = len(df)
+        if not (store_path and self._open(store_path)):
+            self._build(df)
+
+    def _open(self, path: str) -> bool:
+        try:
+            with open(os.path.join(path, "similarity.json"), encoding="utf-8") as f:
+                features = json.load(f)["features"]
+            matrix = store.load_array(os.path.join(path, "similarity.npy"))
+        except (OSError, ValueError, KeyError):
+            return False
+        if matrix.shape != (self.rows, len(features)):
+            return False
+        self.matrix, self.features = matrix, features
+        return True
+
+    def save(self, path: str):
+        """Writes the matrix into a store directory, for SimilarityIndex(df, path)."""
+        np.save(os.path.join(path, "similarity.npy"), self.matrix)
+        with open(os.path.join(path, "similarity.json"), "w", encoding="utf-8") as f:
+            json.dump({"features": self.features}, f)
+
+    def _build(self, df: pd.DataFrame):
+        blocks, self.features = [], []
+        for col in NUMERIC_COLS:
+            if col in df.columns:
+                v = np.asarray(df[col], dtype=np.float64)
+                if self.rows and not np.isnan(v).all():
+                    mean, std = np.nanmean(v), np.nanstd(v)
+                    v = np.nan_to_num((v - mean) / (std or 1.0))
+                else:
+                    v = np.zeros(self.rows)
+                blocks.append(v.astype(np.float32)[:, None])
+                self.features.append(col)
+        for col in ONE_HOT_COLS:
+            if col in df.columns:
+                cat = df[col].astype("category").array
+                codes = np.asarray(cat.codes)
+                onehot = np.zeros((self.rows, len(cat.categories)), dtype=np.float32)
+                has = codes >= 0
+                onehot[np.flatnonzero(has), codes[has]] = 1.0
+                blocks.append(onehot)
+                self.features.extend(f"{col}={c}" for c in cat.categories)
+        m = np.hstack(blocks) if blocks else np.zeros((self.rows, 0), dtype=np.float32)
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = np.ascontiguousarray(m / norms, dtype=np.float32)
+
+    def similar(self, row: int, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (row positions, cosine similarities) of the k most similar players, best first."""
+        if k <= 0 or self.rows <= 1:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.matrix @ self.matrix[row]
+        scores[row] = -np.inf  # never yourself
+        top = top_k(scores, min(k, self.rows - 1))
+        return top, scores[top]
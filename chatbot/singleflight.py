@@ -0,0 +1,130 @@
+# singleflight.py
+import asyncio, json, os, threading, time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import _sqlite
+
+class FlightFailed(Exception):
+    """The call another worker ran for this key raised; carries what it raised."""
+
+    def __init__(self, detail: str, status: Optional[int] = None):
+        super().__init__(detail)
+        self.detail, self.status = detail, status
+
+class SingleFlight:
+    """Concurrent calls with the same key share one call, within one worker.
+
+    The first do(key, fn) runs fn() as a task; callers arriving before it
+    finishes await that task instead of starting their own, and get its
+    result or exception. A caller that goes away does not cancel the call
+    for the others. Nothing is kept once the call finishes.
+    """
+    backend = "memory"
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.leaders = self.coalesced = self.coalesced_remote = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared): shared is True when another caller's call produced it."""
+        task = self._flights.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._flights[key] = task
+            task.add_done_callback(lambda t: self._landed(key, t))
+        result, remote = await asyncio.shield(task)
+        return result, shared or remote
+
+    def _landed(self, key: str, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    async def _run(self, key: str, fn) -> Tuple[Any, bool]:
+        return await fn(), False
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "in_flight": len(self._flights), "leaders": self.leaders,
+                "coalesced": self.coalesced, "coalesced_remote": self.coalesced_remote}
+
+class SQLiteSingleFlight(SingleFlight):
+    """Same, with a flights table in a local SQLite file shared by every worker.
+
+    Per key, one worker claims the flight and runs the call; the others poll
+    every `poll` seconds and take its published outcome, which stays readable
+    for `linger` seconds: its result, or its failure, which they raise as
+    FlightFailed rather than each retrying the call. If the owner is cancelled
+    the next poll claims the flight again; if it dies, its claim lapses after
+    `ttl` seconds. Results must be JSON-serializable. The SQLite calls run in
+    a thread so a busy file never blocks the event loop.
+    """
+    backend = "sqlite"
+
+    def __init__(self, path: str, poll: float = 0.02, ttl: float = 120.0, linger: float = 1.0):
+        super().__init__()
+        self.path, self.poll, self.ttl, self.linger = path, poll, ttl, linger
+        self._lock = threading.Lock()
+        self._purged = 0.0
+        self._db = _sqlite.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS flights (key TEXT PRIMARY KEY, result TEXT,"
+                         " expires REAL NOT NULL)")
+
+    def _claim(self, key: str):
+        # (True, None) if this worker now owns the flight, else (False, result or None while in flight)
+        now = time.time()
+        with self._lock:
+            if now - self._purged > 60:
+                self._db.execute("DELETE FROM flights WHERE expires < ?", (now,))
+                self._purged = now
+            else:
+                self._db.execute("DELETE FROM flights WHERE key = ? AND expires < ?", (key, now))
+            if self._db.execute("INSERT OR IGNORE INTO flights VALUES (?, NULL, ?)",
+                                (key, now + self.ttl)).rowcount == 1:
+                return True, None
+            row = self._db.execute("SELECT result FROM flights WHERE key = ?", (key,)).fetchone()
+        return False, row[0] if row else None
+
+    def _finish(self, key: str, outcome: Optional[Dict] = None):
+        # publishes {"result": ...} or {"error": ...}; None abandons the claim
+        with self._lock:
+            if outcome is None:
+                self._db.execute("DELETE FROM flights WHERE key = ?", (key,))
+            else:
+                self._db.execute("UPDATE flights SET result = ?, expires = ? WHERE key = ?",
+                                 (json.dumps(outcome, ensure_ascii=False), time.time() + self.linger, key))
+
+    async def _run(self, key: str, fn) -> Tuple[Any, bool]:
+        while True:
+            owner, published = await asyncio.to_thread(self._claim, key)
+            if owner:
+                try:
+                    result = await fn()
+                except Exception as e:
+                    await asyncio.to_thread(self._finish, key, {
+                        "error": str(getattr(e, "detail", None) or e) or type(e).__name__,
+                        "status": getattr(e, "status_code", None)})
+                    raise
+                except BaseException:
+                    await asyncio.to_thread(self._finish, key)
+                    raise
+                await asyncio.to_thread(self._finish, key, {"result": result})
+                return result, False
+            if published is not None:
+                self.coalesced_remote += 1
+                outcome = json.loads(published)
+                if "error" in outcome:
+                    raise FlightFailed(outcome["error"], outcome["status"])
+                return outcome["result"], True
+            await asyncio.sleep(self.poll)
+
+def make_singleflight(kind: str, path: str = "coalesce.sqlite3", **kw):
+    if kind == "memory":
+        return SingleFlight()
+    if kind == "sqlite":
+        return SQLiteSingleFlight(os.path.abspath(path), **kw)
+    return None
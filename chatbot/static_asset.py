@@ -0,0 +1,88 @@
+# static_asset.py
+import gzip, hashlib, os, threading
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import brotli  # adds a br variant when installed; gzip otherwise
+except ImportError:
+    brotli = None
+
+class Variant(NamedTuple):
+    body: bytes
+    etag: str                # strong, distinct per encoding
+    encoding: Optional[str]  # Content-Encoding; None for the raw file
+
+def _accepted(header: str) -> Dict[str, float]:
+    # Accept-Encoding -> {coding: q}
+    out = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.partition("=")
+            if k.strip() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        out[coding] = q
+    return out
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    if not if_none_match:
+        return False
+    weak = lambda t: t[2:] if t.startswith("W/") else t
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or weak(etag) in (weak(t) for t in tags)
+
+class StaticAsset:
+    """One file served from memory with precompressed variants.
+
+    The file is read and compressed once (gzip, plus brotli when installed)
+    and reloaded when its mtime or size changes; a request costs one stat().
+    Raises OSError while the file is missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.loads = 0
+        self._stamp = None
+        self._variants: Dict[Optional[str], Variant] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, stamp):
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        tag = hashlib.blake2b(raw, digest_size=12).hexdigest()
+        variants = {None: Variant(raw, f'"{tag}"', None)}
+        gz = gzip.compress(raw, 9, mtime=0)
+        if len(gz) < len(raw):
+            variants["gzip"] = Variant(gz, f'"{tag}-gz"', "gzip")
+        if brotli is not None:
+            br = brotli.compress(raw, quality=11)
+            if len(br) < len(raw):
+                variants["br"] = Variant(br, f'"{tag}-br"', "br")
+        self._stamp, self._variants = stamp, variants
+        self.loads += 1
+
+    def variants(self) -> Dict[Optional[str], Variant]:
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._load(stamp)
+        return self._variants
+
+    def select(self, accept_encoding: str = "") -> Variant:
+        """Smallest variant the client accepts: br, then gzip, then the raw file."""
+        variants = self.variants()
+        accepted = _accepted(accept_encoding)
+        for coding in ("br", "gzip"):
+            if coding in variants and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+                return variants[coding]
+        return variants[None]
@@ -0,0 +1,55 @@
+# store.py
+# Compiled on-disk stores (players.roster, <KB>.kbindex): a directory of data
+# files plus meta.json, built in a temporary directory and swapped in whole, so
+# workers still mapping the old files keep reading them undisturbed.
+# Arrays are .npy files that workers map read-only rather than build at
+# startup: every worker shares the one page-cache copy, and opening a store
+# costs the same whatever its size.
+import json, os, shutil
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+
+import numpy as np
+
+@contextmanager
+def writing(path: str) -> Iterator[str]:
+    """Yields an empty directory to write the store into; on success it replaces `path`."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    try:
+        yield tmp
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+def load_array(path: str) -> np.ndarray:
+    """Maps a saved .npy read-only. The plain ndarray view is still file-backed
+    but skips np.memmap's per-item overhead."""
+    return np.load(path, mmap_mode="r").view(np.ndarray)
+
+def write_meta(path: str, meta: Dict):
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def read_meta(path: str) -> Dict:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def is_fresh(path: str, version: int, src: str, stamp: Callable[[str], object]) -> bool:
+    """True if the store at `path` has this format `version` and was compiled
+    from `src` as it is now (meta["source"] == stamp(src))."""
+    try:
+        meta = read_meta(path)
+    except (OSError, ValueError):
+        return False
+    if meta.get("version") != version:
+        return False
+    if not os.path.exists(src):
+        return True  # the store alone is enough to serve
+    return meta["source"] == stamp(src)
@@ -0,0 +1,5 @@
+# conftest.py -- tests import the app modules from chatbot/, like the bench scripts
+# Run from chatbot/:  python -m pytest -q tests   (needs pytest; not a deploy requirement)
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,98 @@
+# test_admission.py -- token buckets, the in-flight cap and its FIFO queue
+import asyncio
+
+import pytest
+
+from admission import Rejected, make_admission
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    return lambda **kw: make_admission(request.param, path=str(tmp_path / "admission.sqlite3"), poll=0.005, **kw) \
+        if request.param == "sqlite" else make_admission("memory", **kw)
+
+def test_rate_limit_after_burst(make):
+    adm = make(rate=0.5, burst=2)
+
+    async def run():
+        await adm.check_rate("a")
+        await adm.check_rate("a")
+        with pytest.raises(Rejected) as e:
+            await adm.check_rate("a")
+        await adm.check_rate("b")  # buckets are per client
+        return e.value
+    e = asyncio.run(run())
+    assert e.reason == "rate_limited" and e.retry_after == 2
+    assert adm.counts["rate_limited"] == 1
+
+def test_queue_is_fifo(make):
+    adm = make(max_inflight=1, max_queue=8, queue_timeout=5)
+
+    async def run():
+        order = []
+
+        async def waiter(i):
+            lease = await adm.acquire()
+            order.append(i)
+            await asyncio.sleep(0.01)
+            adm.release(lease)
+        first = await adm.acquire()
+        tasks = []
+        for i in range(4):
+            tasks.append(asyncio.ensure_future(waiter(i)))
+            await asyncio.sleep(0.02)  # queue in a known order
+        assert adm.stats()["queued"] == 4
+        adm.release(first)
+        await asyncio.gather(*tasks)
+        return order
+    assert asyncio.run(run()) == [0, 1, 2, 3]
+    assert adm.counts["admitted"] == 5
+
+def test_queue_full_is_rejected(make):
+    adm = make(max_inflight=1, max_queue=1, queue_timeout=5)
+
+    async def run():
+        lease = await adm.acquire()
+        queued = asyncio.ensure_future(adm.acquire())
+        await asyncio.sleep(0.02)
+        with pytest.raises(Rejected) as e:
+            await adm.acquire()
+        adm.release(lease)
+        adm.release(await queued)
+        return e.value
+    assert asyncio.run(run()).reason == "queue_full"
+
+def test_queue_timeout(make):
+    adm = make(max_inflight=1, max_queue=4, queue_timeout=0.05)
+
+    async def run():
+        lease = await adm.acquire()
+        with pytest.raises(Rejected) as e:
+            await adm.acquire()
+        adm.release(lease)
+        await asyncio.sleep(0.02)
+        assert adm.stats()["queued"] == 0
+        return e.value
+    assert asyncio.run(run()).reason == "queue_timeout"
+    assert adm.counts["queue_timeout"] == 1
+
+def test_cancelled_waiter_does_not_keep_a_slot(make):
+    adm = make(max_inflight=1, max_queue=4, queue_timeout=5)
+
+    async def run():
+        lease = await adm.acquire()
+        waiter = asyncio.ensure_future(adm.acquire())
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        adm.release(lease)
+        await asyncio.wait_for(adm.acquire(), 1)  # the slot is free again
+    asyncio.run(run())
+
+def test_lapsed_lease_frees_its_slot(make):
+    adm = make(max_inflight=1, max_queue=4, queue_timeout=1, lease_ttl=0.05)
+
+    async def run():
+        await adm.acquire()  # never released
+        await asyncio.sleep(0.06)
+        await asyncio.wait_for(adm.acquire(), 1)
+    asyncio.run(run())
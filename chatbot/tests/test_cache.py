@@ -0,0 +1,80 @@
+# test_cache.py -- response cache TTL and LRU eviction, both backends
+import time
+
+import pytest
+
+from cache import cache_key, make_cache
+from semantic_cache import SemanticCache
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    return lambda **kw: make_cache(request.param, path=str(tmp_path / "cache.sqlite3"), **kw)
+
+def test_entries_expire(make):
+    c = make(max_entries=8, ttl=0.05)
+    c.put("k", {"answer": "a"})
+    assert c.get("k") == {"answer": "a"}
+    time.sleep(0.06)
+    assert c.get("k") is None
+    assert (c.hits, c.misses) == (1, 1)
+
+def test_least_recently_used_is_evicted(make):
+    c = make(max_entries=2, ttl=60)
+    c.put("a", {"n": 1})
+    time.sleep(0.01)
+    c.put("b", {"n": 2})
+    time.sleep(0.01)
+    assert c.get("a") == {"n": 1}  # a is now the most recently used
+    time.sleep(0.01)
+    c.put("c", {"n": 3})
+    assert c.get("b") is None and c.get("a") == {"n": 1} and c.get("c") == {"n": 3}
+    assert len(c) == 2 and c.evictions == 1
+
+def test_put_replaces(make):
+    c = make(max_entries=2, ttl=60)
+    c.put("a", {"n": 1})
+    c.put("a", {"n": 2})
+    assert c.get("a") == {"n": 2} and len(c) == 1
+
+def test_sqlite_entries_are_shared(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    a, b = make_cache("sqlite", 8, 60, path), make_cache("sqlite", 8, 60, path)
+    a.put("k", {"answer": "a"})
+    assert b.get("k") == {"answer": "a"}
+
+def test_key_ignores_case_and_whitespace():
+    turn = lambda text: [{"role": "user", "content": text}]
+    assert cache_key("m", "pundit", False, 500, turn("Who is  Haaland?")) == \
+        cache_key("m", "pundit", False, 500, turn(" who is haaland? "))
+    assert cache_key("m", "pundit", False, 500, turn("Who is Haaland?")) != \
+        cache_key("m", "banter", False, 500, turn("Who is Haaland?"))
+
+# -- semantic tier --
+def test_semantic_entries_expire():
+    c = SemanticCache(capacity=4, ttl=0.05)
+    c.add("p", "who is the best striker in the league", {"answer": "a"})
+    assert c.lookup("p", "Who is the best striker in the league?")[0] == {"answer": "a"}
+    assert c.lookup("q", "who is the best striker in the league") is None  # other partition
+    time.sleep(0.06)
+    assert c.lookup("p", "who is the best striker in the league") is None
+
+def test_semantic_evicts_least_recently_used():
+    c = SemanticCache(capacity=2, ttl=60)
+    c.add("p", "best striker in the league", {"n": 1})
+    c.add("p", "best goalkeeper in the league", {"n": 2})
+    c.lookup("p", "best striker in the league")  # the goalkeeper entry is now least recent
+    c.add("p", "best winger in the league", {"n": 3})
+    assert c.evictions == 1
+    assert c.lookup("p", "best goalkeeper in the league") is None
+    assert c.lookup("p", "best striker in the league")[0] == {"n": 1}
+
+def test_semantic_reuses_an_expired_slot_before_evicting():
+    c = SemanticCache(capacity=2, ttl=0.05)
+    c.add("p", "best striker in the league", {"n": 1})
+    time.sleep(0.06)
+    c.ttl = 60
+    c.add("p", "best goalkeeper in the league", {"n": 2})
+    c.add("p", "best winger in the league", {"n": 3})  # takes the striker's expired slot
+    assert c.evictions == 0
+    assert c.lookup("p", "best goalkeeper in the league")[0] == {"n": 2}
+    assert c.lookup("p", "best winger in the league")[0] == {"n": 3}
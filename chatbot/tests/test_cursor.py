@@ -0,0 +1,93 @@
+# test_cursor.py -- keyset paging over RosterIndex and the /players cursor
+import numpy as np
+import pandas as pd
+import pytest
+
+import roster_index
+from roster_index import RosterIndex, decode_cursor, encode_cursor
+
+def roster(n=11) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Name": [f"P{i}" for i in range(n)],
+        "Club": ["A", "B"] * (n // 2) + ["A"] * (n % 2),
+        "League": ["L"] * n,
+        "Position": ["Striker"] * n,
+        "Nationality": ["X"] * n,
+        "Goals": [i % 4 for i in range(n)],  # ties, so order within them matters
+        "Assists": list(range(n)),
+        "PassingAccuracy": [80.0] * n,
+        "KeyPassesPer90": [1.5] * n,
+    })
+
+def pages(index, equals, sort, desc, limit):
+    out, after = [], None
+    while True:
+        rows, total, after = index.query(equals, {}, sort, desc, after, limit)
+        out.append(list(rows))
+        if after is None:
+            return out, total
+
+@pytest.mark.parametrize("equals", [{}, {"Club": "a"}])
+@pytest.mark.parametrize("sort,desc", [(None, False), ("Goals", True), ("Goals", False)])
+@pytest.mark.parametrize("limit", [1, 3, 5])
+def test_pages_cover_every_match_once_in_order(equals, sort, desc, limit):
+    df = roster()
+    got, total = pages(RosterIndex(df), equals, sort, desc, limit)
+    want = df[df["Club"] == "A"] if equals else df
+    if sort:
+        want = want.sort_values(sort, ascending=not desc, kind="stable")
+    assert [r for page in got for r in page] == list(want.index)
+    assert total == len(want)
+    assert all(len(page) == limit for page in got[:-1]) and 0 < len(got[-1]) <= limit
+
+@pytest.mark.parametrize("equals", [{}, {"Club": "a"}])
+def test_no_empty_last_page(equals):
+    # 10 rows, 5 per club: a limit that divides the matches ends on a full page
+    got, _ = pages(RosterIndex(roster(10)), equals, "Goals", True, 5)
+    assert [len(page) for page in got] == ([5] if equals else [5, 5])
+
+def test_limit_zero_returns_no_rows_and_no_cursor():
+    index = RosterIndex(roster())
+    for equals in ({}, {"Club": "a"}):
+        rows, total, after = index.query(equals, {}, "Goals", True, None, 0)
+        assert len(rows) == 0 and total > 0 and after is None
+
+def test_cursor_round_trip():
+    state = {"v": 3, "s": "Goals", "d": True, "k": 7}
+    assert decode_cursor(encode_cursor(state)) == state
+
+@pytest.mark.parametrize("cursor", ["!!!", encode_cursor({"k": "7"}), encode_cursor({"v": 1}),
+                                    roster_index.base64.urlsafe_b64encode(b"[1]").decode()])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+# -- /players --
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+    import server
+    with TestClient(server.app) as c:
+        yield c, server
+
+def test_players_cursor_range_is_checked(client):
+    c, server = client
+    roster = server._players_snapshot()
+    for k in (-2, roster.index.rows, 10**12):
+        cursor = encode_cursor({"v": roster.version, "s": "Goals", "d": True, "k": k})
+        r = c.get("/players", params={"sort": "Goals", "cursor": cursor})
+        assert r.status_code == 400 and r.json()["detail"] == "invalid cursor"
+
+def test_players_paging_ends_without_an_empty_page(client):
+    c, server = client
+    rows = server._players_snapshot().index.rows
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "Goals", "limit": 5, **({"cursor": cursor} if cursor else {})}
+        body = c.get("/players", params=params).json()
+        assert body["players"]
+        seen += [p["Name"] for p in body["players"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == rows
@@ -0,0 +1,99 @@
+# test_resilience.py -- circuit breaker states and the retry policy's deadline
+import asyncio, time
+
+import pytest
+
+from resilience import CircuitBreaker, CircuitOpen, RetryPolicy
+
+class Flaky(Exception):
+    pass
+
+def policy(breaker=None, retries=2):
+    return RetryPolicy(breaker or CircuitBreaker(failure_threshold=3, reset_timeout=0.05),
+                       lambda e: isinstance(e, Flaky), retries=retries, base_delay=0.001, max_delay=0.001)
+
+def failing(calls, exc=Flaky):
+    async def fn():
+        calls.append(time.monotonic())
+        raise exc("boom")
+    return fn
+
+def test_breaker_opens_after_consecutive_failures():
+    b = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        b.record_failure()
+    assert b.state == "closed" and b.allow()
+    b.record_failure()
+    assert b.state == "open" and b.opens == 1
+    assert not b.allow() and b.short_circuited == 1
+
+def test_success_resets_the_failure_count():
+    b = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    b.record_failure(); b.record_failure(); b.record_success(); b.record_failure(); b.record_failure()
+    assert b.state == "closed"
+
+def test_half_open_lets_one_trial_through():
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    b.record_failure()
+    time.sleep(0.06)
+    assert b.allow() and b.state == "half_open"
+    assert not b.allow()  # the trial is still out
+
+def test_half_open_trial_success_closes():
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    b.record_failure()
+    time.sleep(0.06)
+    assert b.allow()
+    b.record_success()
+    assert b.state == "closed" and b.allow()
+
+def test_half_open_trial_failure_reopens():
+    b = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        b.record_failure()
+    time.sleep(0.06)
+    assert b.allow()
+    b.record_failure()  # one failure is enough while half-open
+    assert b.state == "open" and b.opens == 2 and not b.allow()
+
+def test_retries_retryable_failures_then_succeeds():
+    p, calls = policy(), []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise Flaky("again")
+        return "ok"
+    assert asyncio.run(p.call(fn, 5)) == "ok"
+    assert len(calls) == 3 and p.retried == 2 and p.breaker.state == "closed"
+
+def test_gives_up_after_retries():
+    p, calls = policy(retries=2), []
+    with pytest.raises(Flaky):
+        asyncio.run(p.call(failing(calls), 5))
+    assert len(calls) == 3 and p.breaker.state == "open"
+
+def test_non_retryable_failure_is_not_retried_or_counted():
+    p, calls = policy(), []
+    with pytest.raises(ValueError):
+        asyncio.run(p.call(failing(calls, ValueError), 5))
+    assert len(calls) == 1 and p.breaker.failures == 0
+
+def test_open_breaker_fails_fast():
+    p, calls = policy(), []
+    for _ in range(3):
+        p.breaker.record_failure()
+    with pytest.raises(CircuitOpen):
+        asyncio.run(p.call(failing(calls), 5))
+    assert calls == []
+
+def test_deadline_covers_every_attempt():
+    p = policy(retries=5)
+
+    async def slow():
+        await asyncio.sleep(1)
+    t0 = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(p.call(slow, 0.05))
+    assert time.monotonic() - t0 < 0.5
+    assert p.attempts == 1 and p.timeouts == 1 and p.breaker.failures == 1
@@ -0,0 +1,124 @@
+# test_singleflight.py -- one call per key in flight, shared by every caller
+import asyncio
+
+import pytest
+
+from singleflight import FlightFailed, SQLiteSingleFlight, SingleFlight
+
+class Upstream(Exception):
+    def __init__(self, detail, status_code):
+        super().__init__(detail)
+        self.detail, self.status_code = detail, status_code
+
+def counted(calls, result="answer", delay=0.05, exc=None):
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if exc is not None:
+            raise exc
+        return result
+    return fn
+
+@pytest.fixture(params=["memory", "sqlite"])
+def flight(request, tmp_path):
+    return SingleFlight() if request.param == "memory" else SQLiteSingleFlight(str(tmp_path / "sf.sqlite3"), poll=0.005)
+
+def test_concurrent_callers_share_one_call(flight):
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", counted(calls)) for _ in range(5)))
+    out = asyncio.run(run())
+    assert len(calls) == 1
+    assert [r for r, _ in out] == ["answer"] * 5
+    assert [shared for _, shared in out] == [False, True, True, True, True]
+    assert flight.leaders == 1 and flight.coalesced == 4
+
+def test_different_keys_do_not_share(flight):
+    calls = []
+
+    async def run():
+        return await asyncio.gather(flight.do("a", counted(calls, "A")), flight.do("b", counted(calls, "B")))
+    assert asyncio.run(run()) == [("A", False), ("B", False)]
+    assert len(calls) == 2
+
+def test_nothing_is_kept_after_the_call(flight):
+    calls = []
+
+    async def run():
+        await flight.do("k", counted(calls, delay=0))
+        await asyncio.sleep(0)
+        if isinstance(flight, SQLiteSingleFlight):
+            await asyncio.sleep(flight.linger)  # the published result lingers for late followers
+        return await flight.do("k", counted(calls, delay=0))
+    assert asyncio.run(run()) == ("answer", False)
+    assert len(calls) == 2 and flight.stats()["in_flight"] == 0
+
+def test_failure_reaches_every_caller(flight):
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", counted(calls, exc=Upstream("down", 502))) for _ in range(3)),
+                                    return_exceptions=True)
+    out = asyncio.run(run())
+    assert len(calls) == 1 and all(isinstance(e, Upstream) for e in out)
+
+def test_caller_going_away_does_not_cancel_the_call():
+    flight, calls = SingleFlight(), []
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", counted(calls)))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(flight.do("k", counted(calls)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+    assert asyncio.run(run()) == ("answer", True)
+    assert len(calls) == 1
+
+# -- across workers: two SQLiteSingleFlight instances on one file --
+def test_follower_worker_takes_the_owners_result(tmp_path):
+    path = str(tmp_path / "sf.sqlite3")
+    a, b = SQLiteSingleFlight(path, poll=0.005), SQLiteSingleFlight(path, poll=0.005)
+    calls = []
+
+    async def run():
+        owner = asyncio.ensure_future(a.do("k", counted(calls, {"answer": "x"})))
+        await asyncio.sleep(0.01)
+        return await owner, await b.do("k", counted(calls))
+    (res_a, res_b) = asyncio.run(run())
+    assert res_a == ({"answer": "x"}, False)
+    assert res_b == ({"answer": "x"}, True)
+    assert len(calls) == 1 and b.coalesced_remote == 1
+
+def test_follower_worker_gets_the_owners_failure(tmp_path):
+    path = str(tmp_path / "sf.sqlite3")
+    a, b = SQLiteSingleFlight(path, poll=0.005), SQLiteSingleFlight(path, poll=0.005)
+    calls = []
+
+    async def run():
+        owner = asyncio.ensure_future(a.do("k", counted(calls, exc=Upstream("LLM error: down", 502))))
+        await asyncio.sleep(0.01)
+        follower = await asyncio.gather(b.do("k", counted(calls)), return_exceptions=True)
+        await asyncio.gather(owner, return_exceptions=True)
+        return follower[0]
+    e = asyncio.run(run())
+    assert isinstance(e, FlightFailed) and (e.detail, e.status) == ("LLM error: down", 502)
+    assert len(calls) == 1
+
+def test_cancelled_owner_hands_the_flight_over(tmp_path):
+    path = str(tmp_path / "sf.sqlite3")
+    a, b = SQLiteSingleFlight(path, poll=0.005), SQLiteSingleFlight(path, poll=0.005)
+    calls = []
+
+    async def run():
+        owner = asyncio.ensure_future(a.do("k", counted(calls, delay=5)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(b.do("k", counted(calls, "from b", delay=0)))
+        await asyncio.sleep(0.02)
+        a._flights["k"].cancel()  # e.g. the worker shutting down: its claim is dropped,
+        # and the follower's next poll takes the flight
+        await asyncio.gather(owner, return_exceptions=True)
+        return await asyncio.wait_for(follower, 1)
+    assert asyncio.run(run()) == ("from b", False)
+    assert len(calls) == 2